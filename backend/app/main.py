@@ -21,13 +21,29 @@ from .routes import rewrite
 from .routes import map, ask
 from .routes import risk_radar 
 from .routes import contextualize
+from .routes import metrics
 
+from .services.rate_limit import ModelUnavailable
+from .services.warmup import get_warmup
+
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
+from fastapi.encoders import jsonable_encoder
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
 
-app = FastAPI(title="Jargon Analyser Backend", version="0.1.0")
+# ---- Startup ----
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # SDK imports, credentials and client channels are set up in the background:
+    # the app accepts requests right away and /ready reports when warmup is done
+    warmup = get_warmup()
+    warmup.start()
+    yield
+    warmup.cancel()
+
+app = FastAPI(title="Jargon Analyser Backend", version="0.1.0", lifespan=lifespan)
 
 # ---- Exception Handler ----
 @app.exception_handler(RequestValidationError)
@@ -35,11 +51,21 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
     return JSONResponse(
         status_code=422,
         content={
-            "error": "Invalid request body. Ensure JSON has a non-empty 'text' field.",
-            "details": exc.errors(),
+            "error": "Invalid request body. Ensure JSON has a non-empty 'text' field or a 'session_id'.",
+            # model validators put the raised ValueError in ctx; encode it like FastAPI does
+            "details": jsonable_encoder(exc.errors()),
         },
     )
 
+@app.exception_handler(ModelUnavailable)
+async def model_unavailable_handler(request: Request, exc: ModelUnavailable):
+    # Quota / overload outlasted the request deadline: tell clients to back off instead of a 5xx cascade
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(int(exc.retry_after))},
+    )
+
 
 # ---- Routers ----
 app.include_router(upload.router, prefix="/api", tags=["extract"])
@@ -48,6 +74,7 @@ app.include_router(map.router, prefix="/api", tags=["timeline"])
 app.include_router(ask.router, prefix="/api", tags=["chatbot"])
 app.include_router(risk_radar.router, prefix="/api", tags=["risk"])
 app.include_router(contextualize.router, prefix="/api", tags=["contextualizer"])
+app.include_router(metrics.router, prefix="/api", tags=["metrics"])
 
 
 # ---- Health Endpoint ----
@@ -56,6 +83,13 @@ async def root():
     return {"message": "AI Contract Analyser backend is running."}
 
 
+@app.get("/ready", tags=["health"])
+async def ready():
+    # 503 while warmup is running; "degraded" lists components that failed (e.g. OCR not configured)
+    is_ready, body = get_warmup().status()
+    return JSONResponse(status_code=200 if is_ready else 503, content=body)
+
+
 # ---- CORS ----
 ALLOWED_ORIGINS = [
     "http://127.0.0.1:5500",
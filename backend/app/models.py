@@ -2,13 +2,30 @@
 from __future__ import annotations
 
 from typing import List, Optional, Dict
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
+
+# ----- Session references -----
+class SessionRef(BaseModel):
+    """Lets a request point at an uploaded document instead of re-sending its text."""
+    session_id: Optional[str] = Field(None, description="Session returned by /api/upload.")
+    block_ids: Optional[List[int]] = Field(None, description="Limit to these block ids of the session (default: whole document).")
+
+def _require_text_or_session(model: SessionRef, field: str):
+    if not getattr(model, field) and not model.session_id:
+        raise ValueError(f"Provide either '{field}' or 'session_id'.")
+    return model
 
 # ----- Rewrite -----
-class RewriteRequest(BaseModel):
-    text: str = Field(..., min_length=1, max_length=20000)
+REWRITE_MAX_CHARS = 20000
+
+class RewriteRequest(SessionRef):
+    text: Optional[str] = Field(None, min_length=1, max_length=REWRITE_MAX_CHARS)
     mode: str = Field("layman", pattern="^(layman)$")
 
+    @model_validator(mode="after")
+    def _check_source(self):
+        return _require_text_or_session(self, "text")
+
 class RewriteResponse(BaseModel):
     rewritten_text: str
     meta: dict | None = None
@@ -18,6 +35,11 @@ class UploadResponse(BaseModel):
     session_id: str = Field(..., description="Unique ID for this document session.")
     filename: str
     message: str = "File uploaded and text extracted successfully."
+    content_type: Optional[str] = None
+    full_text: str = ""
+    clauses: List[Dict] = Field(default_factory=list)
+    count: int = 0
+    queue: Optional[Dict] = None
 
 # ----- Timeline (/api/map) -----
 class DocumentSection(BaseModel):
@@ -25,27 +47,93 @@ class DocumentSection(BaseModel):
     content_summary: str
     # Use default_factory to avoid shared mutable defaults
     subsections: List["DocumentSection"] = Field(default_factory=list)
+    start: Optional[int] = Field(None, description="Offset of the section heading in the mapped text, for sections parsed from the document's numbering.")
+    end: Optional[int] = Field(None, description="End offset of the section (where the next heading at its level starts).")
 
 class TimelineEvent(BaseModel):
     date_description: str
     event: str
+    start: Optional[int] = Field(None, description="Offset of the date expression in the mapped text, when located.")
+    end: Optional[int] = Field(None, description="End offset of the date expression.")
+    kind: Optional[str] = Field(None, description="absolute, relative or recurring, for expressions found locally.")
+    value: Optional[str] = Field(None, description="ISO date (absolute) or ISO 8601 duration (relative/recurring).")
 
 # Request model expected by the timeline route
-class MapRequest(BaseModel):
-    contract_text: str
+class MapRequest(SessionRef):
+    contract_text: Optional[str] = None
+    timeline_mode: Optional[str] = Field(
+        None,
+        pattern="^(model|hybrid|local)$",
+        description="model: the LLM reads every chunk for dates; hybrid: only chunks with dates found locally; local: no LLM for the timeline. Default MAP_TIMELINE_MODE.",
+    )
+    summarize: bool = Field(True, description="Write content_summary for sections parsed from the document's numbering; false returns the outline without model calls for it.")
+
+    @model_validator(mode="after")
+    def _check_source(self):
+        return _require_text_or_session(self, "contract_text")
 
 class MapResponse(BaseModel):
     structure: List[DocumentSection]
     timeline: List[TimelineEvent]
+    meta: dict | None = None
 
 # Resolve forward refs for recursive model (Pydantic v2)
 DocumentSection.model_rebuild()
 
+# Response schemas for structured model output. Gemini schemas take no defaults
+# or recursion, so sections are spelled out two levels deep.
+class SubsectionSummary(BaseModel):
+    title: str
+    content_summary: str
+
+class SectionSummary(BaseModel):
+    title: str
+    content_summary: str
+    subsections: List[SubsectionSummary]
+
+class ExtractedEvent(BaseModel):
+    date_description: str
+    event: str
+
+# What /map extracts from one chunk in a single call
+class ChunkMap(BaseModel):
+    structure: List[SectionSummary]
+    timeline: List[ExtractedEvent]
+
+# The same without the timeline, for chunks with no dates in them
+class ChunkStructure(BaseModel):
+    structure: List[SectionSummary]
+
+# And without the structure, when it comes from the document's own numbering
+class ChunkTimeline(BaseModel):
+    timeline: List[ExtractedEvent]
+
+# Summaries of parsed outline sections, written in batches
+class SectionNote(BaseModel):
+    id: int
+    summary: str
+
+class SectionNotes(BaseModel):
+    summaries: List[SectionNote]
+
+# ----- Risk radar (/api/risk/scan) -----
+class RiskFlag(BaseModel):
+    term: str
+    explanation: str
+
+# Response schema of the contextual risk call
+class RiskFlags(BaseModel):
+    flags: List[RiskFlag]
+
 # ----- Chatbot (/api/ask) -----
-class AskRequest(BaseModel):
-    contract_text: str
+class AskRequest(SessionRef):
+    contract_text: Optional[str] = None
     question: str
 
+    @model_validator(mode="after")
+    def _check_source(self):
+        return _require_text_or_session(self, "contract_text")
+
 class AskResponse(BaseModel):
     answer: str
     references: List[str] = Field(default_factory=list, description="Clause references or excerpts used for the answer.")
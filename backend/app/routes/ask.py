@@ -1,21 +1,58 @@
 # backend/app/routes/chatbot.py
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from app.models import AskRequest, AskResponse
-from app.services.chatbot import answer_question
+from app.services.chatbot import answer_question_async, answer_question_stream
+from app.services.rate_limit import ModelUnavailable
+from app.routes.common import request_text, sse, sse_response, until_disconnected
 
 # Set the prefix once; include this router in main.py without another prefix
 router = APIRouter(tags=["chatbot"])
 
 @router.post("/ask", response_model=AskResponse, summary="Ask Question Endpoint")
-def ask_question_endpoint(request: AskRequest) -> AskResponse:
+async def ask_question_endpoint(request: AskRequest) -> AskResponse:
     """
-    Accepts {"contract_text": "...", "question": "..."} and returns {"answer": "..."}.
+    Accepts {"contract_text": "...", "question": "..."} (or {"session_id": "...", "question": "..."})
+    and returns {"answer": "..."}.
     """
+    context = await request_text(request.contract_text, request.session_id, request.block_ids)
     try:
         # Pass the exact fields: question + contract_text (as context)
-        return answer_question(question=request.question, context=request.contract_text)
+        return await answer_question_async(question=request.question, context=context)
+    except ModelUnavailable:
+        raise  # 503 via the app-level handler
     except Exception as e:
         # Temporary logging to surface the actual error in console during debugging
         print("CHATBOT ERROR:", repr(e))
         raise HTTPException(status_code=500, detail="Chatbot service error")
+
+@router.post("/ask/stream", summary="Ask Question (server-sent events)")
+async def ask_question_stream_endpoint(request: AskRequest, http_request: Request):
+    """
+    Same body as /ask, answered as text/event-stream:
+      event: token  {"text": "..."}                       answer pieces as they are generated
+      event: done   {"answer": "...", "references": []}   the final AskResponse
+      event: error  {"detail": "..."}
+    The upstream generation is cancelled within DISCONNECT_POLL_S of the client disconnecting,
+    even while it is waiting for the next token.
+    """
+    context = await request_text(request.contract_text, request.session_id, request.block_ids)
+
+    async def body():
+        # Closing the answer stream closes the model stream
+        stream = until_disconnected(http_request, answer_question_stream(question=request.question, context=context))
+        try:
+            async for item in stream:
+                if isinstance(item, AskResponse):
+                    yield sse("done", item.model_dump())
+                else:
+                    yield sse("token", {"text": item})
+        except ModelUnavailable as e:
+            yield sse("error", {"detail": str(e), "retry_after": e.retry_after})
+        except Exception as e:
+            print("CHATBOT ERROR:", repr(e))
+            yield sse("error", {"detail": "Chatbot service error"})
+        finally:
+            await stream.aclose()
+
+    return sse_response(body())
@@ -0,0 +1,81 @@
+import asyncio
+import json
+from contextlib import suppress
+from typing import AsyncIterator, Iterable, Optional, TypeVar
+
+from fastapi import HTTPException, Request
+from fastapi.responses import StreamingResponse
+
+from ..storage import SessionNotFound, resolve_text_async
+
+# How often a streaming route checks whether its client is still there
+DISCONNECT_POLL_S = 0.5
+
+T = TypeVar("T")
+
+
+async def request_text(
+    text: Optional[str],
+    session_id: Optional[str],
+    block_ids: Optional[Iterable[int]] = None,
+    max_chars: Optional[int] = None,
+) -> str:
+    """
+    The text a request works on: inline, or looked up from its session (404 when
+    the session or its block_ids are unknown). `max_chars` re-applies the inline
+    field's length limit to session text (413).
+    """
+    try:
+        text = await resolve_text_async(text, session_id, block_ids)
+    except SessionNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    if max_chars is not None and len(text) > max_chars:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Selected text is {len(text)} characters; the limit is {max_chars}. Pass fewer block_ids.",
+        )
+    return text
+
+
+def sse(event: str, data: dict) -> str:
+    """One server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def sse_response(body: AsyncIterator[str]) -> StreamingResponse:
+    # X-Accel-Buffering stops nginx-style proxies from holding events back
+    return StreamingResponse(
+        body,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def until_disconnected(request: Request, items: AsyncIterator[T], poll_s: float = DISCONNECT_POLL_S) -> AsyncIterator[T]:
+    """
+    Items of `items` until the client goes away. The check runs every `poll_s`
+    seconds on its own, so a model that is slow to send the next token is
+    cancelled mid-wait; `items` is closed either way.
+    """
+    async def watch() -> None:
+        while not await request.is_disconnected():
+            await asyncio.sleep(poll_s)
+
+    watcher = asyncio.create_task(watch())
+    try:
+        while True:
+            step = asyncio.ensure_future(items.__anext__())
+            await asyncio.wait({step, watcher}, return_when=asyncio.FIRST_COMPLETED)
+            if not step.done():
+                step.cancel()
+                with suppress(asyncio.CancelledError):
+                    await step
+                return
+            try:
+                item = step.result()
+            except StopAsyncIteration:
+                return
+            yield item
+    finally:
+        watcher.cancel()
+        await items.aclose()
@@ -1,16 +1,21 @@
 from fastapi import APIRouter, HTTPException
 from app.models import MapRequest, MapResponse
-from app.services.timeline import generate_map
+from app.services.timeline import generate_map_async
+from app.services.rate_limit import ModelUnavailable
+from app.routes.common import request_text
 
 router = APIRouter(tags=["timeline"])
 
 @router.post("/map", response_model=MapResponse, summary="Get Contract Map")
-def get_contract_map(req: MapRequest) -> MapResponse:
+async def get_contract_map(req: MapRequest) -> MapResponse:
     """
-    Accepts {"contract_text": "..."} and returns structure[] and timeline[].
+    Accepts {"contract_text": "..."} or {"session_id": "..."} and returns structure[] and timeline[].
     """
+    text = await request_text(req.contract_text, req.session_id, req.block_ids)
     try:
-        return generate_map(req.contract_text)
+        return await generate_map_async(text, req.timeline_mode, req.summarize)
+    except ModelUnavailable:
+        raise
     except Exception as e:
         import traceback
         traceback.print_exc()  # print full stack trace to your terminal logs
@@ -0,0 +1,21 @@
+from fastapi import APIRouter
+from ..services.extraction_cache import get_extraction_cache
+from ..services.extractor import client_pool_stats
+from ..services.genai_client import call_stats, limiter_stats
+from ..services.llm_cache import get_llm_cache
+from ..services.workers import get_extraction_executor
+from ..storage import get_session_store
+
+router = APIRouter()
+
+@router.get("/metrics", summary="Cache and pipeline counters")
+def get_metrics():
+    return {
+        "extraction_cache": get_extraction_cache().stats(),
+        "extraction_queue": get_extraction_executor().stats(),
+        "documentai_clients": client_pool_stats(),
+        "sessions": get_session_store().stats(),
+        "llm_cache": get_llm_cache().stats(),
+        "llm_coalescing": call_stats(),
+        "llm_limiter": limiter_stats(),
+    }
@@ -1,17 +1,20 @@
 from fastapi import APIRouter, HTTPException
-from ..models import RewriteRequest, RewriteResponse
-from ..services.rewriter import rewrite_text
+from ..models import REWRITE_MAX_CHARS, RewriteRequest, RewriteResponse
+from ..services.rewriter import rewrite_text_async, rewrite_text_stream
+from ..services.rate_limit import ModelUnavailable
+from .common import request_text, sse, sse_response
 
 router = APIRouter()
 
 @router.post("/rewrite", response_model=RewriteResponse, tags=["rewrite"])
-def rewrite(req: RewriteRequest):
+async def rewrite(req: RewriteRequest):
+    text = await request_text(req.text, req.session_id, req.block_ids, max_chars=REWRITE_MAX_CHARS)
     try:
-        out, meta = rewrite_text(req.text, req.mode)
+        out, meta = await rewrite_text_async(text, req.mode)
         if not out.strip():
             raise HTTPException(status_code=400, detail="Empty output. Try a shorter or clearer selection.")
         return RewriteResponse(rewritten_text=out, meta=meta)
-    except HTTPException:
+    except (HTTPException, ModelUnavailable):
         raise
     except Exception as e:
         # Map common upstream issues to helpful messages
@@ -21,5 +24,27 @@ def rewrite(req: RewriteRequest):
         if "PERMISSION_DENIED" in msg or "403" in msg:
             raise HTTPException(status_code=502, detail="Permission denied for Vertex AI; verify roles and billing.")
         if "Not Found" in msg or "404" in msg:
-            raise HTTPException(status_code=502, detail="Model or location not found; use VERTEX_GENAI_LOCATION=global or us-central1.")
+            raise HTTPException(status_code=502, detail="Model or location not found; use VAI_GCP_LOCATION=global or us-central1.")
         raise HTTPException(status_code=502, detail="Rewrite service temporarily unavailable.")
+
+@router.post("/rewrite/stream", tags=["rewrite"], summary="Rewrite with server-sent events")
+async def rewrite_stream(req: RewriteRequest):
+    """
+    Same input as /rewrite, answered as text/event-stream:
+      event: chunk  {"index", "chunks"}     a new chunk starts
+      event: token  {"index", "text"}       rewritten text as it is generated (concatenate all)
+      event: meta   {...}                   same meta as /rewrite, last event on success
+      event: error  {"detail"}              generation failed mid-stream
+    """
+    text = await request_text(req.text, req.session_id, req.block_ids, max_chars=REWRITE_MAX_CHARS)
+
+    async def body():
+        try:
+            async for event, data in rewrite_text_stream(text, req.mode):
+                yield sse(event, data)
+        except ModelUnavailable as e:
+            yield sse("error", {"detail": str(e), "retry_after": e.retry_after})
+        except Exception:
+            yield sse("error", {"detail": "Rewrite service temporarily unavailable."})
+
+    return sse_response(body())
@@ -1,12 +1,21 @@
 from fastapi import APIRouter
-from pydantic import BaseModel
-from app.services.risk_radar.detector import generate_risk_radar_response
+from typing import Optional
+from pydantic import Field, model_validator
+from app.models import SessionRef, _require_text_or_session
+from app.services.risk_radar.detector import generate_risk_radar_response_async
+from app.routes.common import request_text
 
 router = APIRouter()
 
-class ClauseIn(BaseModel):
-    text: str
+class ClauseIn(SessionRef):
+    # No length cap: a whole contract is scanned in pieces
+    text: Optional[str] = Field(None, min_length=1)
+
+    @model_validator(mode="after")
+    def _check_source(self):
+        return _require_text_or_session(self, "text")
 
 @router.post("/risk/scan")
-def scan_clause(body: ClauseIn):
-    return generate_risk_radar_response(body.text)
+async def scan_clause(body: ClauseIn):
+    text = await request_text(body.text, body.session_id, body.block_ids)
+    return await generate_risk_radar_response_async(text)
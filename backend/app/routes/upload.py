@@ -1,32 +1,193 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from ..services.extractor import extract_text_and_blocks
+import asyncio
+import json
+import threading
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from ..models import UploadResponse
+from ..services.extractor import extract_text_and_blocks, iter_text_and_blocks, merge_parts
+from ..services.uploads import BadUpload, UploadTooLarge, receive_upload
+from ..services.workers import QueueFullError, get_extraction_executor
+from ..storage import SessionTooLarge, create_session
 
 router = APIRouter()
 
-@router.post("/upload")
-async def upload_contract(file: UploadFile = File(...)):
-    # Basic validation
-    if not file or not file.filename:
-        raise HTTPException(status_code=400, detail="No file provided")
+# Separator the extractor joins partial results' full_text with (stream mode rebuilds the same text)
+_PART_SEP = "\n"
+# How far past the previous clause a clause's text is looked for in full_text
+_SPAN_SLACK = 4096
+
+# The "file" form field, documented by hand since the body is parsed as it streams in
+_UPLOAD_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["file"],
+                    "properties": {"file": {"type": "string", "format": "binary"}},
+                }
+            }
+        },
+    }
+}
+
+async def _read_upload(request: Request):
+    try:
+        # Hash and size-check while the body arrives; large files are spooled to disk
+        # and handed over memory-mapped
+        return await receive_upload(request.headers, request.stream())
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except BadUpload as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _spans(full_text, blocks, base=0):
+    """
+    [start, end) of each block's text in full_text, shifted by `base`, in order;
+    None for a block whose text does not appear there verbatim (e.g. OCR
+    paragraphs that were de-hyphenated).
+    """
+    pos = 0
+    for b in blocks:
+        at = full_text.find(b["text"], pos, pos + len(b["text"]) + _SPAN_SLACK)
+        if at < 0:
+            yield None
+            continue
+        pos = at + len(b["text"])
+        yield base + at, base + pos
 
+def _compact(full_text, blocks):
+    """Describe each clause by its [start, end) span in full_text; clauses not found verbatim keep their text."""
+    clauses = []
+    for b, span in zip(blocks, _spans(full_text, blocks)):
+        if span is None:
+            clauses.append({"id": b["id"], "text": b["text"], "start": None, "end": None, "rewritten": None})
+        else:
+            clauses.append({"id": b["id"], "start": span[0], "end": span[1], "rewritten": None})
+    return clauses
+
+@router.post("/upload", response_model=UploadResponse, openapi_extra=_UPLOAD_BODY)
+async def upload_contract(request: Request, compact: bool = False):
+    """
+    Extract a contract and open a session for it.
+    With ?compact=true, clauses carry start/end offsets into full_text instead of repeating their text
+    (a clause whose text is not in full_text verbatim keeps it, with null offsets).
+    """
+    spool = await _read_upload(request)
+    executor = get_extraction_executor()
     try:
-        file_bytes = await file.read()
-        result = extract_text_and_blocks(
-            file_bytes=file_bytes,
-            filename=file.filename,
-            content_type=file.content_type,
+        # Extraction blocks (gRPC, DOCX parsing, PDF parsing): keep it off the event loop
+        result, wait_ms = await executor.run(
+            extract_text_and_blocks,
+            file_bytes=spool.buffer(),
+            filename=spool.filename,
+            content_type=spool.content_type,
+            digest=spool.digest,
         )
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Extraction failed: {e}")
+    finally:
+        spool.close()
 
-    # Normalize to clauses list expected by UI
-    clauses = [{"id": b["id"], "text": b["text"], "rewritten": None} for b in result["blocks"]]
+    # Keep the document server-side; later calls send session_id instead of the text
+    try:
+        session_id = create_session(spool.filename, result["full_text"], result["blocks"])
+    except SessionTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+    full_text = result["full_text"]
+    if compact:
+        clauses = _compact(full_text, result["blocks"])
+    else:
+        # Normalize to clauses list expected by UI
+        clauses = [{"id": b["id"], "text": b["text"], "rewritten": None} for b in result["blocks"]]
 
     # ===== Return JSON Object =====
     return {
-        "filename": file.filename,
-        "content_type": file.content_type,
-        "full_text": result["full_text"],
+        "session_id": session_id,
+        "filename": spool.filename,
+        "content_type": spool.content_type,
+        "full_text": full_text,
         "clauses": clauses,
         "count": len(clauses),
+        "queue": {"wait_ms": round(wait_ms, 1), "depth": executor.depth},
     }
+
+@router.post("/upload/stream", summary="Upload with NDJSON clause streaming", openapi_extra=_UPLOAD_BODY)
+async def upload_contract_stream(request: Request):
+    """
+    Same extraction as /upload, streamed as application/x-ndjson, one JSON object per line:
+      {"event": "meta", "filename", "content_type", "queue": {...}}
+      {"event": "clause", "id", "text", "type", "page", "start", "end"}   as each page/shard finishes
+      {"event": "done", "session_id", "count", "queue": {...}}           or {"event": "error", "detail"}
+    start/end are offsets into the session's full text, the same full_text /upload returns
+    (null when the clause text is not in it verbatim).
+    """
+    spool = await _read_upload(request)
+    executor = get_extraction_executor()
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    stop = threading.Event()
+
+    def produce():
+        # Runs on an extraction worker; hands each partial result to the event loop
+        parts = []
+        try:
+            if stop.is_set():
+                return None  # client left while the job was queued
+            for part in iter_text_and_blocks(spool.buffer(), spool.filename, spool.content_type, spool.digest):
+                if stop.is_set():
+                    return None  # client went away; closing the generator cancels pending shards
+                parts.append(part)
+                loop.call_soon_threadsafe(queue.put_nowait, part)
+            return parts
+        finally:
+            spool.close()
+            loop.call_soon_threadsafe(queue.put_nowait, None)
+
+    try:
+        job = executor.submit(produce)
+    except QueueFullError as e:
+        spool.close()
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+
+    async def body():
+        meta = {"event": "meta", "filename": spool.filename, "content_type": spool.content_type,
+                "queue": {"depth": executor.depth}}
+        yield json.dumps(meta) + "\n"
+        base = 0
+        try:
+            while True:
+                part = await queue.get()
+                if part is None:
+                    break
+                # Offsets into the merged text: earlier non-empty parts plus a separator each
+                for b, span in zip(part["blocks"], _spans(part["full_text"], part["blocks"], base)):
+                    start, end = span or (None, None)
+                    yield json.dumps({"event": "clause", **b, "start": start, "end": end}) + "\n"
+                if part["full_text"]:
+                    base += len(part["full_text"]) + len(_PART_SEP)
+            try:
+                parts, wait_ms = await job
+            except Exception as e:
+                yield json.dumps({"event": "error", "detail": f"Extraction failed: {e}"}) + "\n"
+                return
+            merged = merge_parts(parts)
+            try:
+                session_id = create_session(spool.filename, merged["full_text"], merged["blocks"])
+            except SessionTooLarge as e:
+                yield json.dumps({"event": "error", "detail": str(e)}) + "\n"
+                return
+            yield json.dumps({"event": "done", "session_id": session_id, "count": len(merged["blocks"]),
+                              "queue": {"wait_ms": round(wait_ms, 1)}}) + "\n"
+        finally:
+            stop.set()
+            if not job.done():
+                # Client went away: the worker stops at its next part; collect its outcome
+                job.add_done_callback(lambda f: f.cancelled() or f.exception())
+
+    return StreamingResponse(body(), media_type="application/x-ndjson")
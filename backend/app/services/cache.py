@@ -0,0 +1,244 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+def json_size(value: Any) -> int:
+    """Approximate in-memory cost of a JSON-able value (its serialized length)."""
+    try:
+        return len(json.dumps(value, ensure_ascii=False, default=str))
+    except Exception:
+        return 0
+
+
+class LRUCache:
+    """
+    Thread-safe in-memory LRU with optional per-entry TTL and byte budget.
+    Entries past `ttl` seconds are treated as misses and dropped on access.
+    """
+
+    def __init__(
+        self,
+        max_items: int = 128,
+        max_bytes: int = 0,
+        ttl: float = 0,
+        sizeof: Callable[[Any], int] = json_size,
+    ):
+        self.max_items = max(1, int(max_items))
+        self.max_bytes = max(0, int(max_bytes))   # 0 = no byte budget
+        self.ttl = max(0.0, float(ttl))           # 0 = never expires
+        self._sizeof = sizeof
+        self._data: "OrderedDict[str, Tuple[Any, float, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.rejections = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: str) -> bool:
+        return self.peek(key) is not None
+
+    def _drop(self, key: str) -> None:
+        _, _, size = self._data.pop(key)
+        self._bytes -= size
+
+    def _expired(self, stored_at: float, now: float) -> bool:
+        return bool(self.ttl) and now - stored_at > self.ttl
+
+    def peek(self, key: str) -> Optional[Any]:
+        """Read without touching recency or counters."""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or self._expired(item[1], time.monotonic()):
+                return None
+            return item[0]
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            if self._expired(item[1], time.monotonic()):
+                self._drop(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def set(self, key: str, value: Any) -> bool:
+        """Store value; False (nothing stored) when it alone is over the byte budget."""
+        size = self._sizeof(value) if self.max_bytes else 0
+        if self.max_bytes and size > self.max_bytes:
+            # Would evict everything else and still not fit
+            with self._lock:
+                self.rejections += 1
+            return False
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+            self._data[key] = (value, time.monotonic(), size)
+            self._bytes += size
+            while len(self._data) > self.max_items or (self.max_bytes and self._bytes > self.max_bytes):
+                oldest = next(iter(self._data))
+                self._drop(oldest)
+                self.evictions += 1
+        return True
+
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            if key not in self._data:
+                return False
+            self._drop(key)
+            return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "items": len(self._data),
+                "bytes": self._bytes,
+                "max_items": self.max_items,
+                "max_bytes": self.max_bytes,
+                "ttl_s": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "rejections": self.rejections,
+            }
+
+
+class DiskCache:
+    """
+    JSON-file store under `directory` with a total size cap.
+    Least recently used files go first once the cap is exceeded. The directory is
+    scanned once at open (oldest mtime first); after that a running index of file
+    sizes in recency order keeps writes and stats from listing it again.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 256 * 1024 * 1024, ttl: float = 0):
+        self.directory = directory
+        self.max_bytes = max(0, int(max_bytes))
+        self.ttl = max(0.0, float(ttl))
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+        # path -> size, least recently used first
+        self._sizes: "OrderedDict[str, int]" = OrderedDict(
+            (path, size) for _, size, path in sorted(self._scan())
+        )
+        self._bytes = sum(self._sizes.values())
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _scan(self):
+        out = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not entry.name.endswith(".json"):
+                    continue
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                out.append((st.st_mtime, st.st_size, entry.path))
+        return out
+
+    def _track(self, path: str, size: Optional[int]) -> None:
+        """Record path as most recently used with `size`, or forget it (size None). Holds the lock."""
+        self._bytes -= self._sizes.pop(path, 0)
+        if size is not None:
+            self._sizes[path] = size
+            self._bytes += size
+
+    def get(self, key: str) -> Optional[Any]:
+        path = self._path(key)
+        try:
+            if self.ttl and time.time() - os.path.getmtime(path) > self.ttl:
+                os.remove(path)
+                raise FileNotFoundError(path)
+            with open(path, "r", encoding="utf-8") as f:
+                size = os.fstat(f.fileno()).st_size
+                value = json.load(f)
+            os.utime(path)  # refresh recency for the next open's scan
+        except (OSError, ValueError):
+            with self._lock:
+                self._track(path, None)
+                self.misses += 1
+            return None
+        with self._lock:
+            self._track(path, size)
+            self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            data = json.dumps(value, ensure_ascii=False).encode("utf-8")
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)  # atomic, so concurrent readers never see partial JSON
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            return
+        with self._lock:
+            self._track(path, len(data))
+            self._enforce_cap_locked()
+
+    def delete(self, key: str) -> bool:
+        path = self._path(key)
+        with self._lock:
+            self._track(path, None)
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+    def _enforce_cap_locked(self) -> None:
+        if not self.max_bytes:
+            return
+        while self._bytes > self.max_bytes and self._sizes:
+            path, size = self._sizes.popitem(last=False)
+            self._bytes -= size
+            try:
+                os.remove(path)
+            except OSError:
+                continue  # already gone (another process, or deleted by hand)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "directory": self.directory,
+                "items": len(self._sizes),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
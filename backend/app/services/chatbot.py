@@ -1,8 +1,10 @@
 # backend/app/services/chatbot_service.py
 from __future__ import annotations
 
-from google.genai.types import GenerateContentConfig
-from .genai_client import get_client
+import re
+from typing import AsyncIterator, List, Union
+
+from .genai_client import generate_content_async, generate_content_stream_async
 from app.models import AskResponse
 
 # Low-latency, Vertex-supported Gemini model id
@@ -15,14 +17,8 @@ SYSTEM_INSTRUCTIONS = (
     "Return a single concise sentence; do not repeat lines or include quoted echoes."
 )
 
-def answer_question(question: str, context: str, temperature: float = 0.2) -> AskResponse:
-    """
-    Single-turn QA grounded on the given contract context.
-    """
-    client = get_client()
-    cfg = GenerateContentConfig(temperature=temperature)
-
-    prompt = f"""{SYSTEM_INSTRUCTIONS}
+def _build_prompt(question: str, context: str) -> str:
+    return f"""{SYSTEM_INSTRUCTIONS}
 
 Contract Text:
 ---
@@ -34,10 +30,54 @@ Question: {question}
 Answer:
 """.strip()
 
-    resp = client.models.generate_content(
-        model=MODEL_ID,
-        contents=prompt,
-        config=cfg,
-    )
-    answer = (getattr(resp, "text", "") or "").strip()
-    return AskResponse(answer=answer)
+# Quoted spans in the answer: "straight", “curly” or 'single' quotes, at least a few words long
+_QUOTE_RE = re.compile(r'"([^"\n]{8,})"|“([^”\n]{8,})”|(?<!\w)\'([^\'\n]{8,})\'(?!\w)')
+_WS_RE = re.compile(r"\s+")
+MAX_REFERENCES = 3
+
+def _squash(text: str) -> str:
+    return _WS_RE.sub(" ", text).strip().lower()
+
+def extract_references(answer: str, context: str) -> List[str]:
+    """
+    The prompt asks for 1-3 supporting quotes; keep the quoted spans that really
+    occur in the contract (whitespace/case-insensitive), in answer order.
+    """
+    haystack = _squash(context)
+    refs: List[str] = []
+    seen = set()
+    for m in _QUOTE_RE.finditer(answer or ""):
+        quote = next(g for g in m.groups() if g).strip().strip(".,;: ")
+        key = _squash(quote)
+        if key and key not in seen and key in haystack:
+            seen.add(key)
+            refs.append(quote)
+            if len(refs) >= MAX_REFERENCES:
+                break
+    return refs
+
+def _response(answer: str, context: str) -> AskResponse:
+    answer = answer.strip()
+    return AskResponse(answer=answer, references=extract_references(answer, context))
+
+async def answer_question_async(question: str, context: str, temperature: float = 0.2) -> AskResponse:
+    """
+    Single-turn QA grounded on the given contract context (no thread held while the model runs).
+    """
+    text = await generate_content_async(_build_prompt(question, context), model=MODEL_ID, temperature=temperature)
+    return _response(text, context)
+
+async def answer_question_stream(question: str, context: str, temperature: float = 0.2) -> AsyncIterator[Union[str, AskResponse]]:
+    """
+    Yields answer text pieces as they are generated, then the full AskResponse.
+    Closing the generator early closes the upstream stream.
+    """
+    parts: List[str] = []
+    stream = generate_content_stream_async(_build_prompt(question, context), model=MODEL_ID, temperature=temperature)
+    try:
+        async for piece in stream:
+            parts.append(piece)
+            yield piece
+    finally:
+        await stream.aclose()
+    yield _response("".join(parts), context)
@@ -0,0 +1,269 @@
+from __future__ import annotations
+
+import re
+import zlib
+from dataclasses import dataclass
+from typing import List
+
+# Token estimate: ~4 characters per model token, and never less than one per word
+CHARS_PER_TOKEN = 4
+
+# Boundary priorities, best first
+PARAGRAPH, LINE, SENTENCE, WORD = 3, 2, 1, 0
+
+# The last break of a kind before the end position: the greedy prefix runs to the
+# end and backtracks to the nearest match
+_LAST_PARAGRAPH_RE = re.compile(r"(?s).*(\n[ \t\r\f\v]*\n)")
+_LAST_SENTENCE_RE = re.compile(r"(?s).*([.!?:;][\"')\]”’]*\s)")
+_LAST_SPACE_RE = re.compile(r"(?s).*(\s)")
+_CONTEXT_RE = re.compile(r"[.!?:;][\"')\]”’]*\s+|\n\s*")
+_SPACE_RE = re.compile(r"\s+")
+_NONSPACE_RE = re.compile(r"\S")
+
+
+@dataclass(frozen=True)
+class Chunk:
+    """
+    A span of the source text by offsets; nothing is copied until asked for.
+    [start, end) is the chunk body. [context_start, start) is the tail of the
+    previous chunk, for callers that want some surrounding context.
+    """
+    start: int
+    end: int
+    context_start: int
+    tokens: int
+
+    def text(self, source: str) -> str:
+        return source[self.start:self.end]
+
+    def context(self, source: str) -> str:
+        return source[self.context_start:self.start]
+
+    def with_context(self, source: str) -> str:
+        return source[self.context_start:self.end]
+
+
+# The whitespace characters the break patterns above treat as word separators
+_WHITESPACE = " \t\n\r\x0b\x0c"
+
+
+def _spaces(text: str, start: int, end: int) -> int:
+    """Whitespace characters (each may separate two words) in text[start:end]."""
+    span = text[start:end]
+    return sum(span.count(c) for c in _WHITESPACE)
+
+
+def _estimate(text: str, start: int, end: int) -> int:
+    return max(-(-(end - start) // CHARS_PER_TOKEN), _spaces(text, start, end) + 1)
+
+
+def count_tokens(text: str) -> int:
+    """Token estimate with the same rule the chunker budgets with."""
+    text = (text or "").strip()
+    return _estimate(text, 0, len(text)) if text else 0
+
+
+class _Window:
+    """
+    The budget window of one chunk: [start, limit) is the longest span from start
+    within max_tokens. Whitespace is counted once: the estimate for an end inside
+    the window subtracts the (short) tail, and the next window starts from the
+    tail's count instead of recounting it.
+    """
+
+    def __init__(self, text: str, start: int, end: int, max_tokens: int, counted_to: int, counted: int):
+        # counted = whitespace in [start, counted_to), carried over from the previous window
+        self.text, self.start = text, start
+        self._tail_end, self._tail = -1, 0
+        self.limit = min(end, start + max_tokens * CHARS_PER_TOKEN)
+        if counted_to <= self.limit:
+            self.spaces = counted + _spaces(text, counted_to, self.limit)
+        else:
+            self.spaces = _spaces(text, start, self.limit)
+        while True:
+            over = self.tokens(self.limit) - max_tokens
+            if over <= 0:
+                break
+            # Dropping a character removes at most one word; always keep one character
+            cut = max(start + 1, self.limit - over)
+            self.spaces -= _spaces(text, cut, self.limit)
+            self.limit = cut
+
+    def tail(self, end: int) -> int:
+        """Whitespace in [end, limit); the last answer is kept, it is asked twice per cut."""
+        if end >= self.limit:
+            return 0
+        if self._tail_end != end:
+            self._tail_end, self._tail = end, _spaces(self.text, end, self.limit)
+        return self._tail
+
+    def tokens(self, end: int) -> int:
+        return max(-(-(end - self.start) // CHARS_PER_TOKEN), self.spaces - self.tail(end) + 1)
+
+
+def _body_end(text: str, start: int, pos: int) -> int:
+    while pos > start and text[pos - 1].isspace():
+        pos -= 1
+    return pos
+
+
+# Candidates (single newlines, dots in "e.g." or "1.5") stepped over before the
+# backtracking regex takes over for the rest of the window
+_PROBES = 8
+_CLOSERS = "\"')]”’"
+
+
+def _last_paragraph(text: str, start: int, limit: int) -> int:
+    pos = text.rfind("\n", start, limit + 1)
+    for _ in range(_PROBES):
+        if pos <= start:
+            return -1
+        before = _body_end(text, start, pos)
+        # Another newline inside the whitespace run before this one: a blank line
+        if text.rfind("\n", before, pos) >= 0:
+            return before
+        pos = text.rfind("\n", start, before)
+    m = _LAST_PARAGRAPH_RE.match(text, start, pos + 1) if pos > start else None
+    return _body_end(text, start, m.start(1)) if m else -1
+
+
+def _last_sentence(text: str, start: int, limit: int) -> int:
+    pos = limit + 1
+    for _ in range(_PROBES):
+        mark = max(text.rfind(ch, start, pos) for ch in ".!?:;")
+        if mark < start:
+            return -1
+        end = mark + 1
+        while end < len(text) and text[end] in _CLOSERS:
+            end += 1
+        # The sentence keeps its closing punctuation and quotes
+        if end <= limit and end < len(text) and text[end].isspace():
+            return end
+        pos = mark
+    m = _LAST_SENTENCE_RE.match(text, start, pos)
+    return m.end(1) - 1 if m else -1
+
+
+def _last_break(text: str, start: int, limit: int, level: int) -> int:
+    """End of the chunk body at the last `level` break in [start, limit], or -1."""
+    if level == PARAGRAPH:
+        end = _last_paragraph(text, start, limit)
+    elif level == LINE:
+        pos = text.rfind("\n", start, limit + 1)
+        end = _body_end(text, start, pos) if pos > start else -1
+    elif level == SENTENCE:
+        end = _last_sentence(text, start, limit)
+    else:
+        pos = max(text.rfind(" ", start, limit + 1), text.rfind("\t", start, limit + 1), text.rfind("\n", start, limit + 1))
+        if pos <= start:
+            # Rarer separators (no-break spaces, form feeds, ...)
+            m = _LAST_SPACE_RE.match(text, start, min(limit + 1, len(text)))
+            pos = m.start(1) if m else -1
+        end = _body_end(text, start, pos) if pos > start else -1
+    return end if end > start else -1
+
+
+def _is_anchor(text: str, start: int, end: int, tokens: int, gap: int) -> bool:
+    # Content-defined cut: a stable hash of the unit decides, with odds scaled by its
+    # size so anchors come about every `gap` tokens whatever the unit granularity
+    return zlib.crc32(text[start:end].encode("utf-8", "surrogatepass")) % 4096 < 4096 * tokens // gap
+
+
+def _anchor_cut(text: str, start: int, limit: int, min_tokens: int, gap: int) -> int:
+    """End of the first sentence-or-larger unit past min_tokens that hashes to an anchor, or -1."""
+    unit = start
+    before = 0  # whitespace in [start, unit)
+    for m in _CONTEXT_RE.finditer(text, start, limit):
+        end = _body_end(text, unit, m.start() + len(m.group().rstrip()))
+        inside = _spaces(text, unit, end)
+        if end > unit and max(-(-(end - start) // CHARS_PER_TOKEN), before + inside + 1) >= min_tokens:
+            tokens = max(-(-(end - unit) // CHARS_PER_TOKEN), inside + 1)
+            if _is_anchor(text, unit, end, tokens, gap):
+                return end
+        before += inside + _spaces(text, end, m.end())
+        unit = m.end()
+    return -1
+
+
+def _context_start(text: str, start: int, end: int, overlap_tokens: int) -> int:
+    """Start of the last ~overlap_tokens of [start, end), snapped to a sentence or word start."""
+    pos = end - overlap_tokens * CHARS_PER_TOKEN
+    if pos <= start:
+        return start
+    m = _CONTEXT_RE.search(text, pos, end) or _SPACE_RE.search(text, pos, end)
+    return m.end() if m else end
+
+
+def chunk_text(
+    text: str,
+    max_tokens: int,
+    overlap_tokens: int = 0,
+    min_fill: float = 0.5,
+    content_defined: bool = False,
+) -> List[Chunk]:
+    """
+    Split `text` into chunks of at most `max_tokens` estimated tokens, in one
+    pass over span offsets.
+
+    A chunk closes at the best break it contains (paragraph > line > sentence >
+    word) that keeps it at least `min_fill` of the budget, so a paragraph break
+    at 60% wins over a sentence end at 95%. Each chunk is found by searching its
+    budget window backwards for the last break of each level, so the work is a
+    few C-level scans per chunk rather than per paragraph or word. A single
+    "word" longer than the budget is cut at the budget. With `overlap_tokens`,
+    each chunk's context_start reaches back about that many tokens into the
+    previous chunk.
+
+    With `content_defined`, a chunk past `min_fill` closes at the first sentence
+    or larger break whose preceding unit hashes to an anchor. Cuts then depend on
+    local content rather than on everything before them, so after an edit the
+    boundaries fall back in step at the next anchor and only the chunks around
+    the edit change.
+    """
+    max_tokens = max(1, int(max_tokens))
+    min_tokens = max(1, int(max_tokens * min_fill))
+    overlap_tokens = max(0, int(overlap_tokens))
+    anchor_gap = max(1, (max_tokens - min_tokens) // 2)
+    chunks: List[Chunk] = []
+
+    first = _NONSPACE_RE.search(text)
+    if first is None:
+        return chunks
+    end = len(text.rstrip())
+    start = context_start = first.start()
+    counted_to, counted = start, 0
+
+    while start < end:
+        window = _Window(text, start, end, max_tokens, counted_to, counted)
+        limit = window.limit
+        cut = -1
+        if content_defined:
+            cut = _anchor_cut(text, start, limit, min_tokens, anchor_gap)
+        if cut < 0 and limit == end:
+            cut = end
+        if cut < 0:
+            fallback = -1
+            for level in (PARAGRAPH, LINE, SENTENCE, WORD):
+                found = _last_break(text, start, limit, level)
+                if found < 0:
+                    continue
+                if window.tokens(found) >= min_tokens:
+                    cut = found
+                    break
+                fallback = max(fallback, found)
+            # Nothing reaches min_fill: the longest short chunk, else one "word"
+            # over the whole budget (e.g. an inline base64 blob) cut at the budget
+            cut = cut if cut > 0 else fallback if fallback > 0 else limit
+        tail = window.tail(cut)
+        chunks.append(Chunk(start, cut, context_start, window.tokens(cut)))
+        following = _NONSPACE_RE.search(text, cut, end)
+        if following is None:
+            break
+        # The tail past the next start is already counted
+        if following.start() < limit:
+            counted_to, counted = limit, tail - _spaces(text, cut, following.start())
+        else:
+            counted_to, counted = following.start(), 0
+        context_start = _context_start(text, start, cut, overlap_tokens) if overlap_tokens else following.start()
+        start = following.start()
+    return chunks
@@ -1,5 +1,6 @@
+import asyncio
 from typing import Dict, List, Optional
-from app.services.genai_client import generate_content
+from app.services.genai_client import generate_content_async
 from app.services.contextualizer.templates import UserContext, build_prompt
 from app.services.contextualizer.rag import SimpleFaissIndex
 
@@ -46,88 +47,92 @@ LEGAL_KNOWLEDGE_BASE = [
 
 # Initialize RAG index
 _rag_index: Optional[SimpleFaissIndex] = None
+# Created on first use, inside the running loop rather than at import
+_rag_index_lock: Optional[asyncio.Lock] = None
 
-def get_rag_index() -> SimpleFaissIndex:
-    """Get or create the RAG index with legal knowledge base."""
-    global _rag_index
+async def get_rag_index_async() -> SimpleFaissIndex:
+    """Get or create the RAG index with legal knowledge base; concurrent first requests share one embedding call."""
+    global _rag_index, _rag_index_lock
     if _rag_index is None:
-        _rag_index = SimpleFaissIndex.from_texts(LEGAL_KNOWLEDGE_BASE)
+        if _rag_index_lock is None:
+            _rag_index_lock = asyncio.Lock()
+        async with _rag_index_lock:
+            if _rag_index is None:
+                _rag_index = await SimpleFaissIndex.from_texts_async(LEGAL_KNOWLEDGE_BASE)
     return _rag_index
 
-def get_rag_hints(contract_type: Optional[str], clause_text: str) -> List[str]:
+def _search_query(contract_type: Optional[str], clause_text: str) -> str:
+    # Create search query combining contract type and clause content
+    if contract_type:
+        return f"{contract_type} contract {clause_text}"
+    return clause_text
+
+async def get_rag_hints_async(contract_type: Optional[str], clause_text: str) -> List[str]:
     """Get relevant legal hints using RAG based on contract type and clause content."""
     try:
-        rag_index = get_rag_index()
-        
-        # Create search query combining contract type and clause content
-        search_query = clause_text
-        if contract_type:
-            search_query = f"{contract_type} contract {clause_text}"
-        
+        rag_index = await get_rag_index_async()
         # Search for relevant knowledge
-        results = rag_index.search(search_query, k=3)
-        
-        # Extract just the text from results
-        hints = [result[0] for result in results if result[0]]
-        
-        # Fallback to contract-type specific hints if RAG fails
-        if not hints and contract_type:
-            fallback_hints = {
-                "lease": [
-                    "Security deposits are typically capped by state law; verify local limits.",
-                    "Landlords must provide habitable premises and respect tenant privacy rights.",
-                    "Rent increase limitations may apply depending on jurisdiction and lease terms."
-                ],
-                "employment": [
-                    "Non-compete clauses may be unenforceable in some jurisdictions.",
-                    "Confidentiality obligations can survive termination; clarify scope.",
-                    "At-will employment allows termination without cause unless contract specifies otherwise."
-                ],
-                "mortgage": [
-                    "Interest rates must comply with usury laws and state regulations.",
-                    "Late fees must be reasonable and not constitute penalties.",
-                    "Acceleration clauses allow full payment demand upon default."
-                ],
-                "saas": [
-                    "Data privacy compliance required under GDPR, CCPA, and other laws.",
-                    "Service level agreements define uptime and performance expectations.",
-                    "Intellectual property licensing clarifies scope of use and restrictions."
-                ]
-            }
-            hints = fallback_hints.get(contract_type.lower(), [])[:3]
-        
-        return hints[:3]  # Limit to 3 hints
-        
+        results = await rag_index.search_async(_search_query(contract_type, clause_text), k=3)
+        return _hints_from_results(contract_type, results)
     except Exception as e:
         print(f"RAG search failed: {e}")
         # Return empty list if RAG fails
         return []
 
-def generate_contextualized_explanation(
-    clause_text: str,
-    ctx_dict: Dict
-) -> Dict:
-    """Generate contextualized explanation using dynamic RAG."""
-    ctx = UserContext(
+def _hints_from_results(contract_type: Optional[str], results) -> List[str]:
+    # Extract just the text from results
+    hints = [result[0] for result in results if result[0]]
+    
+    # Fallback to contract-type specific hints if RAG fails
+    if not hints and contract_type:
+        fallback_hints = {
+            "lease": [
+                "Security deposits are typically capped by state law; verify local limits.",
+                "Landlords must provide habitable premises and respect tenant privacy rights.",
+                "Rent increase limitations may apply depending on jurisdiction and lease terms."
+            ],
+            "employment": [
+                "Non-compete clauses may be unenforceable in some jurisdictions.",
+                "Confidentiality obligations can survive termination; clarify scope.",
+                "At-will employment allows termination without cause unless contract specifies otherwise."
+            ],
+            "mortgage": [
+                "Interest rates must comply with usury laws and state regulations.",
+                "Late fees must be reasonable and not constitute penalties.",
+                "Acceleration clauses allow full payment demand upon default."
+            ],
+            "saas": [
+                "Data privacy compliance required under GDPR, CCPA, and other laws.",
+                "Service level agreements define uptime and performance expectations.",
+                "Intellectual property licensing clarifies scope of use and restrictions."
+            ]
+        }
+        hints = fallback_hints.get(contract_type.lower(), [])[:3]
+    
+    return hints[:3]  # Limit to 3 hints
+
+def _user_context(ctx_dict: Dict) -> UserContext:
+    return UserContext(
         role=ctx_dict.get("role", "reader"),
         location=ctx_dict.get("location"),
         contract_type=ctx_dict.get("contract_type"),
         interests=ctx_dict.get("interests"),
         tone=ctx_dict.get("tone", "plain"),
     )
-    
-    # Get dynamic hints using RAG
-    hints = get_rag_hints(ctx.contract_type, clause_text)
-    
-    # Build prompt with dynamic context
-    prompt = build_prompt(clause_text, ctx, hints=hints)
-    
-    # Generate explanation
-    text = generate_content(prompt)
-    
+
+def _explanation(clause_text: str, ctx_dict: Dict, text: Optional[str], hints: List[str]) -> Dict:
     return {
         "clause": clause_text,
         "context": ctx_dict,
         "explanation": text or "For you, this means… (no response)",
         "used_hints": hints,
     }
+
+async def generate_contextualized_explanation_async(clause_text: str, ctx_dict: Dict) -> Dict:
+    """Generate contextualized explanation using dynamic RAG."""
+    ctx = _user_context(ctx_dict)
+    # Get dynamic hints using RAG
+    hints = await get_rag_hints_async(ctx.contract_type, clause_text)
+    # Build prompt with dynamic context and generate the explanation
+    text = await generate_content_async(build_prompt(clause_text, ctx, hints=hints))
+    return _explanation(clause_text, ctx_dict, text, hints)
@@ -1,32 +1,37 @@
 from __future__ import annotations
-from typing import List, Tuple, Optional
-import numpy as np
+from typing import TYPE_CHECKING, List, Tuple, Optional
 
-try:
-    import faiss  # pip install faiss-cpu
-except Exception:  # pragma: no cover
-    faiss = None
+from app.services.genai_client import embed_content_async
 
-from app.services.genai_client import get_client
+if TYPE_CHECKING:
+    import numpy as np
+
+# numpy and faiss are imported when the first index is built, not at app start
+def _faiss():
+    try:
+        import faiss  # pip install faiss-cpu
+        return faiss
+    except Exception:  # pragma: no cover
+        return None
 
 EMBED_MODEL = "gemini-embedding-001"  # can be overridden via env if desired
 
-def embed_texts(texts: List[str]) -> np.ndarray:
-    """
-    Returns an array of shape (n, d). Uses Gemini embeddings.
-    """
-    client = get_client()
-    # The Google GenAI SDK provides models.embed_content per docs
-    res = client.models.embed_content(model=EMBED_MODEL, contents=texts)
+def _to_matrix(res) -> np.ndarray:
+    import numpy as np
     # SDK returns a list of embeddings under res.embeddings
     vecs = [np.array(e.values, dtype="float32") if hasattr(e, "values") else np.array(e, dtype="float32")
             for e in getattr(res, "embeddings", [])]
     return np.vstack(vecs) if vecs else np.zeros((0, 768), dtype="float32")
 
+async def embed_texts_async(texts: List[str]) -> np.ndarray:
+    res = await embed_content_async(texts, model=EMBED_MODEL)
+    return _to_matrix(res)
+
 class SimpleFaissIndex:
     def __init__(self, dim: int, items: List[str], vecs: np.ndarray):
         self.items = items
         self.vecs = vecs.astype("float32")
+        faiss = _faiss()
         if faiss is None:
             self.index = None
         else:
@@ -34,20 +39,23 @@ class SimpleFaissIndex:
             self.index.add(self.vecs)
 
     @classmethod
-    def from_texts(cls, texts: List[str]) -> "SimpleFaissIndex":
-        vecs = embed_texts(texts)
-        dim = vecs.shape[14] if vecs.size else 768
+    async def from_texts_async(cls, texts: List[str]) -> "SimpleFaissIndex":
+        vecs = await embed_texts_async(texts)
+        dim = vecs.shape[1] if vecs.size else 768
         return cls(dim, texts, vecs)
 
-    def search(self, query: str, k: int = 3) -> List[Tuple[str, float]]:
-        if self.index is None:
-            return []
-        q = embed_texts([query])
+    def _lookup(self, q: np.ndarray, k: int) -> List[Tuple[str, float]]:
         if q.size == 0:
             return []
         D, I = self.index.search(q.astype("float32"), k)
         hits = []
-        for idx, dist in zip(I, D):
+        # One query row: results are I[0] / D[0]
+        for idx, dist in zip(I[0], D[0]):
             if 0 <= idx < len(self.items):
                 hits.append((self.items[idx], float(dist)))
         return hits
+
+    async def search_async(self, query: str, k: int = 3) -> List[Tuple[str, float]]:
+        if self.index is None:
+            return []
+        return self._lookup(await embed_texts_async([query]), k)
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from typing import Any, Dict, Optional
+
+from .cache import DiskCache, LRUCache
+
+# ===== Config =====
+CACHE_ENABLED = (os.getenv("EXTRACTION_CACHE_ENABLED") or "1").strip().lower() not in {"0", "false", "no"}
+MEMORY_ITEMS = int(os.getenv("EXTRACTION_CACHE_ITEMS") or 64)
+MEMORY_MAX_MB = int(os.getenv("EXTRACTION_CACHE_MAX_MB") or 128)
+DISK_DIR = os.getenv("EXTRACTION_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "genx-extraction-cache")
+DISK_MAX_MB = int(os.getenv("EXTRACTION_CACHE_DISK_MB") or 512)
+
+
+def content_digest(file_bytes) -> str:
+    # Accepts any bytes-like buffer (bytes, mmap, memoryview)
+    return hashlib.sha256(file_bytes).hexdigest()
+
+
+def cache_key(digest: str, config: Dict[str, Any]) -> str:
+    """
+    Content-addressed key: sha256 of the file bytes plus everything that changes
+    the extraction output (processor, chunking options, MIME, pipeline version).
+    """
+    cfg = json.dumps(config, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(f"{digest}|{cfg}".encode("utf-8")).hexdigest()
+
+
+class ExtractionCache:
+    """
+    Two-tier cache for extraction results: an in-memory LRU (item count and byte
+    budget) in front of a size-capped disk store. Disk hits are promoted back into memory.
+    """
+
+    def __init__(
+        self,
+        memory_items: int = MEMORY_ITEMS,
+        memory_max_mb: int = MEMORY_MAX_MB,
+        disk_dir: Optional[str] = DISK_DIR,
+        disk_max_mb: int = DISK_MAX_MB,
+    ):
+        self.memory = LRUCache(max_items=memory_items, max_bytes=memory_max_mb * 1024 * 1024)
+        self.disk: Optional[DiskCache] = None
+        if disk_dir and disk_max_mb > 0:
+            try:
+                self.disk = DiskCache(disk_dir, max_bytes=disk_max_mb * 1024 * 1024)
+            except OSError:
+                self.disk = None  # read-only FS etc.: run memory-only
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        value = self.memory.get(key)
+        if value is None and self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                self.memory.set(key, value)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            "enabled": CACHE_ENABLED,
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / total, 4) if total else 0.0,
+            "memory": self.memory.stats(),
+            "disk": self.disk.stats() if self.disk is not None else None,
+        }
+
+
+_cache: Optional[ExtractionCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_extraction_cache() -> ExtractionCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ExtractionCache()
+    return _cache
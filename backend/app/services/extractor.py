@@ -1,11 +1,21 @@
+from __future__ import annotations
+
 from dotenv import load_dotenv
-from google.cloud import documentai_v1 as documentai
-from google.oauth2 import service_account
-from typing import Dict, Any
-import tempfile
-from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Dict, Any, Iterable, Iterator, List, Optional, Sequence, Tuple
+from .extraction_cache import CACHE_ENABLED, cache_key, content_digest, get_extraction_cache
+from .docx_extractor import extract_docx
+from .pdf_text import MIN_PAGE_CHARS, has_usable_text, open_pdf, page_paragraphs, read_text_layer
+from .uploads import Buffer
+import codecs
+import io
 import os
 import re
+import threading
+
+if TYPE_CHECKING:  # the SDK is imported on first use, not at app start
+    from google.cloud import documentai_v1 as documentai
+    from pypdf import PdfReader
 
 load_dotenv()
 
@@ -16,30 +26,74 @@ PROJECT_ID = os.getenv("GCP_PROJECT_ID")
 LOCATION = os.getenv("DAI_GCP_LOCATION")
 PROCESSOR_ID = os.getenv("GCP_PROCESSOR_ID")
 
-# --- Fail fast with clear messages ---
-assert GOOGLE_APPLICATION_CREDENTIALS, "Missing GOOGLE_APPLICATION_CREDENTIALS in .env"
-if not os.getenv("GOOGLE_CREDENTIALS_BASE64"):  # Running locally
-    assert os.path.exists(GOOGLE_APPLICATION_CREDENTIALS), f"Service account key not found at: {GOOGLE_APPLICATION_CREDENTIALS}"
-assert PROJECT_ID,  "Missing GCP_PROJECT_ID in .env"
-assert LOCATION,    "Missing GCP_LOCATION in .env"
-assert PROCESSOR_ID,"Missing GCP_PROCESSOR_ID in .env"
+def config_errors() -> List[str]:
+    """Problems with the Document AI settings ([] when usable). Checked on first use, not at import."""
+    errors = []
+    if not GOOGLE_APPLICATION_CREDENTIALS:
+        errors.append("Missing GOOGLE_APPLICATION_CREDENTIALS in .env")
+    elif not os.getenv("GOOGLE_CREDENTIALS_BASE64") and not os.path.exists(GOOGLE_APPLICATION_CREDENTIALS):  # Running locally
+        errors.append(f"Service account key not found at: {GOOGLE_APPLICATION_CREDENTIALS}")
+    if not PROJECT_ID:
+        errors.append("Missing GCP_PROJECT_ID in .env")
+    if not LOCATION:
+        errors.append("Missing DAI_GCP_LOCATION in .env")
+    if not PROCESSOR_ID:
+        errors.append("Missing GCP_PROCESSOR_ID in .env")
+    return errors
+
+def _require_config() -> None:
+    # Only OCR needs these; TXT/DOCX and text-layer PDF pages work without them
+    errors = config_errors()
+    if errors:
+        raise RuntimeError("Document AI is not configured: " + "; ".join(errors))
+
+def _dai():
+    from google.cloud import documentai_v1
+    return documentai_v1
 
 PDF_MIME = "application/pdf"
 TXT_MIME = "text/plain"
 DOCX_MIME = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
 SUPPORTED_IMAGE_MIMES = {"image/jpeg", "image/png", "image/tiff", "image/gif"}
 
+# Layout Parser chunking options (also part of the extraction cache key)
+CHUNK_SIZE = 1000
+INCLUDE_ANCESTOR_HEADINGS = True
+# Large PDFs are split into page shards processed concurrently (0 disables sharding)
+SHARD_PAGES = int(os.getenv("DAI_SHARD_PAGES") or 15)
+SHARD_WORKERS = int(os.getenv("DAI_SHARD_WORKERS") or 4)
+# Born-digital PDF pages are read from their embedded text layer; only scanned pages are OCR'd
+TEXT_LAYER_ENABLED = (os.getenv("TEXT_LAYER_ENABLED") or "1").strip().lower() not in {"0", "false", "no"}
+# Bump whenever the block format produced below changes, so cached results are not reused
+PIPELINE_VERSION = 3
+
 # ===== GCP Client Setup =====
 def _processor_name() -> str:
     return f"projects/{PROJECT_ID}/locations/{LOCATION}/processors/{PROCESSOR_ID}"
 
-def _client() -> documentai.DocumentProcessorServiceClient:
+DAI_CLIENT_POOL_SIZE = int(os.getenv("DAI_CLIENT_POOL_SIZE") or 2)
+
+_credentials = None
+_credentials_lock = threading.Lock()
+
+def _load_credentials():
+    # Read the service-account JSON once per process
+    global _credentials
+    if _credentials is None:
+        with _credentials_lock:
+            if _credentials is None:
+                from google.oauth2 import service_account
+                _credentials = service_account.Credentials.from_service_account_file(GOOGLE_APPLICATION_CREDENTIALS)
+    return _credentials
+
+def _build_client() -> documentai.DocumentProcessorServiceClient:
     """
     Build a client that uses either:
       - LOCATION as a short region code (e.g., 'eu' -> 'eu-documentai.googleapis.com')
       - or LOCATION already set to a full endpoint 'eu-documentai.googleapis.com'
     """
-    credentials = service_account.Credentials.from_service_account_file(GOOGLE_APPLICATION_CREDENTIALS)
+    _require_config()
+    credentials = _load_credentials()
 
     # If LOCATION already looks like an endpoint, use it directly
     if "documentai.googleapis.com" in LOCATION:
@@ -48,87 +102,216 @@ def _client() -> documentai.DocumentProcessorServiceClient:
         api_endpoint = f"{LOCATION}-documentai.googleapis.com"
 
     client_options = {"api_endpoint": api_endpoint}
-    return documentai.DocumentProcessorServiceClient(
+    return _dai().DocumentProcessorServiceClient(
         credentials=credentials,
         client_options=client_options
     )
 
+class _ClientPool:
+    """
+    Process-wide set of long-lived Document AI clients, handed out round-robin.
+    gRPC channels are thread-safe, so a client can serve many threads at once;
+    several channels just spread concurrent shards over more HTTP/2 connections.
+    A client whose channel was closed is replaced via `invalidate`.
+    """
+
+    def __init__(self, size: int):
+        self.size = max(1, size)
+        self._clients: List[Optional[documentai.DocumentProcessorServiceClient]] = [None] * self.size
+        self._next = 0
+        self._lock = threading.Lock()
+        self.built = 0
+        self.rebuilt = 0
+
+    def get(self) -> documentai.DocumentProcessorServiceClient:
+        with self._lock:
+            slot = self._next
+            self._next = (self._next + 1) % self.size
+            client = self._clients[slot]
+            if client is None:
+                client = self._clients[slot] = _build_client()
+                self.built += 1
+            return client
+
+    def invalidate(self, client: documentai.DocumentProcessorServiceClient) -> None:
+        # Only drop it from the pool: other threads may still be using this client,
+        # and its channel is closed when the last of them lets go of it
+        with self._lock:
+            for i, c in enumerate(self._clients):
+                if c is client:
+                    self._clients[i] = None
+                    self.rebuilt += 1
+
+    def warm(self, connect_timeout: float = 5.0) -> None:
+        """Build every client and wait (bounded) for its channel to connect."""
+        import grpc
+        for _ in range(self.size):
+            client = self.get()
+            try:
+                grpc.channel_ready_future(client.transport.grpc_channel).result(timeout=connect_timeout)
+            except Exception:
+                pass  # unreachable right now; the first request will connect lazily
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "size": self.size,
+                "live": sum(c is not None for c in self._clients),
+                "built": self.built,
+                "rebuilt": self.rebuilt,
+            }
+
+_pool = _ClientPool(DAI_CLIENT_POOL_SIZE)
+
+def _client() -> documentai.DocumentProcessorServiceClient:
+    return _pool.get()
+
+def warm_client_pool() -> None:
+    """
+    Called by the startup warmup so the first upload does not pay SDK import,
+    credential and TLS setup. Raises on bad config; requests then build clients on demand.
+    """
+    _pool.warm()
+
+def client_pool_stats() -> Dict[str, Any]:
+    return _pool.stats()
+
+def _is_broken_channel(exc: Exception) -> bool:
+    # grpc raises ValueError("Cannot invoke RPC on closed channel!"). UNAVAILABLE is
+    # not one: the channel reconnects by itself, and the service may just be overloaded.
+    return isinstance(exc, ValueError) and "closed channel" in str(exc).lower()
+
 # ===== Process and parse input =====
-def _process_with_layout(file_bytes: bytes, mime_type: str) -> documentai.Document:
+def _process_with_layout(file_bytes: Buffer, mime_type: str) -> documentai.Document:
+    documentai = _dai()
     client = _client()
     name = _processor_name()
 
     process_options = documentai.ProcessOptions(
         layout_config=documentai.ProcessOptions.LayoutConfig(
             chunking_config=documentai.ProcessOptions.LayoutConfig.ChunkingConfig(
-                chunk_size=1000,
-                include_ancestor_headings=True
+                chunk_size=CHUNK_SIZE,
+                include_ancestor_headings=INCLUDE_ANCESTOR_HEADINGS
             )
         )
     )
 
     request = documentai.ProcessRequest(
         name=name,
-        raw_document=documentai.RawDocument(content=file_bytes, mime_type=mime_type),
+        # The proto needs real bytes; mmap'd uploads are copied only here, at send time
+        raw_document=documentai.RawDocument(content=bytes(file_bytes), mime_type=mime_type),
         process_options=process_options,
     )
 
     try:
-        result = client.process_document(request=request)
+        try:
+            result = client.process_document(request=request)
+        except Exception as e:
+            if not _is_broken_channel(e):
+                raise
+            # Rebuild the pooled client and retry once on a fresh channel
+            _pool.invalidate(client)
+            result = _client().process_document(request=request)
     except Exception as e:
         # Surface a clearer error for debugging
         raise RuntimeError(f"Document AI processing failed: {e}") from e
 
     return result.document
 
-# ===== Convert docx to pdf bytes =====
-def _docx_to_pdf(file_bytes: bytes) -> bytes:
+# ===== Page sharding for large PDFs =====
+_shard_pool: Optional[ThreadPoolExecutor] = None
+_shard_pool_lock = threading.Lock()
+
+def _get_shard_pool() -> ThreadPoolExecutor:
+    # Process-wide and bounded, so concurrent uploads share the same Document AI concurrency budget
+    global _shard_pool
+    if _shard_pool is None:
+        with _shard_pool_lock:
+            if _shard_pool is None:
+                _shard_pool = ThreadPoolExecutor(max_workers=max(1, SHARD_WORKERS), thread_name_prefix="dai-shard")
+    return _shard_pool
+
+def _pdf_subset(reader: "PdfReader", pages: Sequence[int]) -> bytes:
+    """New PDF containing only `pages` (1-based, in the given order) of an open reader."""
+    from pypdf import PdfWriter
+    writer = PdfWriter()
+    for p in pages:
+        writer.add_page(reader.pages[p - 1])
+    out = io.BytesIO()
+    writer.write(out)
+    return out.getvalue()
+
+def _page_shards(pages: Sequence[int], shard_pages: int) -> List[List[int]]:
     """
-    Try converting DOCX -> PDF for better layout fidelity with Layout Parser.
-    Strategy:
-      1) Aspose.Words (requires Aspose license)
-      2) docx2pdf (Windows only - COM)
-      3) Fallback: raise error (handled by caller)
+    Split sorted page numbers into shards of at most `shard_pages`, never joining
+    non-consecutive pages, so each shard covers one contiguous page range.
     """
-    # Option A: Aspose.Words (if available & licensed)
-    try:
-        import aspose.words as aw
-        with tempfile.TemporaryDirectory() as tmpdir:
-            in_path = os.path.join(tmpdir, "input.docx")
-            out_path = os.path.join(tmpdir, "output.pdf")
-            with open(in_path, "wb") as f_in:
-                f_in.write(file_bytes)
-            doc = aw.Document(in_path)
-            doc.save(out_path)
-            with open(out_path, "rb") as f_out:
-                return f_out.read()
-    except Exception:
-        # swallow and try next option
-        pass
-
-    # Option B: docx2pdf (Windows only; may fail on Linux)
-    try:
-        from docx2pdf import convert  # type: ignore
-        with tempfile.TemporaryDirectory() as tmpdir:
-            in_path = os.path.join(tmpdir, "input.docx")
-            out_path = os.path.join(tmpdir, "output.pdf")
-            with open(in_path, "wb") as f_in:
-                f_in.write(file_bytes)
-            # convert may raise on non-Windows environments
-            convert(in_path, out_path)
-            with open(out_path, "rb") as f_out:
-                return f_out.read()
-    except Exception as e:
-        raise RuntimeError(f"DOCX->PDF conversion failed (docx2pdf/Aspose not available or conversion error): {e}")
-
-def _docx_text_fallback(file_bytes: bytes) -> str:
-    # As a last resort, extract text without layout (for MVP continuity)
+    shards: List[List[int]] = []
+    for p in pages:
+        if shards and p == shards[-1][-1] + 1 and len(shards[-1]) < shard_pages:
+            shards[-1].append(p)
+        else:
+            shards.append([p])
+    return shards
+
+def _pdf_units(reader: Optional["PdfReader"]) -> List[Tuple[str, Any]]:
+    """
+    Plan a PDF extraction as page-ordered units:
+      ("text", (page, page_text))  - page with a usable text layer, extracted locally
+      ("shard", [pages])           - contiguous scanned pages sent to Document AI together
+      ("doc", None)                - whole file in a single Document AI request
+    """
+    pages_text = read_text_layer(reader) if TEXT_LAYER_ENABLED else []
+    if pages_text:
+        usable = [has_usable_text(t) for t in pages_text]
+        if any(usable):
+            scanned = [i for i, ok in enumerate(usable, 1) if not ok]
+            shard_size = SHARD_PAGES if SHARD_PAGES > 0 else len(pages_text)
+            units: List[Tuple[int, str, Any]] = [
+                (i, "text", (i, t)) for i, (t, ok) in enumerate(zip(pages_text, usable), 1) if ok
+            ]
+            units.extend((pages[0], "shard", pages) for pages in _page_shards(scanned, shard_size))
+            return [(kind, payload) for _, kind, payload in sorted(units, key=lambda u: u[0])]
+
+    if SHARD_PAGES <= 0:
+        return [("doc", None)]
+    page_count = len(pages_text) or (len(reader.pages) if reader is not None else 0)
+    if page_count <= SHARD_PAGES:
+        return [("doc", None)]
+    return [("shard", pages) for pages in _page_shards(range(1, page_count + 1), SHARD_PAGES)]
+
+def _iter_pdf(file_bytes: Buffer) -> Iterator[Dict[str, Any]]:
+    """
+    PDF entry:
+      1) pages with a usable text layer are extracted locally (no Document AI call);
+      2) remaining (scanned) pages go to the Layout Parser, in concurrent page shards
+         when there are more than SHARD_PAGES of them.
+    All shards are submitted to the bounded shard pool up front; partial results are
+    yielded in page order as soon as each one (and everything before it) is ready.
+    """
+    # Parsed once: the text layer, the page count and every shard come from this reader
+    reader = open_pdf(file_bytes) if TEXT_LAYER_ENABLED or SHARD_PAGES > 0 else None
+    units = _pdf_units(reader)
+    pool = _get_shard_pool()
+    futures = {}
     try:
-        import docx  # python-docx
-        doc = docx.Document(BytesIO(file_bytes))
-        return "\n".join(p.text for p in doc.paragraphs)
-    except Exception as e:
-        raise RuntimeError(f"DOCX text extraction failed: {e}")
+        # pypdf readers are not thread-safe, so shards are written here, each one
+        # submitted as soon as it is ready
+        for i, (kind, payload) in enumerate(units):
+            if kind == "shard":
+                futures[i] = pool.submit(_process_with_layout, _pdf_subset(reader, payload), PDF_MIME)
+        for i, (kind, payload) in enumerate(units):
+            if kind == "text":
+                page, page_text = payload
+                yield _text_layer_blocks(page_text, page)
+            elif kind == "shard":
+                yield _map_layout_to_blocks(futures[i].result(), page_map=payload)
+            else:
+                yield _map_layout_to_blocks(_process_with_layout(file_bytes, PDF_MIME))
+    finally:
+        # Consumer stopped early (client went away) or a shard failed: drop queued shards
+        for fut in futures.values():
+            fut.cancel()
 
 def _text_from_layout(full_text: str, layout) -> str:
     """
@@ -162,14 +345,31 @@ def _simple_paragraph_split(text: str):
 def _simple_blocks(text: str):
     return [{"id": i, "text": t, "type": "paragraph", "page": 1} for i, t in enumerate(_simple_paragraph_split(text), 1)]
 
-def _map_layout_to_blocks(doc: documentai.Document) -> Dict[str, Any]:
+def _chunk_page(ch) -> int:
+    """1-based page of a Layout Parser chunk (page_span.page_start), or 0 if unknown."""
+    span = getattr(ch, "page_span", None)
+    page = getattr(span, "page_start", 0) if span is not None else 0
+    return int(page or getattr(ch, "page_ref", None) or getattr(ch, "page_number", None) or 0)
+
+def _map_layout_to_blocks(
+    doc: documentai.Document,
+    page_map: Optional[Sequence[int]] = None,
+    id_start: int = 1,
+) -> Dict[str, Any]:
     """
     Prefer Layout Parser's chunked_document if present.
     Fallback to page paragraphs/blocks if needed.
+    `page_map` translates the document's local 1-based pages to global page numbers
+    (used when `doc` is one shard of a larger PDF); ids start at `id_start`.
     """
     full_text = doc.text or ""
     blocks = []
-    id_counter = 1
+    id_counter = id_start
+
+    def _page(local: int) -> int:
+        if page_map and 1 <= local <= len(page_map):
+            return page_map[local - 1]
+        return local
 
     # 1) Use chunked_document chunks if available (ideal for rewriting)
     chunked = getattr(doc, "chunked_document", None)
@@ -179,10 +379,11 @@ def _map_layout_to_blocks(doc: documentai.Document) -> Dict[str, Any]:
             ch_text = getattr(ch, "text", None) or getattr(ch, "content", None) or ""
             txt = _cleanup_text(ch_text)
             if txt:
-                # try common page field names; fall back to 0
-                page_val = getattr(ch, "page_ref", None) or getattr(ch, "page_number", None) or 0
-                blocks.append({"id": id_counter, "text": txt, "type": "chunk", "page": page_val})
+                blocks.append({"id": id_counter, "text": txt, "type": "chunk", "page": _page(_chunk_page(ch))})
                 id_counter += 1
+        if not full_text:
+            # Layout Parser leaves doc.text empty; keep full_text consistent with the chunks
+            full_text = "\n".join(b["text"] for b in blocks)
 
     # 2) If no chunks, fall back to page paragraphs/blocks
     if not blocks and getattr(doc, "pages", None):
@@ -192,26 +393,46 @@ def _map_layout_to_blocks(doc: documentai.Document) -> Dict[str, Any]:
                 txt = _text_from_layout(full_text, getattr(para, "layout", None))
                 txt = _cleanup_text(txt)
                 if txt:
-                    blocks.append({"id": id_counter, "text": txt, "type": "paragraph", "page": p_index + 1})
+                    blocks.append({"id": id_counter, "text": txt, "type": "paragraph", "page": _page(p_index + 1)})
                     id_counter += 1
 
     # 3) Last resort: split full text
     if not blocks and full_text:
         for t in _simple_paragraph_split(full_text):
-            blocks.append({"id": id_counter, "text": t, "type": "paragraph", "page": 1})
+            blocks.append({"id": id_counter, "text": t, "type": "paragraph", "page": _page(1)})
             id_counter += 1
 
     return {"full_text": full_text, "blocks": blocks}
 
+def _text_layer_blocks(page_text: str, page: int) -> Dict[str, Any]:
+    """Blocks for one born-digital page, in the same shape _map_layout_to_blocks produces."""
+    blocks = []
+    for para in page_paragraphs(page_text):
+        txt = _cleanup_text(para).replace("\n", " ")
+        if txt:
+            blocks.append({"id": len(blocks) + 1, "text": txt, "type": "paragraph", "page": page})
+    return {"full_text": "\n".join(b["text"] for b in blocks), "blocks": blocks}
+
+def _renumber(parts: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """Give blocks of consecutive partial results continuous ids (each part starts at 1)."""
+    next_id = 1
+    for part in parts:
+        blocks = [{**b, "id": next_id + n} for n, b in enumerate(part["blocks"])]
+        next_id += len(blocks)
+        yield {"full_text": part["full_text"], "blocks": blocks}
+
+def merge_parts(parts: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """One {full_text, blocks} result from partial ones; full_texts are joined by newlines."""
+    texts: List[str] = []
+    blocks: List[Dict[str, Any]] = []
+    for part in parts:
+        if part["full_text"]:
+            texts.append(part["full_text"])
+        blocks.extend(part["blocks"])
+    return {"full_text": "\n".join(texts), "blocks": blocks}
+
 # --- Public entry point ---
-def extract_text_and_blocks(file_bytes: bytes, filename: str, content_type: str | None) -> Dict[str, Any]:
-    """
-    Always uses the Layout Parser processor when sending documents to Document AI.
-    - PDF/images: send directly.
-    - DOCX: convert to PDF (preferred), else text fallback.
-    - TXT: use as-is, no OCR.
-    Returns dict with full_text and normalized blocks for the frontend.
-    """
+def _normalize_mime(filename: str, content_type: str | None) -> str:
     ext = (os.path.splitext(filename)[1] or "").lower()
     mime = (content_type or "").lower()
 
@@ -228,35 +449,107 @@ def extract_text_and_blocks(file_bytes: bytes, filename: str, content_type: str
         mime = "image/png"
     elif ext in [".tif", ".tiff"]:
         mime = "image/tiff"
+    return mime
 
-    # TXT: bypass OCR
-    if mime == TXT_MIME:
-        text = file_bytes.decode("utf-8", errors="replace")
-        return {"full_text": text, "blocks": _simple_blocks(text)}
-
-    # DOCX: convert to PDF for best results with Layout Parser
+def _processor_config(mime: str) -> Dict[str, Any]:
+    """Everything besides the file bytes that affects the extraction result."""
+    if mime == DOCX_MIME:
+        # Parsed locally: the Document AI settings do not matter
+        return {"mime": mime, "version": PIPELINE_VERSION}
+    return {
+        "processor": _processor_name(),
+        "location": LOCATION,
+        "chunk_size": CHUNK_SIZE,
+        "include_ancestor_headings": INCLUDE_ANCESTOR_HEADINGS,
+        "mime": mime,
+        "shard_pages": SHARD_PAGES,
+        "text_layer": MIN_PAGE_CHARS if TEXT_LAYER_ENABLED else 0,
+        "version": PIPELINE_VERSION,
+    }
+
+def _iter_uncached(file_bytes: Buffer, mime: str) -> Iterator[Dict[str, Any]]:
+    # DOCX: parsed natively, no Document AI call
     if mime == DOCX_MIME:
         try:
-            pdf_bytes = _docx_to_pdf(file_bytes)
-            doc = _process_with_layout(pdf_bytes, PDF_MIME)
-            return _map_layout_to_blocks(doc)
-        except Exception:
-            # Fallback: naive DOCX text extraction
-            text = _docx_text_fallback(file_bytes)
-            return {"full_text": text, "blocks": _simple_blocks(text)}
+            yield extract_docx(file_bytes)
+        except Exception as e:
+            raise RuntimeError(f"DOCX extraction failed: {e}") from e
+        return
 
-    # PDFs and supported images: send directly
-    if mime == PDF_MIME or mime in SUPPORTED_IMAGE_MIMES:
+    if mime == PDF_MIME:
+        yield from _iter_pdf(file_bytes)
+        return
+
+    # Supported images: send directly
+    if mime in SUPPORTED_IMAGE_MIMES:
         doc = _process_with_layout(file_bytes, mime)
-        return _map_layout_to_blocks(doc)
+        yield _map_layout_to_blocks(doc)
+        return
 
     # Unknown: try as PDF; if that fails, treat as text
     try:
         doc = _process_with_layout(file_bytes, PDF_MIME)
-        return _map_layout_to_blocks(doc)
     except Exception:
-        text = file_bytes.decode("utf-8", errors="replace")
-        return {"full_text": text, "blocks": _simple_blocks(text)}
+        text = codecs.decode(file_bytes, "utf-8", "replace")
+        yield {"full_text": text, "blocks": _simple_blocks(text)}
+        return
+    yield _map_layout_to_blocks(doc)
+
+def iter_text_and_blocks(
+    file_bytes: Buffer,
+    filename: str,
+    content_type: str | None,
+    digest: str | None = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Always uses the Layout Parser processor when sending documents to Document AI.
+    - PDF: pages with an embedded text layer are read locally; the rest are sent
+      directly, as concurrent page shards when there are more than DAI_SHARD_PAGES.
+    - Images: send directly.
+    - DOCX: parsed natively (headings, numbering, tables), no OCR.
+    - TXT: use as-is, no OCR.
+    Yields partial {full_text, blocks} results in document order, as soon as each
+    page or shard is done; block ids are global across parts.
+    Results are cached by content hash + processor config, so re-uploads of the
+    same file skip Document AI entirely. `file_bytes` may be any bytes-like buffer
+    (e.g. an mmap'd spooled upload); pass `digest` when the sha256 is already known.
+    """
+    mime = _normalize_mime(filename, content_type)
+
+    # TXT: bypass OCR
+    if mime == TXT_MIME:
+        text = codecs.decode(file_bytes, "utf-8", "replace")
+        yield {"full_text": text, "blocks": _simple_blocks(text)}
+        return
+
+    if not CACHE_ENABLED:
+        yield from _renumber(_iter_uncached(file_bytes, mime))
+        return
+
+    cache = get_extraction_cache()
+    key = cache_key(digest or content_digest(file_bytes), _processor_config(mime))
+    cached = cache.get(key)
+    if cached is not None:
+        yield cached
+        return
+
+    parts: List[Dict[str, Any]] = []
+    for part in _renumber(_iter_uncached(file_bytes, mime)):
+        parts.append(part)
+        yield part
+    cache.set(key, merge_parts(parts))
+
+def extract_text_and_blocks(
+    file_bytes: Buffer,
+    filename: str,
+    content_type: str | None,
+    digest: str | None = None,
+) -> Dict[str, Any]:
+    """
+    Whole-document variant of iter_text_and_blocks.
+    Returns dict with full_text and normalized blocks for the frontend.
+    """
+    return merge_parts(iter_text_and_blocks(file_bytes, filename, content_type, digest))
 
 if __name__ == "__main__":
     print("Key path:", GOOGLE_APPLICATION_CREDENTIALS)
@@ -1,22 +1,31 @@
 # backend/app/services/genai_client.py
 from __future__ import annotations
 
+import functools
 import os
-from typing import Optional, Dict, Any
+import threading
+from typing import TYPE_CHECKING, Optional, Dict, Any, AsyncIterator, Awaitable, Callable, List
 
-# Google Gen AI SDK (unified client for Vertex AI or Developer API)
-from google import genai
+from pydantic import TypeAdapter, ValidationError
 
-# Make typed helpers optional to avoid import-time crashes on older SDKs
-try:
-    from google.genai import types as genai_types  # type: ignore
-    from google.genai.types import HttpOptions      # type: ignore
-except Exception:  # pragma: no cover
-    genai_types = None  # type: ignore[assignment]
-    HttpOptions = None  # type: ignore[assignment]
+from .llm_cache import LLM_CACHE_ENABLED, get_llm_cache, is_reusable, llm_cache_key
+from .rate_limit import estimate_tokens, get_model_gate
+from .singleflight import SingleFlight
 
-# Cached client instance
-_client: Optional[genai.Client] = None
+if TYPE_CHECKING:
+    from google import genai
+
+# Cached client instance. The SDK itself (a large import) is loaded on first use.
+_client: Optional["genai.Client"] = None
+_client_lock = threading.Lock()
+
+def _genai_types():
+    # Make typed helpers optional to avoid crashes on older SDKs
+    try:
+        from google.genai import types as genai_types  # type: ignore
+        return genai_types
+    except Exception:  # pragma: no cover
+        return None
 
 def _read_env() -> Dict[str, str]:
     # Read env at call-time so values are present even if load_dotenv ran later
@@ -27,7 +36,7 @@ def _read_env() -> Dict[str, str]:
         "MODEL": os.getenv("GENAI_MODEL") or "gemini-2.5-flash",
     }
 
-def get_client() -> genai.Client:
+def get_client() -> "genai.Client":
     """
     Returns a configured Google Gen AI client.
     - Vertex AI mode (recommended): uses ADC from GOOGLE_APPLICATION_CREDENTIALS,
@@ -37,78 +46,278 @@ def get_client() -> genai.Client:
     global _client
     if _client is not None:
         return _client
+    with _client_lock:
+        if _client is None:
+            _client = _build_client()
+    return _client
+
+def _build_client() -> "genai.Client":
+    # Google Gen AI SDK (unified client for Vertex AI or Developer API)
+    from google import genai
 
     env = _read_env()
     use_vertex = bool(env["PROJECT"])
 
     http_kwargs: Dict[str, Any] = {}
     # Pass HttpOptions only if available in your installed SDK
-    if HttpOptions is not None:
+    genai_types = _genai_types()
+    if genai_types is not None:
         try:
-            http_kwargs["http_options"] = HttpOptions(api_version="v1")
+            http_kwargs["http_options"] = genai_types.HttpOptions(api_version="v1")
         except Exception:
             pass  # continue without http_options on mismatched versions
 
     if use_vertex:
-        _client = genai.Client(
+        return genai.Client(
             vertexai=True,
             project=env["PROJECT"],
             location=env["LOCATION"] or "global",
             **http_kwargs,
         )
-        return _client
 
     if not env["API_KEY"]:
         raise RuntimeError(
             "Configure GCP_PROJECT_ID (Vertex) or GOOGLE_API_KEY (Developer API)."
         )
 
-    _client = genai.Client(api_key=env["API_KEY"], **http_kwargs)
-    return _client
+    return genai.Client(api_key=env["API_KEY"], **http_kwargs)
+
+def warm_client() -> None:
+    """Import the SDK and build the client ahead of the first request (startup warmup)."""
+    get_client()
 
-def generate_content(prompt: str, *, model: Optional[str] = None, **config_kwargs) -> str:
+def _build_config(config_kwargs: Dict[str, Any]):
+    genai_types = _genai_types() if config_kwargs else None
+    if genai_types is None:
+        return None
+    try:
+        return genai_types.GenerateContentConfig(**config_kwargs)  # type: ignore[attr-defined]
+    except Exception:
+        return None
+
+# Identical calls already in flight share one upstream request
+_generate_flight = SingleFlight("generate_content")
+_embed_flight = SingleFlight("embed_content")
+
+def _request_key(model_name: str, prompt: str, config_kwargs: Dict[str, Any], cache: Optional[bool]) -> Optional[str]:
+    """Key under which this call's answer may be shared (cache, coalescing); None if it must run alone."""
+    if not is_reusable(config_kwargs, cache):
+        get_llm_cache().note_bypass()
+        return None
+    return llm_cache_key(model_name, prompt, config_kwargs)
+
+async def _cached(key: Optional[str]) -> Optional[str]:
+    if key is None or not LLM_CACHE_ENABLED:
+        return None
+    return await get_llm_cache().get_async(key)
+
+async def _store(key: Optional[str], text: str) -> None:
+    if key is not None and LLM_CACHE_ENABLED:
+        await get_llm_cache().set_async(key, text)
+
+async def cached_call_async(
+    model_name: str,
+    prompt: str,
+    config: Dict[str, Any],
+    compute: Callable[[], Awaitable[str]],
+    cache: Optional[bool] = None,
+    accept: Optional[Callable[[str], bool]] = None,
+) -> str:
     """
-    Teammate-compatible helper:
-    client.models.generate_content(model=..., contents=..., config=...) -> str response.text
+    Cache lookup + single-flight + the shared rate limiter around `compute`.
+    generate_content_async uses it, and so can callers that reach a model through another SDK.
+    Answers `accept` rejects are returned but not cached.
+    Raises ModelUnavailable when the model stays overloaded past the request deadline.
     """
-    client = get_client()
-    model_name = model or _read_env()["MODEL"]
+    key = _request_key(model_name, prompt, config, cache)
+    hit = await _cached(key)
+    if hit is not None:
+        return hit
+    est = estimate_tokens(prompt)
+    if key is None:
+        return await get_model_gate().call_async(compute, est)
 
-    config = None
-    if genai_types is not None and config_kwargs:
-        try:
-            config = genai_types.GenerateContentConfig(**config_kwargs)  # type: ignore[attr-defined]
-        except Exception:
-            config = None
+    async def call() -> str:
+        text = await get_model_gate().call_async(compute, est)
+        if accept is None or accept(text):
+            await _store(key, text)
+        return text
+
+    return await _generate_flight.do_async(key, call)
 
-    resp = client.models.generate_content(
+async def _generate_async(model_name: str, prompt: str, config_kwargs: Dict[str, Any]) -> str:
+    resp = await get_client().aio.models.generate_content(
         model=model_name,
         contents=prompt,
-        config=config,
+        config=_build_config(config_kwargs),
     )
     return getattr(resp, "text", "") or ""
 
-def generate_content_stream(prompt: str, *, model: Optional[str] = None, **config_kwargs):
+# ===== Async surface (client.aio) =====
+# Same client and connection pool; awaiting a call holds no thread, so one worker
+# can keep many model calls in flight.
+
+async def generate_content_async(prompt: str, *, model: Optional[str] = None, cache: Optional[bool] = None, **config_kwargs) -> str:
     """
-    Streaming variant using client.models.generate_content_stream(...)
-    Yields text chunks.
+    client.aio.models.generate_content(model=..., contents=..., config=...) -> str response.text
+    Answers are served from the shared response cache and identical concurrent
+    calls are coalesced; cache=False skips both.
     """
-    client = get_client()
     model_name = model or _read_env()["MODEL"]
+    return await cached_call_async(
+        model_name, prompt, config_kwargs, lambda: _generate_async(model_name, prompt, config_kwargs), cache
+    )
+
+async def generate_content_stream_async(prompt: str, *, model: Optional[str] = None, cache: Optional[bool] = None, **config_kwargs) -> AsyncIterator[str]:
+    """Async streaming variant; yields text chunks as they arrive."""
+    model_name = model or _read_env()["MODEL"]
+    key = _request_key(model_name, prompt, config_kwargs, cache)
+    hit = await _cached(key)
+    if hit is not None:
+        yield hit
+        return
 
-    config = None
-    if genai_types is not None and config_kwargs:
+    async def open_stream():
+        stream = await get_client().aio.models.generate_content_stream(
+            model=model_name,
+            contents=prompt,
+            config=_build_config(config_kwargs),
+        )
+        it = stream.__aiter__()
         try:
-            config = genai_types.GenerateContentConfig(**config_kwargs)  # type: ignore[attr-defined]
-        except Exception:
-            config = None
+            return await it.__anext__(), it
+        except StopAsyncIteration:
+            return None, it
 
-    stream = client.models.generate_content_stream(
-        model=model_name,
-        contents=prompt,
-        config=config,
+    first, stream = await get_model_gate().call_async(open_stream, estimate_tokens(prompt))
+    parts = []
+    try:
+        if first is not None:
+            text = getattr(first, "text", "")
+            if text:
+                parts.append(text)
+                yield text
+            async for chunk in stream:
+                text = getattr(chunk, "text", "")
+                if text:
+                    parts.append(text)
+                    yield text
+    finally:
+        # Closed early (consumer gone): close the upstream response instead of leaving it to GC
+        aclose = getattr(stream, "aclose", None)
+        if aclose is not None:
+            await aclose()
+    await _store(key, "".join(parts))
+
+# ===== Structured output =====
+# response_mime_type + response_schema make the model answer JSON of a given shape.
+# The answer is validated against the same schema; one repair call gets a chance
+# to fix an invalid answer before StructuredOutputError.
+
+class StructuredOutputError(ValueError):
+    """The model's answer did not match the response schema, even after a repair attempt."""
+
+@functools.lru_cache(maxsize=None)
+def _adapter(schema: Any) -> TypeAdapter:
+    return TypeAdapter(schema)
+
+def _strip_code_fences(text: str) -> str:
+    txt = (text or "").strip()
+    if txt.startswith("```"):
+        lines = txt.splitlines()[1:]
+        if lines and lines[-1].strip().startswith("```"):
+            lines = lines[:-1]
+        txt = "\n".join(lines).strip()
+    return txt
+
+def _parse(schema: Any, text: str) -> Any:
+    """Validated value, or raises ValidationError. Tolerates a ```json fence around the JSON."""
+    adapter = _adapter(schema)
+    try:
+        return adapter.validate_json(text or "")
+    except ValidationError:
+        stripped = _strip_code_fences(text)
+        if stripped == (text or "").strip():
+            raise
+        return adapter.validate_json(stripped)
+
+def _is_valid(schema: Any) -> Callable[[str], bool]:
+    def check(text: str) -> bool:
+        try:
+            _parse(schema, text)
+            return True
+        except ValidationError:
+            return False
+    return check
+
+def _json_config(schema: Any, config_kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    return {**config_kwargs, "response_mime_type": "application/json", "response_schema": schema}
+
+def _repair_prompt(prompt: str, answer: str, error: ValidationError) -> str:
+    problems = "; ".join(
+        f"{'.'.join(str(p) for p in err['loc']) or 'root'}: {err['msg']}" for err in error.errors()[:5]
+    )
+    return (
+        f"{prompt}\n\n"
+        "Your previous answer did not match the required JSON schema.\n"
+        f"Errors: {problems}\n"
+        f"<previous_answer>\n{answer[:4000]}\n</previous_answer>\n"
+        "Return only the corrected JSON."
     )
-    for chunk in stream:
-        text = getattr(chunk, "text", "")
-        if text:
-            yield text
+
+async def generate_json_async(prompt: str, schema: Any, *, model: Optional[str] = None, cache: Optional[bool] = None, **config_kwargs) -> Any:
+    """
+    generate_content_async constrained to `schema` (a pydantic model or a type such as
+    List[Model]); returns the validated value. Invalid answers are never cached.
+    """
+    model_name = model or _read_env()["MODEL"]
+    config = _json_config(schema, config_kwargs)
+    accept = _is_valid(schema)
+    text = await cached_call_async(model_name, prompt, config, lambda: _generate_async(model_name, prompt, config), cache, accept)
+    try:
+        return _parse(schema, text)
+    except ValidationError as e:
+        repair = _repair_prompt(prompt, text, e)
+    text = await cached_call_async(model_name, repair, config, lambda: _generate_async(model_name, repair, config), cache, accept)
+    try:
+        return _parse(schema, text)
+    except ValidationError as e:
+        raise StructuredOutputError(f"Model output does not match {getattr(schema, '__name__', schema)}") from e
+
+async def cached_json_async(prompt: str, schema: Any, *, model: Optional[str] = None, **config_kwargs) -> Any:
+    """
+    The validated answer generate_json_async would serve from the response cache
+    for the same arguments, without calling the model; None when there is none.
+    """
+    model_name = model or _read_env()["MODEL"]
+    config = _json_config(schema, config_kwargs)
+    if not is_reusable(config):
+        return None
+    text = await _cached(llm_cache_key(model_name, prompt, config))
+    if text is None:
+        return None
+    try:
+        return _parse(schema, text)
+    except ValidationError:
+        return None
+
+# ===== Embeddings =====
+
+def _embed_key(model_name: str, texts: List[str]) -> str:
+    return llm_cache_key(model_name, "\0".join(texts), {"op": "embed"})
+
+async def embed_content_async(texts: List[str], *, model: str):
+    est = sum(estimate_tokens(t) for t in texts)
+    return await _embed_flight.do_async(
+        _embed_key(model, texts),
+        lambda: get_model_gate().call_async(lambda: get_client().aio.models.embed_content(model=model, contents=texts), est),
+    )
+
+def call_stats() -> Dict[str, Any]:
+    return {
+        "generate_content": _generate_flight.stats(),
+        "embed_content": _embed_flight.stats(),
+    }
+
+def limiter_stats() -> Dict[str, Any]:
+    return get_model_gate().stats()
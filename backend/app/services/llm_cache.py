@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import threading
+from typing import Any, Dict, Optional
+
+from .cache import DiskCache, LRUCache
+
+# ===== Config =====
+LLM_CACHE_ENABLED = (os.getenv("LLM_CACHE_ENABLED") or "1").strip().lower() not in {"0", "false", "no"}
+LLM_CACHE_ITEMS = int(os.getenv("LLM_CACHE_ITEMS") or 2048)
+LLM_CACHE_MAX_MB = int(os.getenv("LLM_CACHE_MAX_MB") or 64)
+LLM_CACHE_TTL_S = float(os.getenv("LLM_CACHE_TTL_S") or 24 * 3600)
+# Persistent tier: unset = memory only
+LLM_CACHE_DIR = os.getenv("LLM_CACHE_DIR") or ""
+LLM_CACHE_DISK_MB = int(os.getenv("LLM_CACHE_DISK_MB") or 256)
+# Calls sampled hotter than this are not cached unless the caller forces it
+LLM_CACHE_MAX_TEMPERATURE = float(os.getenv("LLM_CACHE_MAX_TEMPERATURE") or 0.5)
+
+_SPACES_RE = re.compile(r"[ \t]+")
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Line endings, trailing spaces and runs of blanks don't change the answer."""
+    text = (prompt or "").replace("\r\n", "\n").replace("\r", "\n")
+    return "\n".join(_SPACES_RE.sub(" ", line).rstrip() for line in text.split("\n")).strip()
+
+
+def llm_cache_key(model: str, prompt: str, config: Optional[Dict[str, Any]] = None) -> str:
+    """sha256 over model, normalized prompt and generation config."""
+    h = hashlib.sha256()
+    h.update(model.encode("utf-8"))
+    h.update(b"\0")
+    h.update(json.dumps(config or {}, sort_keys=True, separators=(",", ":"), default=str).encode("utf-8"))
+    h.update(b"\0")
+    h.update(normalize_prompt(prompt).encode("utf-8"))
+    return h.hexdigest()
+
+
+def is_reusable(config: Optional[Dict[str, Any]], cache: Optional[bool] = None) -> bool:
+    """
+    Whether another caller's answer may stand in for this call.
+    cache=True/False forces the decision; None allows it unless the call sets a
+    temperature above LLM_CACHE_MAX_TEMPERATURE (sampled output, callers expect variety).
+    """
+    if cache is not None:
+        return cache
+    temperature = (config or {}).get("temperature")
+    return temperature is None or float(temperature) <= LLM_CACHE_MAX_TEMPERATURE
+
+
+class LLMCache:
+    """
+    Response cache shared by every model call: an in-memory LRU with TTL and a
+    byte budget, optionally backed by a size-capped disk store that survives restarts.
+    """
+
+    def __init__(
+        self,
+        max_items: int = LLM_CACHE_ITEMS,
+        max_mb: int = LLM_CACHE_MAX_MB,
+        ttl: float = LLM_CACHE_TTL_S,
+        disk_dir: Optional[str] = LLM_CACHE_DIR,
+        disk_max_mb: int = LLM_CACHE_DISK_MB,
+    ):
+        self.memory = LRUCache(max_items=max_items, max_bytes=max_mb * 1024 * 1024, ttl=ttl)
+        self.disk: Optional[DiskCache] = None
+        if disk_dir and disk_max_mb > 0:
+            try:
+                self.disk = DiskCache(disk_dir, max_bytes=disk_max_mb * 1024 * 1024, ttl=ttl)
+            except OSError:
+                self.disk = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+
+    def _from_disk(self, key: str) -> Optional[str]:
+        stored = self.disk.get(key)
+        value = stored.get("text") if isinstance(stored, dict) else None
+        if value is not None:
+            self.memory.set(key, value)
+        return value
+
+    async def get_async(self, key: str) -> Optional[str]:
+        """Memory first; the disk tier is read on a worker thread, off the event loop."""
+        value = self.memory.get(key)
+        if value is None and self.disk is not None:
+            value = await asyncio.to_thread(self._from_disk, key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    async def set_async(self, key: str, text: str) -> None:
+        if not text:
+            return  # empty answers are usually failures; don't pin them
+        self.memory.set(key, text)
+        if self.disk is not None:
+            await asyncio.to_thread(self.disk.set, key, {"text": text})
+
+    def note_bypass(self) -> None:
+        with self._lock:
+            self.bypassed += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits, misses, bypassed = self.hits, self.misses, self.bypassed
+        total = hits + misses
+        return {
+            "enabled": LLM_CACHE_ENABLED,
+            "max_temperature": LLM_CACHE_MAX_TEMPERATURE,
+            "hits": hits,
+            "misses": misses,
+            "bypassed": bypassed,
+            "hit_ratio": round(hits / total, 4) if total else 0.0,
+            "memory": self.memory.stats(),
+            "disk": self.disk.stats() if self.disk is not None else None,
+        }
+
+
+_cache: Optional[LLMCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> LLMCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = LLMCache()
+    return _cache
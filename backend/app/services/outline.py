@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Fewer headings than this is not an outline, just a numbered line or two
+MIN_HEADINGS = 3
+# ... and numbering that starts late (a list near the end of prose) is not the document's
+MIN_COVERAGE = 0.5
+MAX_TITLE_CHARS = 80
+
+# A heading is a label at the start of a line. Longer forms first, so
+# "1.2.3" is one label rather than "1." followed by text
+_HEADING_RE = re.compile(
+    r"^[ \t]*(?:"
+    r"(?P<article>(?:ARTICLE|Article)[ \t]+(?:[IVXLC]+|\d{1,3})\b\.?)"
+    r"|(?P<section>(?:SECTION|Section|§)[ \t]*\d{1,3}(?:\.\d{1,3})*\b\.?)"
+    r"|(?P<dotted>\d{1,3}(?:\.\d{1,3})+)\.?(?=[ \t])"
+    r"|(?P<number>\d{1,3}[.)])(?=[ \t])"
+    r"|(?P<roman>\((?:i{1,3}|iv|v|vi{1,3}|ix|x)\))(?=[ \t])"
+    r"|(?P<alpha>\([a-z]\))(?=[ \t])"
+    r"|(?P<upper>\([A-Z]\))(?=[ \t])"
+    r")[ \t]*(?P<rest>[^\n]*)",
+    re.MULTILINE,
+)
+_TITLE_END_RE = re.compile(r"[.:;](?:\s|$)")
+
+
+@dataclass
+class OutlineNode:
+    """
+    A numbered heading and the text it governs: [start, end) runs from the
+    heading to the next heading at the same or a higher level.
+    """
+    title: str
+    style: str
+    start: int
+    end: int = -1
+    children: List["OutlineNode"] = field(default_factory=list)
+
+    def walk(self) -> Iterator["OutlineNode"]:
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+
+_KINDS = ("article", "section", "dotted", "number", "roman", "alpha", "upper")
+
+
+def _label(m: "re.Match[str]") -> Tuple[str, str]:
+    """(style, label) of a heading match."""
+    kind = next(k for k in _KINDS if m.group(k))
+    label = m.group(kind)
+    if kind == "dotted":
+        # "1.1" and "1.1.1" are different levels
+        return f"dotted{label.count('.')}", label
+    return kind, label
+
+
+_ROMAN = ("i", "ii", "iii", "iv", "v", "vi", "vii", "viii", "ix", "x")
+
+
+def _follows(node: OutlineNode, style: str, letter: str) -> bool:
+    """Whether "(letter)" is the next item after `node` in a list of `style`."""
+    prev = node.title.split(" ", 1)[0].strip("()")
+    if node.style != style:
+        return False
+    if style == "alpha":
+        return len(prev) == 1 and ord(letter) == ord(prev) + 1
+    return prev in _ROMAN[:-1] and _ROMAN[_ROMAN.index(prev) + 1] == letter
+
+
+def _resolve(stack: List[OutlineNode], label: str) -> str:
+    """
+    "(i)", "(v)" and "(x)" are letters or numerals. The innermost open item they
+    continue decides; otherwise "(i)" starts a roman list and the rest are letters.
+    """
+    letter = label.strip("()")
+    for node in reversed(stack):
+        for style in ("roman", "alpha"):
+            if _follows(node, style, letter):
+                return style
+    return "roman" if letter == "i" else "alpha"
+
+
+def _title(label: str, rest: str) -> str:
+    # "1.1 Term. This Agreement ..." -> "1.1 Term"; run-on items are cut at a word
+    end = _TITLE_END_RE.search(rest, 0, 2 * MAX_TITLE_CHARS)
+    head = " ".join(rest[:end.start() if end else 2 * MAX_TITLE_CHARS].split())
+    if len(head) > MAX_TITLE_CHARS:
+        head = head[:MAX_TITLE_CHARS].rsplit(" ", 1)[0] + "…"
+    return f"{label} {head}".strip()
+
+
+def parse_outline(text: str) -> List[OutlineNode]:
+    """
+    The document's own numbering ("ARTICLE IV", "Section 3", "1.", "1.1", "(a)",
+    "(iv)") as a tree of top-level nodes, in one pass over its heading lines.
+
+    Levels come from the order styles open in: a style already open closes
+    back to its level, a new one nests under the current heading. So
+    "1." > "(a)" and "ARTICLE I" > "Section 1" > "(a)" both work without a
+    fixed ranking. Returns [] when there are fewer than MIN_HEADINGS headings
+    or they govern less than MIN_COVERAGE of the text.
+    """
+    roots: List[OutlineNode] = []
+    stack: List[OutlineNode] = []
+    open_styles: Dict[str, int] = {}
+    count = 0
+
+    def pop() -> OutlineNode:
+        node = stack.pop()
+        open_styles[node.style] -= 1
+        return node
+
+    for m in _HEADING_RE.finditer(text or ""):
+        style, label = _label(m)
+        if label in ("(i)", "(v)", "(x)"):
+            style = _resolve(stack, label)
+        if open_styles.get(style):
+            while stack[-1].style != style:
+                pop().end = m.start()
+            pop().end = m.start()
+        node = OutlineNode(_title(label, m.group("rest")), style, m.start())
+        (stack[-1].children if stack else roots).append(node)
+        stack.append(node)
+        open_styles[style] = open_styles.get(style, 0) + 1
+        count += 1
+
+    end = len(text or "")
+    while stack:
+        pop().end = end
+    if count < MIN_HEADINGS or end - roots[0].start < MIN_COVERAGE * len(text.rstrip()):
+        return []
+    return roots
+
+
+def own_text(text: str, node: OutlineNode, limit: Optional[int] = None) -> str:
+    """The node's text up to its first child (or its whole span if that is empty), capped at `limit` characters."""
+    stop = node.children[0].start if node.children else node.end
+    if not text[node.start:stop].strip() or stop - node.start < len(node.title) + 20:
+        stop = node.end
+    body = text[node.start:stop] if limit is None else text[node.start:min(stop, node.start + limit)]
+    return " ".join(body.split())
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import os
+import re
+from typing import TYPE_CHECKING, List, Optional
+
+from .uploads import Buffer, as_stream
+
+if TYPE_CHECKING:
+    from pypdf import PdfReader
+
+# A page needs at least this many letters/digits in its text layer to skip OCR
+MIN_PAGE_CHARS = int(os.getenv("TEXT_LAYER_MIN_CHARS") or 40)
+
+_ALNUM_RE = re.compile(r"[^\W_]", re.UNICODE)
+_SENTENCE_END_RE = re.compile(r"[.:;!?)\]\"”]\s*$")
+
+
+def open_pdf(file_bytes: Buffer) -> Optional["PdfReader"]:
+    """
+    One pypdf reader for the whole extraction (text layer, page count, shards);
+    None when the PDF cannot be parsed locally, so callers fall back to OCR.
+    """
+    try:
+        from pypdf import PdfReader
+        reader = PdfReader(as_stream(file_bytes))
+        if reader.is_encrypted:
+            reader.decrypt("")
+        len(reader.pages)  # parse the page tree now rather than fail later
+        return reader
+    except Exception:
+        return None
+
+
+def read_text_layer(reader: Optional["PdfReader"]) -> List[str]:
+    """Embedded text of each page ("" for pages without a text layer); [] without a reader."""
+    if reader is None:
+        return []
+    pages: List[str] = []
+    try:
+        for page in reader.pages:
+            try:
+                pages.append(page.extract_text() or "")
+            except Exception:
+                pages.append("")  # one bad content stream should only send that page to OCR
+    except Exception:
+        return []
+    return pages
+
+
+def has_usable_text(page_text: str, min_chars: int = MIN_PAGE_CHARS) -> bool:
+    """Born-digital page vs scanned page (no or near-empty text layer)."""
+    count = 0
+    for _ in _ALNUM_RE.finditer(page_text):
+        count += 1
+        if count >= min_chars:
+            return True
+    return False
+
+
+def page_paragraphs(page_text: str) -> List[str]:
+    """
+    Group text-layer lines into paragraphs: a blank line always ends one, and a
+    line break ends one when the previous line closes a sentence or clause.
+    Lines inside a paragraph are rejoined with newlines for _cleanup_text.
+    """
+    paras: List[str] = []
+    buf: List[str] = []
+    for raw in page_text.splitlines():
+        line = raw.strip()
+        if not line:
+            if buf:
+                paras.append("\n".join(buf))
+                buf = []
+            continue
+        buf.append(line)
+        if _SENTENCE_END_RE.search(line):
+            paras.append("\n".join(buf))
+            buf = []
+    if buf:
+        paras.append("\n".join(buf))
+    return paras
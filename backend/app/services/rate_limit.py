@@ -0,0 +1,329 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+# ===== Config =====
+LLM_RPM = float(os.getenv("LLM_RPM") or 600)                 # requests per minute, 0 = unlimited
+LLM_TPM = float(os.getenv("LLM_TPM") or 2_000_000)           # estimated tokens per minute, 0 = unlimited
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY") or 16)    # starting concurrency limit
+LLM_CONCURRENCY_MIN = int(os.getenv("LLM_CONCURRENCY_MIN") or 1)
+LLM_CONCURRENCY_MAX = int(os.getenv("LLM_CONCURRENCY_MAX") or 128)
+LLM_DEADLINE_S = float(os.getenv("LLM_DEADLINE_S") or 60)    # per request, including waits and retries
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES") or 5)
+BACKOFF_BASE_S = 0.5
+BACKOFF_MAX_S = 8.0
+# Multiplicative decrease applied to the concurrency limit on an overload signal
+AIMD_DECREASE = 0.5
+
+_OVERLOAD_MARKERS = ("429", "RESOURCE_EXHAUSTED", "Resource exhausted", "503", "UNAVAILABLE", "overloaded")
+
+
+class ModelUnavailable(RuntimeError):
+    """The model stayed rate-limited/overloaded until the request deadline ran out."""
+
+    def __init__(self, message: str, retry_after: float = 5.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def is_overload_error(exc: BaseException) -> bool:
+    """429 / RESOURCE_EXHAUSTED (quota) or 503 UNAVAILABLE from either Google SDK."""
+    code = getattr(exc, "code", None)
+    if callable(code):  # grpc / api_core style
+        try:
+            code = code()
+        except Exception:
+            code = None
+    if code in (429, 503) or str(code) in {"429", "503", "StatusCode.RESOURCE_EXHAUSTED", "StatusCode.UNAVAILABLE"}:
+        return True
+    msg = str(exc)
+    return any(marker in msg for marker in _OVERLOAD_MARKERS)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for TPM budgeting (~4 chars per token)."""
+    return max(1, len(text or "") // 4)
+
+
+class TokenBucket:
+    """
+    Refills `rate_per_min` units per minute up to one minute's worth.
+    `reserve` takes units immediately (the balance may go negative) and returns how
+    long the caller should wait, so concurrent callers queue up in arrival order.
+    A caller that cannot wait that long takes nothing; one that gives up after
+    reserving hands its units back with `refund`.
+    """
+
+    def __init__(self, rate_per_min: float):
+        self.rate = max(0.0, float(rate_per_min)) / 60.0
+        self.capacity = max(0.0, float(rate_per_min))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill_locked(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, units: float = 1.0, max_wait: Optional[float] = None) -> Optional[float]:
+        """Seconds to wait for `units`, or None (nothing taken) if that is over `max_wait`."""
+        if not self.rate:
+            return 0.0
+        units = min(float(units), self.capacity)
+        with self._lock:
+            self._refill_locked()
+            balance = self._tokens - units
+            wait = 0.0 if balance >= 0 else -balance / self.rate
+            if max_wait is not None and wait > max_wait:
+                return None
+            self._tokens = balance
+            return wait
+
+    def refund(self, units: float = 1.0) -> None:
+        """Return units from a reservation that was never used."""
+        if not self.rate:
+            return
+        with self._lock:
+            self._refill_locked()
+            self._tokens = min(self.capacity, self._tokens + min(float(units), self.capacity))
+
+    def available(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            return min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+
+
+class _Waiter:
+    __slots__ = ("granted", "notify")
+
+    def __init__(self, notify: Callable[[], None]):
+        self.granted = False
+        self.notify = notify
+
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limit: each success raises the limit by 1/limit (about +1 per
+    round trip of the whole window), each overload signal multiplies it by
+    AIMD_DECREASE. Waiters are served FIFO and a freed
+    slot is handed straight to the next waiter.
+    """
+
+    def __init__(self, initial: int = LLM_CONCURRENCY, min_limit: int = LLM_CONCURRENCY_MIN, max_limit: int = LLM_CONCURRENCY_MAX):
+        self.min_limit = max(1, int(min_limit))
+        self.max_limit = max(self.min_limit, int(max_limit))
+        self._limit = float(min(self.max_limit, max(self.min_limit, int(initial))))
+        self._in_flight = 0
+        self._waiters: Deque[_Waiter] = deque()
+        self._lock = threading.Lock()
+        self.overloads = 0
+        self.timeouts = 0
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def _grant_locked(self) -> None:
+        while self._waiters and self._in_flight < int(self._limit):
+            waiter = self._waiters.popleft()
+            waiter.granted = True
+            self._in_flight += 1
+            waiter.notify()
+
+    def _enqueue(self, notify: Callable[[], None]) -> Optional[_Waiter]:
+        """Take a slot right away (None) or join the queue."""
+        with self._lock:
+            if not self._waiters and self._in_flight < int(self._limit):
+                self._in_flight += 1
+                return None
+            waiter = _Waiter(notify)
+            self._waiters.append(waiter)
+            return waiter
+
+    def _abandon(self, waiter: _Waiter) -> None:
+        """Waiter gave up (timeout/cancel); pass on a slot it was granted meanwhile."""
+        with self._lock:
+            if waiter.granted:
+                self._in_flight -= 1
+                self._grant_locked()
+            else:
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+            self.timeouts += 1
+
+    async def acquire_async(self, timeout: Optional[float]) -> bool:
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+
+        def _wake() -> None:
+            if not fut.done():
+                fut.set_result(True)
+
+        waiter = self._enqueue(lambda: loop.call_soon_threadsafe(_wake))
+        if waiter is None:
+            return True
+        try:
+            await asyncio.wait_for(fut, timeout)
+            return True
+        except asyncio.TimeoutError:
+            with self._lock:
+                if waiter.granted:
+                    return True
+            self._abandon(waiter)
+            return False
+        except asyncio.CancelledError:
+            self._abandon(waiter)
+            raise
+
+    def release(self, overloaded: bool = False) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            if overloaded:
+                self.overloads += 1
+                self._limit = max(float(self.min_limit), self._limit * AIMD_DECREASE)
+            else:
+                self._limit = min(float(self.max_limit), self._limit + 1.0 / self._limit)
+            self._grant_locked()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "limit": round(self._limit, 2),
+                "min": self.min_limit,
+                "max": self.max_limit,
+                "in_flight": self._in_flight,
+                "waiting": len(self._waiters),
+                "overloads": self.overloads,
+                "timeouts": self.timeouts,
+            }
+
+
+class ModelGate:
+    """
+    Every model call passes through here: RPM and TPM buckets, the adaptive
+    concurrency limit, and jittered exponential retry on overload errors, all
+    within one deadline per request. Past the deadline the call fails with
+    ModelUnavailable, which routes turn into 503.
+    """
+
+    def __init__(
+        self,
+        rpm: float = LLM_RPM,
+        tpm: float = LLM_TPM,
+        deadline_s: float = LLM_DEADLINE_S,
+        max_retries: int = LLM_MAX_RETRIES,
+    ):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.concurrency = AdaptiveLimiter()
+        self.deadline_s = deadline_s
+        self.max_retries = max(0, int(max_retries))
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.retries = 0
+        self.failures = 0
+        self.unavailable = 0
+
+    def _count(self, field: str) -> None:
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def _backoff(self, attempt: int) -> float:
+        # "Full jitter": uniform in [0, base * 2^attempt], capped
+        return random.uniform(0, min(BACKOFF_MAX_S, BACKOFF_BASE_S * (2 ** attempt)))
+
+    def _unavailable(self, why: str) -> ModelUnavailable:
+        self._count("unavailable")
+        return ModelUnavailable(f"Model temporarily unavailable ({why}); try again shortly.")
+
+    def _reserve(self, est_tokens: int, deadline: float) -> Optional[float]:
+        """Take one request and est_tokens from the buckets if they come in before the deadline."""
+        max_wait = deadline - time.monotonic()
+        wait_requests = self.requests.reserve(1, max_wait)
+        if wait_requests is None:
+            return None
+        wait_tokens = self.tokens.reserve(est_tokens, max_wait)
+        if wait_tokens is None:
+            self.requests.refund(1)
+            return None
+        return max(wait_requests, wait_tokens)
+
+    def _refund(self, est_tokens: int) -> None:
+        self.requests.refund(1)
+        self.tokens.refund(est_tokens)
+
+    async def call_async(self, fn: Callable[[], Awaitable[Any]], est_tokens: int = 1, deadline_s: Optional[float] = None) -> Any:
+        deadline = time.monotonic() + (deadline_s or self.deadline_s)
+        self._count("calls")
+        attempt = 0
+        while True:
+            wait = self._reserve(est_tokens, deadline)
+            if wait is None:
+                raise self._unavailable("rate limit")
+            try:
+                if wait:
+                    await asyncio.sleep(wait)
+                acquired = await self.concurrency.acquire_async(deadline - time.monotonic())
+            except BaseException:  # cancelled while queued: the call never went out
+                self._refund(est_tokens)
+                raise
+            if not acquired:
+                self._refund(est_tokens)
+                raise self._unavailable("concurrency limit")
+            overloaded = False
+            try:
+                return await asyncio.wait_for(fn(), max(0.001, deadline - time.monotonic()))
+            except asyncio.TimeoutError as e:
+                overloaded = True  # a call that outlives the deadline is a congestion signal too
+                raise self._unavailable("deadline exceeded") from e
+            except Exception as e:
+                overloaded = is_overload_error(e)
+                if not overloaded:
+                    self._count("failures")
+                    raise
+                delay = self._backoff(attempt)
+                if attempt >= self.max_retries or time.monotonic() + delay > deadline:
+                    raise self._unavailable("quota exhausted") from e
+            finally:
+                self.concurrency.release(overloaded)
+            self._count("retries")
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = {
+                "calls": self.calls,
+                "retries": self.retries,
+                "failures": self.failures,
+                "unavailable": self.unavailable,
+            }
+        return {
+            **counters,
+            "deadline_s": self.deadline_s,
+            "rpm_available": round(self.requests.available(), 1),
+            "tpm_available": round(self.tokens.available(), 1),
+            "concurrency": self.concurrency.stats(),
+        }
+
+
+_gate: Optional[ModelGate] = None
+_gate_lock = threading.Lock()
+
+
+def get_model_gate() -> ModelGate:
+    global _gate
+    if _gate is None:
+        with _gate_lock:
+            if _gate is None:
+                _gate = ModelGate()
+    return _gate
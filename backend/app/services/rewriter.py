@@ -1,146 +1,183 @@
 # backend/services/rewriter.py
 
+import asyncio
 import os
 import re
 import time
-from typing import List, Tuple
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
-import vertexai
-from vertexai.generative_models import GenerativeModel
 from dotenv import load_dotenv
 
+from .chunking import chunk_text
+from .genai_client import generate_content_async, generate_content_stream_async
+from .workers import gather_limited
+
 load_dotenv()
 
-PROJECT_ID = os.getenv("GCP_PROJECT_ID")
-# Force a supported Vertex GenAI location; fall back to "global"
+# Reported in meta; the shared client in genai_client reads the same variable
 LOCATION = (os.getenv("VAI_GCP_LOCATION") or "global").strip().lower()  # valid: "global" or "us-central1"
 
-if not PROJECT_ID:
-    raise RuntimeError("Missing project id: set GCP_PROJECT_ID in .env")
-
-# Init Vertex AI for Generative AI
-vertexai.init(project=PROJECT_ID, location=LOCATION)
-
-_CONTROL_RE = re.compile(r"[\x00-\x1f\x7f]")
-MAX_CHARS = 8000
-CHUNK_OVERLAP = 200
+_CONTROL_RE = re.compile(r"[\x00-\x08\x0b-\x1f\x7f]")  # keeps \t and \n for chunk boundaries
+# Chunk budget in estimated model tokens (~8k chars of prose), and how much of the
+# previous chunk goes along as read-only context
+MAX_TOKENS = 2000
+CHUNK_OVERLAP_TOKENS = 50
+# Chunks of one long rewrite sent to the model at the same time
+REWRITE_CONCURRENCY = int(os.getenv("REWRITE_CONCURRENCY") or 4)
 
 def _clean(text: str) -> str:
     if not text:
         return ""
     return _CONTROL_RE.sub("", text)
 
-def _split_with_overlap(text: str, max_len: int = MAX_CHARS, overlap: int = CHUNK_OVERLAP) -> List[str]:
-    text = (text or "").strip()
-    if len(text) <= max_len:
-        return [text]
-    for pattern in [r"\n\n+", r"\n+", r"(?<=[\.!?])\s+", r"\s+"]:
-        parts = re.split(pattern, text)
-        if len(parts) == 1:
-            continue
-        chunks: List[str] = []
-        buf = ""
-        for part in parts:
-            candidate = (buf + (" " if buf else "") + part).strip()
-            if len(candidate) <= max_len:
-                buf = candidate
-            else:
-                if buf:
-                    chunks.append(buf)
-                if len(part) > max_len:
-                    chunks.extend(_split_with_overlap(part, max_len, overlap))
-                    buf = ""
-                else:
-                    buf = part
-        if buf:
-            chunks.append(buf)
-        if len(chunks) > 1 and overlap > 0:
-            with_overlap: List[str] = []
-            for i, c in enumerate(chunks):
-                if i == 0:
-                    with_overlap.append(c)
-                else:
-                    prev_tail = chunks[i - 1][-overlap:]
-                    with_overlap.append((prev_tail + c)[:max_len])
-            return with_overlap
-        return chunks
-    chunks = []
-    i = 0
-    while i < len(text):
-        end = min(i + max_len, len(text))
-        chunk = text[i:end]
-        chunks.append(chunk)
-        if end == len(text):
-            break
-        i = end - overlap if overlap > 0 else end
-        if i < 0:
-            i = 0
-    return chunks
-
 LAYMAN_SYSTEM = (
     "You are an expert plain-language editor. Preserve meaning and facts, avoid legalese, "
     "and keep definitions intact. Keep the rewrite concise and accurate."
 )
 
-def _build_prompt(clean: str) -> str:
+def _build_prompt(clean: str, context: str = "") -> str:
+    # The overlap goes in as read-only context, so joined outputs don't repeat it
+    lead = (
+        "For continuity, <context> holds the text just before this passage. "
+        "Do not rewrite or repeat it.\n\n"
+        f"<context>\n{context}\n</context>\n\n"
+    ) if context else ""
     return (
         f"{LAYMAN_SYSTEM}\n\n"
         "Task: Rewrite the following text for a general audience without changing its meaning.\n"
         "Return only the rewritten text.\n\n"
+        f"{lead}"
         f"<text>\n{clean}\n</text>"
     )
 
-def _call_model(prompt: str, model_name: str, temperature: float) -> str:
-    model = GenerativeModel(model_name)
-    # Optional one-time debug: ensure we’re using the intended model/location
-    # print(f"[rewrite] calling model={model_name} location={LOCATION}")
-    resp = model.generate_content(
-        prompt,
-        generation_config={"temperature": temperature},
-    )
-    return (getattr(resp, "text", None) or "").strip()
+def _chunk_prompts(cleaned: str) -> List[str]:
+    """One prompt per non-overlapping chunk; each carries the previous chunk's tail as context."""
+    chunks = chunk_text(cleaned, MAX_TOKENS, CHUNK_OVERLAP_TOKENS)
+    return [_build_prompt(ch.text(cleaned), ch.context(cleaned).strip()) for ch in chunks]
+
+async def _rewrite_chunk(prompt: str, model_name: str, temperature: float) -> Tuple[str, int]:
+    # Shared client: one connection pool, plus the response cache, coalescing and limiter
+    start = time.perf_counter()
+    out = await generate_content_async(prompt, model=model_name, temperature=temperature)
+    return out.strip(), int((time.perf_counter() - start) * 1000)
 
-def rewrite_text(
+def _empty_meta(model: str) -> dict:
+    return {
+        "model": model,
+        "latency_ms": 0,
+        "input_len": 0,
+        "output_len": 0,
+        "location": LOCATION,
+        "chunks": 0,
+        "chunked": False,
+        "overlap_tokens": CHUNK_OVERLAP_TOKENS,
+    }
+
+def _meta(model: str, t0: float, cleaned: str, joined: str, chunks: List[str], chunk_ms: List[int]) -> dict:
+    return {
+        "model": model,
+        "latency_ms": int((time.time() - t0) * 1000),
+        "input_len": len(cleaned),
+        "output_len": len(joined),
+        "location": LOCATION,
+        "chunks": len(chunks),
+        "chunked": len(chunks) > 1,
+        "overlap_tokens": CHUNK_OVERLAP_TOKENS,
+        "max_tokens": MAX_TOKENS,
+        "concurrency": min(REWRITE_CONCURRENCY, len(chunks)),
+        "chunk_latency_ms": chunk_ms,
+    }
+
+_CHUNK_SEP = "\n\n"
+_EMPTY_CHUNK = "(No rewrite produced for this segment.)"
+
+def _join(outputs: List[str]) -> str:
+    return _CHUNK_SEP.join(out or _EMPTY_CHUNK for out in outputs).strip()
+
+async def rewrite_text_async(
     text: str,
     mode: str = "layman",
     model: str = "gemini-2.5-flash",  # supported on Vertex; keep this default
     temperature: float = 0.3,
 ) -> Tuple[str, dict]:
+    """Chunks run concurrently up to REWRITE_CONCURRENCY; one failing chunk cancels the rest."""
     t0 = time.time()
     cleaned = _clean(text)
     if not cleaned.strip():
-        return "", {
-            "model": model,
-            "latency_ms": 0,
-            "input_len": 0,
-            "output_len": 0,
-            "location": LOCATION,
-            "chunks": 0,
-            "chunked": False,
-            "overlap": CHUNK_OVERLAP,
-        }
+        return "", _empty_meta(model)
 
     try:
-        chunks = _split_with_overlap(cleaned, MAX_CHARS, CHUNK_OVERLAP)
-        outputs: List[str] = []
-        for ch in chunks:
-            prompt = _build_prompt(ch)
-            out = _call_model(prompt, model, temperature)
-            outputs.append(out or "(No rewrite produced for this segment.)")
-        joined = "\n\n".join(outputs).strip()
-        meta = {
-            "model": model,
-            "latency_ms": int((time.time() - t0) * 1000),
-            "input_len": len(cleaned),
-            "output_len": len(joined),
-            "location": LOCATION,
-            "chunks": len(chunks),
-            "chunked": len(chunks) > 1,
-            "overlap": CHUNK_OVERLAP,
-            "max_chars": MAX_CHARS,
-        }
-        return joined, meta
+        prompts = _chunk_prompts(cleaned)
+        # Results come back in chunk order whatever order the chunks finish in
+        results = await gather_limited([_rewrite_chunk(p, model, temperature) for p in prompts], REWRITE_CONCURRENCY)
+        joined = _join([out for out, _ in results])
+        return joined, _meta(model, t0, cleaned, joined, prompts, [ms for _, ms in results])
     except Exception as e:
         # TEMP logging to reveal exact cause (404 model/region vs 403 perms)
         print("REWRITE ERROR:", repr(e))
         raise
+
+async def rewrite_text_stream(
+    text: str,
+    mode: str = "layman",
+    model: str = "gemini-2.5-flash",
+    temperature: float = 0.3,
+) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Streaming rewrite as (event, payload) pairs:
+      ("chunk", {"index", "chunks"})   before each chunk's tokens
+      ("token", {"index", "text"})      as the model produces them
+      ("meta", {...})                   once at the end, same shape as rewrite_text_async's meta
+    Chunks are generated concurrently (up to REWRITE_CONCURRENCY) but emitted in order:
+    the current chunk is forwarded live, later ones are buffered until it finishes.
+    """
+    t0 = time.time()
+    cleaned = _clean(text)
+    if not cleaned.strip():
+        yield "meta", _empty_meta(model)
+        return
+
+    prompts = _chunk_prompts(cleaned)
+    sem = asyncio.Semaphore(max(1, REWRITE_CONCURRENCY))
+    queues: List[asyncio.Queue] = [asyncio.Queue() for _ in prompts]
+    chunk_ms: List[int] = [0] * len(prompts)
+
+    async def produce(i: int) -> None:
+        async with sem:
+            start = time.perf_counter()
+            try:
+                async for piece in generate_content_stream_async(prompts[i], model=model, temperature=temperature):
+                    queues[i].put_nowait(piece)
+            except Exception as e:
+                queues[i].put_nowait(e)
+            finally:
+                chunk_ms[i] = int((time.perf_counter() - start) * 1000)
+                queues[i].put_nowait(None)
+
+    tasks = [asyncio.create_task(produce(i)) for i in range(len(prompts))]
+    outputs: List[str] = []
+    try:
+        for i, queue in enumerate(queues):
+            yield "chunk", {"index": i, "chunks": len(prompts)}
+            if i:
+                yield "token", {"index": i, "text": _CHUNK_SEP}
+            parts: List[str] = []
+            while True:
+                item: Optional[Any] = await queue.get()
+                if item is None:
+                    break
+                if isinstance(item, Exception):
+                    print("REWRITE ERROR:", repr(item))
+                    raise item
+                parts.append(item)
+                yield "token", {"index": i, "text": item}
+            out = "".join(parts).strip()
+            if not out:
+                yield "token", {"index": i, "text": _EMPTY_CHUNK}
+            outputs.append(out)
+        joined = _join(outputs)
+        yield "meta", _meta(model, t0, cleaned, joined, prompts, chunk_ms)
+    finally:
+        # Client went away or a chunk failed: stop the remaining upstream streams
+        for task in tasks:
+            task.cancel()
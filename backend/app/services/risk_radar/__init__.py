@@ -1,9 +1,9 @@
 from .rules import RISKY_TERMS, normalize_text, find_keyword_flags
-from .detector import generate_risk_radar_response
+from .detector import generate_risk_radar_response_async
 
 __all__ = [
     "RISKY_TERMS",
     "normalize_text",
     "find_keyword_flags",
-    "generate_risk_radar_response",
+    "generate_risk_radar_response_async",
 ]
\ No newline at end of file
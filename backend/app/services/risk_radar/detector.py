@@ -1,43 +1,64 @@
 from __future__ import annotations
 
-import json
+import os
 from typing import List, Dict
 
-from app.services.genai_client import generate_content
+from app.models import RiskFlags
+from app.services.chunking import chunk_text
+from app.services.genai_client import generate_json_async
+from app.services.rate_limit import ModelUnavailable
 from app.services.risk_radar.rules import RISKY_TERMS, find_keyword_flags
+from app.services.workers import gather_limited
 
-def _call_gemini_for_risk(clause_text: str) -> List[Dict]:
+# Longer input (a whole contract) is scanned in pieces of about this many model
+# tokens, several at a time; each piece is one entry of flagged_clauses
+MAX_TOKENS = 2000
+RISK_CONCURRENCY = int(os.getenv("RISK_CONCURRENCY") or 4)
+
+def _risk_prompt(clause_text: str) -> str:
     # Prompt simplified and corrected to actually inject the clause
-    prompt_text = (
+    return (
         "Highlight potential high-risk terms in this clause and return JSON only.\n"
         'Format: {"flags":[{"term":"...","explanation":"..."}]}\n'
         f'Clause: "{clause_text}"'
     )
-    try:
-        output_text = generate_content(prompt_text) or ""
-        try:
-            parsed = json.loads(output_text)
-            return parsed.get("flags", []) if isinstance(parsed, dict) else []
-        except Exception:
-            return []
-    except Exception:
-        return []
-
-def generate_risk_radar_response(clause_text: str) -> Dict:
+
+def _flags(result: RiskFlags) -> List[Dict]:
+    return [flag.model_dump() for flag in result.flags]
+
+async def _scan(clause_text: str) -> Dict:
     keyword_flags = find_keyword_flags(clause_text, RISKY_TERMS)
-    contextual_flags = _call_gemini_for_risk(clause_text)
-    risk_count = len(keyword_flags) + len(contextual_flags)
+    try:
+        contextual_flags = _flags(await generate_json_async(_risk_prompt(clause_text), RiskFlags))
+    except ModelUnavailable:
+        raise  # surface as 503 rather than an empty flag list
+    except Exception as e:
+        print("RISK RADAR ERROR:", repr(e))
+        contextual_flags = []
+    return {
+        "clause": clause_text,
+        "keyword_flags": keyword_flags,
+        "contextual_flags": contextual_flags,
+    }
+
+def _pieces(text: str) -> List[str]:
+    chunks = chunk_text(text, MAX_TOKENS)
+    if len(chunks) <= 1:
+        return [text]
+    return [c.text(text) for c in chunks]
+
+async def generate_risk_radar_response_async(clause_text: str) -> Dict:
+    flagged = await gather_limited([_scan(piece) for piece in _pieces(clause_text)], RISK_CONCURRENCY)
+    return _build_response(flagged)
+
+def _build_response(flagged: List[Dict]) -> Dict:
+    keyword_count = sum(len(fc["keyword_flags"]) for fc in flagged)
+    contextual_count = sum(len(fc["contextual_flags"]) for fc in flagged)
     return {
-        "flagged_clauses": [
-            {
-                "clause": clause_text,
-                "keyword_flags": keyword_flags,
-                "contextual_flags": contextual_flags,
-            }
-        ],
+        "flagged_clauses": flagged,
         "risk_summary": (
-            f"{risk_count} high-risk terms detected: "
-            f"{len(keyword_flags)} keyword-based, "
-            f"{len(contextual_flags)} contextual."
+            f"{keyword_count + contextual_count} high-risk terms detected: "
+            f"{keyword_count} keyword-based, "
+            f"{contextual_count} contextual."
         ),
     }
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls with the same key into one execution.
+    The first caller (leader) runs the function; callers arriving while it is in
+    flight wait and get the same result or exception. Nothing is kept afterwards,
+    which is the response cache's job.
+    """
+
+    def __init__(self, name: str = "call"):
+        self.name = name
+        self._lock = threading.Lock()
+        self._tasks: Dict[str, "asyncio.Task[Any]"] = {}
+        self.leaders = 0
+        self.collapsed = 0
+
+    async def do_async(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        The upstream call runs as its own task and every caller awaits it through
+        shield(), so one caller disconnecting does not cancel it for the others.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            task = self._tasks.get(key)
+            if task is not None and task.get_loop() is loop and not task.done():
+                self.collapsed += 1
+            else:
+                task = loop.create_task(fn())
+                self._tasks[key] = task
+                self.leaders += 1
+                task.add_done_callback(lambda t, k=key: self._forget(k, t))
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: "asyncio.Task[Any]") -> None:
+        with self._lock:
+            if self._tasks.get(key) is task:
+                del self._tasks[key]
+        if not task.cancelled():
+            task.exception()  # mark retrieved; waiters already got it
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "leaders": self.leaders,
+                "collapsed": self.collapsed,
+                "in_flight": len(self._tasks),
+            }
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from dateutil import parser as date_parser
+
+ABSOLUTE, RELATIVE, RECURRING = "absolute", "relative", "recurring"
+
+_DAY = r"(?:[12]\d|3[01]|0?[1-9])(?:st|nd|rd|th)?"
+_YEAR = r"(?:19|20)\d{2}"
+# "may" is usually the verb ("The Supplier may 5 units ..."): the month is
+# capitalised, or a day followed by a comma or year comes next
+_MONTH = (
+    r"(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|(?-i:May|MAY)|may(?=\s+%s(?:,|\s+%s))"
+    r"|june?|july?|aug(?:ust)?|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)\.?"
+) % (_DAY, _YEAR)
+_NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7, "eight": 8,
+    "nine": 9, "ten": 10, "eleven": 11, "twelve": 12, "fourteen": 14, "fifteen": 15,
+    "twenty": 20, "thirty": 30, "forty-five": 45, "forty": 40, "sixty": 60, "ninety": 90,
+}
+# "30", "thirty", "thirty (30)"
+_NUMBER = r"(?:\d{1,4}|%s)(?:\s*\(\d{1,4}\))?" % "|".join(_NUMBER_WORDS)
+_UNIT = r"(?:business\s+|calendar\s+|working\s+)?(?:days?|weeks?|months?|quarters?|years?)"
+_PERIOD = r"(?:day|week|month|quarter|year|calendar\s+(?:month|quarter|year)|anniversary(?:\s+of\s+the\s+\w+\s+date)?)"
+_ORDINAL = r"(?:first|second|third|last|final|\d{1,2}(?:st|nd|rd|th))"
+# The event a relative deadline hangs off: "of completion", "after the Effective Date"
+_ANCHOR = r"(?:\s+(?:after|before|from|following|of|prior\s+to|preceding|upon)(?:\s+[\w'’-]+){1,6})?"
+
+# At any position the first pattern that matches wins, so recurring forms come
+# first: "January 1st of each year" is one expression, not a date plus a recurrence
+_PATTERNS = [
+    (RECURRING, rf"(?:on\s+)?{_MONTH}\s+{_DAY}\s+of\s+(?:each|every)\s+(?:calendar\s+)?year"),
+    (RECURRING, rf"(?:on\s+)?the\s+{_ORDINAL}\s+(?:business\s+)?day\s+of\s+(?:each|every)\s+(?:calendar\s+)?(?:month|quarter|year)"),
+    (RECURRING, rf"(?:each|every|per)\s+{_PERIOD}"),
+    (RECURRING, rf"every\s+{_NUMBER}\s+{_UNIT}"),
+    (RECURRING, r"(?:semi-?annually|bi-?weekly|bi-?monthly|annually|quarterly|monthly|weekly|yearly|daily)"),
+    (ABSOLUTE, rf"{_MONTH}\s+{_DAY}(?:,?\s+{_YEAR})?"),
+    (ABSOLUTE, rf"(?:the\s+)?{_DAY}\s+day\s+of\s+{_MONTH}(?:,?\s+{_YEAR})?"),
+    # Day-first needs the year, or "Section 1 may ..." would be a date
+    (ABSOLUTE, rf"{_DAY}\s+{_MONTH},?\s+{_YEAR}"),
+    (ABSOLUTE, rf"{_MONTH}\s+{_YEAR}"),
+    (ABSOLUTE, r"\d{4}-\d{2}-\d{2}|\d{1,2}/\d{1,2}/(?:\d{4}|\d{2})|\d{1,2}\.\d{1,2}\.\d{4}"),
+    (RELATIVE, rf"(?:(?:within|no\s+later\s+than|not\s+later\s+than|no\s+less\s+than|not\s+less\s+than|at\s+least|up\s+to|for(?:\s+a\s+(?:period|term)\s+of)?|after|before)\s+)?{_NUMBER}\s+{_UNIT}{_ANCHOR}"),
+]
+_TEMPORAL_RE = re.compile(
+    "|".join(f"(?P<k{i}>\\b(?:{pattern})\\b)" for i, (_, pattern) in enumerate(_PATTERNS)),
+    re.IGNORECASE,
+)
+_KINDS = {f"k{i}": kind for i, (kind, _) in enumerate(_PATTERNS)}
+_SPACES_RE = re.compile(r"\s+")
+_SENTENCE_END_RE = re.compile(r"[.!?;](?=\s)|\n")
+_AMOUNT_RE = re.compile(r"\((\d{1,4})\)|\b(\d{1,4})\b|\b(%s)\b" % "|".join(_NUMBER_WORDS), re.IGNORECASE)
+_EVERY_RE = re.compile(r"\b(?:each|every|per)\s+(?:calendar\s+)?(day|week|month|quarter|year)\b", re.IGNORECASE)
+_DURATION_RE = re.compile(rf"(?:(?P<amount>{_NUMBER})\s+)?\b(?P<unit>{_UNIT})\b", re.IGNORECASE)
+_UNIT_CODES = {"day": "D", "week": "W", "month": "M", "quarter": "Q", "year": "Y"}
+_NO_DATE = datetime(1, 1, 1)
+MAX_EVENT_CHARS = 240
+
+
+@dataclass(frozen=True)
+class TemporalExpression:
+    """A date or deadline found in the text; start/end are offsets into it."""
+    start: int
+    end: int
+    text: str
+    kind: str                     # absolute | relative | recurring
+    value: Optional[str] = None   # ISO date for absolute dates, ISO 8601 duration otherwise
+
+
+def _date_value(text: str) -> Optional[str]:
+    try:
+        parsed = date_parser.parse(text, fuzzy=True, default=_NO_DATE)
+    except (ValueError, OverflowError):
+        return None
+    return parsed.date().isoformat() if parsed.year != 1 else None
+
+
+def _duration_value(text: str) -> Optional[str]:
+    # The unit is the one counted by the number: "3 months of the first day" is P3M
+    m = next((d for d in _DURATION_RE.finditer(text) if d.group("amount")), None) or _DURATION_RE.search(text)
+    if m is None:
+        return None
+    unit = _UNIT_CODES[m.group("unit").lower().split()[-1].rstrip("s")]
+    amount = 1
+    if m.group("amount"):
+        a = _AMOUNT_RE.search(m.group("amount").lower())
+        amount = int(a.group(1) or a.group(2)) if (a.group(1) or a.group(2)) else _NUMBER_WORDS[a.group(3)]
+    if unit == "Q":
+        amount, unit = amount * 3, "M"
+    return f"P{amount}{unit}"
+
+
+_FREQUENCIES = {
+    "daily": "P1D", "weekly": "P1W", "biweekly": "P2W", "bi-weekly": "P2W", "monthly": "P1M",
+    "bimonthly": "P2M", "bi-monthly": "P2M", "quarterly": "P3M", "semiannually": "P6M",
+    "semi-annually": "P6M", "annually": "P1Y", "yearly": "P1Y",
+}
+
+
+def _value(kind: str, text: str) -> Optional[str]:
+    if kind == ABSOLUTE:
+        return _date_value(text)
+    if kind == RECURRING:
+        word = text.lower()
+        if word in _FREQUENCIES:
+            return _FREQUENCIES[word]
+        if "anniversary" in word:
+            return "P1Y"
+        every = _EVERY_RE.search(word)
+        if every:
+            return _duration_value(every.group(1))
+    return _duration_value(text)
+
+
+def find_temporal(text: str, start: int = 0, end: Optional[int] = None) -> List[TemporalExpression]:
+    """Temporal expressions in text[start:end], in order, without overlaps."""
+    found: List[TemporalExpression] = []
+    for m in _TEMPORAL_RE.finditer(text, start, len(text) if end is None else end):
+        kind = _KINDS[m.lastgroup or ""]
+        phrase = _SPACES_RE.sub(" ", m.group())
+        found.append(TemporalExpression(m.start(), m.end(), phrase, kind, _value(kind, phrase)))
+    return found
+
+
+def has_temporal(text: str, start: int = 0, end: Optional[int] = None) -> bool:
+    return _TEMPORAL_RE.search(text, start, len(text) if end is None else end) is not None
+
+
+def _sentence(text: str, start: int, end: int) -> str:
+    """The sentence around [start, end), whitespace collapsed and capped."""
+    lo = max(0, start - 1000)
+    head = 0
+    for m in _SENTENCE_END_RE.finditer(text, lo, start):
+        head = m.end()
+    head = max(head, lo)
+    tail = _SENTENCE_END_RE.search(text, end, end + 1000)
+    sentence = _SPACES_RE.sub(" ", text[head:tail.end() if tail else min(len(text), end + 1000)]).strip()
+    if len(sentence) > MAX_EVENT_CHARS:
+        sentence = sentence[:MAX_EVENT_CHARS].rsplit(" ", 1)[0] + "…"
+    return sentence
+
+
+def timeline_events(text: str, start: int = 0, end: Optional[int] = None) -> List[Dict[str, object]]:
+    """
+    TimelineEvent-shaped dicts for every expression in text[start:end]: the
+    expression as date_description, its sentence as the event, plus offsets.
+    """
+    return [
+        {
+            "date_description": expr.text,
+            "event": _sentence(text, expr.start, expr.end),
+            "start": expr.start,
+            "end": expr.end,
+            "kind": expr.kind,
+            "value": expr.value,
+        }
+        for expr in find_temporal(text, start, end)
+    ]
@@ -1,102 +1,88 @@
 from __future__ import annotations
 
-import json
+import asyncio
+import os
 import re
-from typing import Any, Dict, List, Tuple
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
 
-from google.genai.types import GenerateContentConfig
-from .genai_client import get_client
-from ..models import MapResponse, DocumentSection, TimelineEvent
+from .chunking import Chunk, chunk_text, count_tokens
+from .genai_client import StructuredOutputError, cached_json_async, generate_json_async
+from .llm_cache import LLM_CACHE_ENABLED, get_llm_cache, llm_cache_key
+from .outline import OutlineNode, own_text, parse_outline
+from .temporal import find_temporal, has_temporal, timeline_events
+from .workers import gather_limited
+from ..models import (
+    ChunkMap, ChunkStructure, ChunkTimeline, MapResponse, DocumentSection, SectionNotes, TimelineEvent,
+)
 
 # Limits aligned with other services
-MAX_CHARS = 8000
-OVERLAP = 200
+MAX_TOKENS = 2000
+OVERLAP_TOKENS = 50
 MODEL_ID = "gemini-2.5-flash"  # Vertex model id
+# Extraction calls (one per chunk) of one /map request in flight at the same time
+MAP_CONCURRENCY = int(os.getenv("MAP_CONCURRENCY") or 8)
+# Who finds timeline events:
+#   model  - the LLM reads every chunk for dates
+#   hybrid - the LLM only for chunks where the local extractor sees a date
+#   local  - the local extractor alone (structure still comes from the LLM)
+MAP_TIMELINE_MODE = (os.getenv("MAP_TIMELINE_MODE") or "hybrid").strip().lower()
+TIMELINE_MODES = ("model", "hybrid", "local")
+# Take the structure from the document's own numbering when it has one
+MAP_OUTLINE_ENABLED = (os.getenv("MAP_OUTLINE_ENABLED") or "1") not in ("0", "false", "no")
+# Text of each parsed section sent along to have its summary written
+SUMMARY_EXCERPT_CHARS = int(os.getenv("MAP_SUMMARY_EXCERPT_CHARS") or 1200)
 
-_CONTROL_RE = re.compile(r"[\x00-\x1f\x7f]")
+_CONTROL_RE = re.compile(r"[\x00-\x08\x0b-\x1f\x7f]")  # keeps \t and \n for chunk boundaries
 
 def _clean(s: str) -> str:
     return _CONTROL_RE.sub("", s or "").strip()
 
-def _split_with_overlap(text: str, max_len: int = MAX_CHARS, overlap: int = OVERLAP) -> List[str]:
-    t = (text or "").strip()
-    if len(t) <= max_len:
-        return [t]
-    # hierarchical split: paragraphs -> sentences -> whitespace
-    for pattern in (r"\n\n+", r"(?<=[.!?])\s+", r"\s+"):
-        parts = re.split(pattern, t)
-        if len(parts) == 1:
-            continue
-        chunks: List[str] = []
-        buf = ""
-        for part in parts:
-            cand = (buf + (" " if buf else "") + part).strip()
-            if len(cand) <= max_len:
-                buf = cand
-            else:
-                if buf:
-                    chunks.append(buf)
-                if len(part) > max_len:
-                    # recurse down if a single part still exceeds
-                    chunks.extend(_split_with_overlap(part, max_len, overlap))
-                    buf = ""
-                else:
-                    buf = part
-        if buf:
-            chunks.append(buf)
-        if len(chunks) > 1 and overlap > 0:
-            with_ov: List[str] = []
-            for i, c in enumerate(chunks):
-                if i == 0:
-                    with_ov.append(c)
-                else:
-                    prev_tail = chunks[i - 1][-overlap:]
-                    with_ov.append((prev_tail + c)[:max_len])
-            return with_ov
-        return chunks
-    # fallback sliding window
-    out: List[str] = []
-    i = 0
-    while i < len(t):
-        end = min(i + max_len, len(t))
-        out.append(t[i:end])
-        if end == len(t):
-            break
-        i = end - overlap if overlap > 0 else end
-        if i < 0:
-            i = 0
-    return out
+def _normalize(full_text: str) -> str:
+    # Blank out control characters instead of dropping them, so event offsets
+    # index the text the caller sent
+    return _CONTROL_RE.sub(" ", full_text or "")
+
+# (chunk text, whether to ask for the structure, whether to ask for the timeline)
+_Task = Tuple[str, bool, bool]
+
+def _prompt(task: _Task) -> str:
+    chunk, with_structure, with_timeline = task
+    return f"{_PROMPTS[with_structure, with_timeline]}\n\n<text>\n{chunk}\n</text>"
+
+def _empty_map(e: Exception) -> ChunkMap:
+    # Still invalid after the repair attempt: this chunk contributes nothing
+    print("MAP EXTRACTION ERROR:", repr(e))
+    return ChunkMap(structure=[], timeline=[])
+
+EXTRACT_TEMPERATURE = 0.2
 
-def _strip_code_fences(s: str) -> str:
-    txt = (s or "").strip()
-    if txt.startswith("```"):
-        # remove first line fence
-        lines = txt.splitlines()
-        if lines and lines[0].startswith("```"):   
-            lines = lines[1:]
-        # drop trailing fence if present
-        if lines and lines[-1].strip().startswith("```"):
-            lines = lines[:-1]
-        txt = "\n".join(lines).strip()
-    # leading 'json' label
-    if txt.lower().startswith("json"):
-        txt = txt[4:].lstrip()
-    return txt
-
-def _parse_json_list(s: str) -> List[Dict[str, Any]]:
-    body = _strip_code_fences(s)
+async def _recall_one(task: _Task) -> Optional[ChunkMap]:
+    if not (task[1] or task[2]):
+        # Nothing to ask the model about this chunk
+        return ChunkMap(structure=[], timeline=[])
+    hit = await cached_json_async(_prompt(task), _SCHEMAS[task[1], task[2]], model=MODEL_ID, temperature=EXTRACT_TEMPERATURE)
+    return _as_map(hit) if hit is not None else None
+
+async def _recall(tasks: List[_Task]) -> List[Optional[ChunkMap]]:
+    # A chunk's answer is already in the shared LLM cache under its prompt. With
+    # content-defined chunk boundaries an edit only changes the chunks around it,
+    # so re-mapping sends just those to the model.
+    return list(await asyncio.gather(*(_recall_one(task) for task in tasks)))
+
+def _as_map(result: Any) -> ChunkMap:
+    if isinstance(result, ChunkMap):
+        return result
+    return ChunkMap(structure=getattr(result, "structure", []), timeline=getattr(result, "timeline", []))
+
+async def _extract(task: _Task, temperature: float = EXTRACT_TEMPERATURE) -> ChunkMap:
+    schema = _SCHEMAS[task[1], task[2]]
     try:
-        data = json.loads(body)
-        return data if isinstance(data, list) else []
-    except Exception:
-        return []
-
-def _gen_json(prompt: str, context: str, temperature: float = 0.2) -> List[Dict[str, Any]]:
-    client = get_client()
-    cfg = GenerateContentConfig(temperature=temperature)
-    full = f"{prompt}\n\nReturn only valid JSON array, no prose.\n\n<text>\n{context}\n</text>"
-    resp = client.models.generate_content(model=MODEL_ID, contents=full, config=cfg)
-    return _parse_json_list(getattr(resp, "text", "") or "")
+        result = _as_map(await generate_json_async(_prompt(task), schema, model=MODEL_ID, temperature=temperature))
+    except StructuredOutputError as e:
+        return _empty_map(e)
+    return result
 
 def _dedupe_structure(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     seen = set()
@@ -119,48 +105,246 @@ def _dedupe_structure(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     return out
 
 def _dedupe_timeline(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    seen = set()
+    seen: Dict[Tuple[str, str], Dict[str, Any]] = {}
     out: List[Dict[str, Any]] = []
     for it in items:
         dd = _clean(str(it.get("date_description", "")))
         ev = _clean(str(it.get("event", "")))
         if not ev:
             continue
+        located = {k: it[k] for k in ("start", "end", "kind", "value") if it.get(k) is not None}
         key = (dd.lower(), ev.lower())
         if key in seen:
+            # A repeat from the overlap may have been located where the first wasn't
+            if "start" not in seen[key]:
+                seen[key].update(located)
             continue
-        seen.add(key)
-        out.append({"date_description": dd, "event": ev})
+        seen[key] = {"date_description": dd, "event": ev, **located}
+        out.append(seen[key])
     return out
 
-def generate_map(full_text: str) -> MapResponse:
-    """
-    Extracts document structure and timeline events using Gemini and returns Pydantic models.
-    """
-    text = _clean(full_text)
-    if not text:
-        return MapResponse(structure=[], timeline=[])
-    chunks = _split_with_overlap(text, MAX_CHARS, OVERLAP)
-
-    structure_prompt = (
-        "Analyze the contract text and extract its hierarchical structure. "
-        'Return JSON array: [{"title": str, "content_summary": str, "subsections": [{"title": str, "content_summary": str}]}].'
-    )
-    timeline_prompt = (
-        "Extract all key dates, deadlines, and time-based obligations from the text. "
-        'Return JSON array: [{"date_description": str, "event": str}].'
-    )
-
-    struct_raw: List[Dict[str, Any]] = []
-    time_raw: List[Dict[str, Any]] = []
-
-    for ch in chunks:
-        struct_raw.extend(_gen_json(structure_prompt, ch))
-        time_raw.extend(_gen_json(timeline_prompt, ch))
+MAP_PROMPT = (
+    "Analyze the contract text. Extract its hierarchical structure (sections with a short "
+    "content summary and their subsections) and all key dates, deadlines, and time-based "
+    "obligations. Return JSON: "
+    '{"structure": [{"title": str, "content_summary": str, "subsections": [{"title": str, "content_summary": str}]}], '
+    '"timeline": [{"date_description": str, "event": str}]}.'
+)
+STRUCTURE_PROMPT = (
+    "Analyze the contract text and extract its hierarchical structure (sections with a short "
+    "content summary and their subsections). Return JSON: "
+    '{"structure": [{"title": str, "content_summary": str, "subsections": [{"title": str, "content_summary": str}]}]}.'
+)
+TIMELINE_PROMPT = (
+    "Extract all key dates, deadlines, and time-based obligations from the contract text. Return JSON: "
+    '{"timeline": [{"date_description": str, "event": str}]}.'
+)
+_PROMPTS = {(True, True): MAP_PROMPT, (True, False): STRUCTURE_PROMPT, (False, True): TIMELINE_PROMPT}
+_SCHEMAS = {(True, True): ChunkMap, (True, False): ChunkStructure, (False, True): ChunkTimeline}
+SUMMARY_PROMPT = (
+    "Summarize each numbered contract section below in one short plain-English sentence. "
+    'Return JSON: {"summaries": [{"id": int, "summary": str}]} with one entry per section id.'
+)
 
+def _build_map(struct_raw: List[Dict[str, Any]], time_raw: List[Dict[str, Any]]) -> MapResponse:
     struct_norm = _dedupe_structure(struct_raw)
     time_norm = _dedupe_timeline(time_raw)
 
     structure = [DocumentSection(**s) for s in struct_norm]
     timeline = [TimelineEvent(**t) for t in time_norm]
     return MapResponse(structure=structure, timeline=timeline)
+
+# ----- Outline summaries -----
+
+# Summaries are asked for in batches but kept per section, in their own
+# namespace of the shared LLM cache
+def _note_key(excerpt: str) -> str:
+    return llm_cache_key(MODEL_ID, f"{SUMMARY_PROMPT}\n\n{excerpt}", {"op": "map_note"})
+
+async def _recall_note(excerpt: str) -> Optional[str]:
+    if not LLM_CACHE_ENABLED:
+        return None
+    return await get_llm_cache().get_async(_note_key(excerpt))
+
+async def _recall_notes(excerpts: List[str]) -> List[Optional[str]]:
+    return list(await asyncio.gather(*(_recall_note(excerpt) for excerpt in excerpts)))
+
+def _note_batches(excerpts: List[str], todo: List[int]) -> List[List[int]]:
+    # Pack sections into calls of about one chunk's worth of tokens each
+    batches: List[List[int]] = []
+    budget = 0
+    for i in todo:
+        tokens = count_tokens(excerpts[i])
+        if not batches or budget + tokens > MAX_TOKENS:
+            batches.append([])
+            budget = 0
+        batches[-1].append(i)
+        budget += tokens
+    return batches
+
+def _notes_prompt(batch: List[int], excerpts: List[str]) -> str:
+    sections = "\n".join(f'<section id="{i}">\n{excerpts[i]}\n</section>' for i in batch)
+    return f"{SUMMARY_PROMPT}\n\n{sections}"
+
+async def _keep_notes(batch: List[int], excerpts: List[str], result: SectionNotes) -> Dict[int, str]:
+    wanted = set(batch)
+    notes = {n.id: _clean(n.summary) for n in result.summaries if n.id in wanted and _clean(n.summary)}
+    if LLM_CACHE_ENABLED:
+        for i, summary in notes.items():
+            await get_llm_cache().set_async(_note_key(excerpts[i]), summary)
+    return notes
+
+async def _summarize(batch: List[int], excerpts: List[str]) -> Dict[int, str]:
+    try:
+        result = await generate_json_async(_notes_prompt(batch, excerpts), SectionNotes, model=MODEL_ID, temperature=0.2)
+    except StructuredOutputError as e:
+        print("MAP SUMMARY ERROR:", repr(e))
+        return {}
+    return await _keep_notes(batch, excerpts, result)
+
+def _outline_sections(roots: List[OutlineNode], notes: List[Optional[str]]) -> List[DocumentSection]:
+    # notes are in walk (pre-)order, the order this recursion visits nodes in
+    pending = iter(notes)
+
+    def build(node: OutlineNode) -> DocumentSection:
+        summary = next(pending, None) or ""
+        return DocumentSection(
+            title=node.title, content_summary=summary, start=node.start, end=node.end,
+            subsections=[build(child) for child in node.children],
+        )
+
+    return [build(root) for root in roots]
+
+# ----- Map -----
+
+@dataclass
+class _Job:
+    """One /map request: its chunks, its outline and what still needs the model."""
+    text: str
+    mode: str
+    spans: List[Chunk]
+    tasks: List[_Task]
+    outline: List[OutlineNode]
+    excerpts: List[str]
+    results: List[Optional[ChunkMap]]
+    notes: List[Optional[str]]
+    todo: List[int]
+    batches: List[List[int]]
+
+def _plan(text: str, mode: str, with_structure: bool) -> Tuple[List[Chunk], List[_Task]]:
+    # Each chunk carries a little of the previous one; the dedupers drop repeats.
+    # Content-defined boundaries keep unedited chunks identical between versions.
+    spans = chunk_text(text, MAX_TOKENS, OVERLAP_TOKENS, content_defined=True)
+    tasks = [
+        (
+            c.with_context(text),
+            with_structure,
+            mode == "model" or (mode == "hybrid" and has_temporal(text, c.start, c.end)),
+        )
+        for c in spans
+    ]
+    return spans, tasks
+
+def _mode(timeline_mode: Optional[str]) -> str:
+    mode = (timeline_mode or MAP_TIMELINE_MODE).strip().lower()
+    return mode if mode in TIMELINE_MODES else "hybrid"
+
+async def _prepare(full_text: str, timeline_mode: Optional[str], summarize: bool) -> Optional[_Job]:
+    text = _normalize(full_text)
+    if not text.strip():
+        return None
+    mode = _mode(timeline_mode)
+    outline = parse_outline(text) if MAP_OUTLINE_ENABLED else []
+    spans, tasks = _plan(text, mode, with_structure=not outline)
+    nodes = [node for root in outline for node in root.walk()]
+    excerpts = [own_text(text, node, SUMMARY_EXCERPT_CHARS) for node in nodes] if summarize else []
+    results = await _recall(tasks)
+    notes = await _recall_notes(excerpts)
+    return _Job(
+        text=text, mode=mode, spans=spans, tasks=tasks, outline=outline, excerpts=excerpts,
+        results=results, notes=notes,
+        todo=[i for i, r in enumerate(results) if r is None],
+        batches=_note_batches(excerpts, [i for i, n in enumerate(notes) if n is None]),
+    )
+
+def _locate(text: str, span: Chunk, events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Attach offsets to model events: the local expression they mention, else a literal match."""
+    found = find_temporal(text, span.context_start, span.end)
+    for ev in events:
+        dd = str(ev.get("date_description") or "").lower()
+        if not dd:
+            continue
+        expr = next((x for x in found if x.text.lower() in dd or dd in x.text.lower()), None)
+        if expr is not None:
+            ev.update(start=expr.start, end=expr.end, kind=expr.kind, value=expr.value)
+            continue
+        # Case-insensitive search in place: offsets stay those of the original text
+        at = re.compile(re.escape(dd), re.IGNORECASE).search(text, span.context_start, span.end)
+        if at is not None:
+            ev.update(start=at.start(), end=at.end())
+    return events
+
+def _timeline_raw(job: _Job) -> List[Dict[str, Any]]:
+    if job.mode == "local":
+        return timeline_events(job.text)
+    return [
+        ev
+        for span, r in zip(job.spans, job.results)
+        for ev in _locate(job.text, span, [t.model_dump() for t in r.timeline])
+    ]
+
+def _reduce(job: _Job, timings: Dict[str, float], t0: float) -> MapResponse:
+    # results are in chunk order, so the merged lists keep document order
+    t_reduce = time.perf_counter()
+    if job.outline:
+        response = _build_map([], _timeline_raw(job))
+        response.structure = _outline_sections(job.outline, job.notes)
+    else:
+        struct_raw = [s.model_dump() for r in job.results for s in r.structure]
+        response = _build_map(struct_raw, _timeline_raw(job))
+    timings["reduce_ms"] = (time.perf_counter() - t_reduce) * 1000
+    timings["total_ms"] = (time.perf_counter() - t0) * 1000
+    asked = sum(1 for _, with_structure, with_timeline in job.tasks if with_structure or with_timeline)
+    calls = len(job.todo) + len(job.batches)
+    response.meta = {
+        "model": MODEL_ID,
+        "chunks": len(job.tasks),
+        "reused_chunks": asked - len(job.todo),
+        "model_calls": calls,
+        "concurrency": min(MAP_CONCURRENCY, max(1, calls)),
+        "timeline_mode": job.mode,
+        "timeline_chunks": sum(1 for *_, with_timeline in job.tasks if with_timeline),
+        "structure_source": "outline" if job.outline else "model",
+        "sections": sum(1 for root in job.outline for _ in root.walk()),
+        "summary_calls": len(job.batches),
+        **{k: int(v) for k, v in timings.items()},
+    }
+    return response
+
+async def generate_map_async(full_text: str, timeline_mode: Optional[str] = None, summarize: bool = True) -> MapResponse:
+    """
+    Extracts document structure and timeline events and returns Pydantic models.
+
+    When the document numbers its own clauses, the structure is parsed from that
+    outline and Gemini only writes the section summaries, several sections per
+    call. Otherwise each chunk gets one structured call. Timeline calls follow
+    `timeline_mode` (default MAP_TIMELINE_MODE). All calls run concurrently (up to
+    MAP_CONCURRENCY) and results merge in document order.
+    """
+    t0 = time.perf_counter()
+    job = await _prepare(full_text, timeline_mode, summarize)
+    if job is None:
+        return MapResponse(structure=[], timeline=[])
+    t_map = time.perf_counter()
+    timings = {"split_ms": (t_map - t0) * 1000}
+
+    # Chunk extractions and section summaries share one concurrency budget
+    calls = [_extract(job.tasks[i]) for i in job.todo] + [_summarize(batch, job.excerpts) for batch in job.batches]
+    results = await gather_limited(calls, MAP_CONCURRENCY)
+    for i, result in zip(job.todo, results):
+        job.results[i] = result
+    for notes in results[len(job.todo):]:
+        for i, summary in notes.items():
+            job.notes[i] = summary
+    timings["extract_ms"] = (time.perf_counter() - t_map) * 1000
+    return _reduce(job, timings, t0)
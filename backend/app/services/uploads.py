@@ -0,0 +1,227 @@
+from __future__ import annotations
+
+import hashlib
+import io
+import mmap
+import os
+import tempfile
+from typing import IO, Any, AsyncIterator, Dict, Mapping, Optional, Union
+
+from python_multipart.multipart import MultipartParseError, MultipartParser, parse_options_header
+
+# ===== Config =====
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_MB") or 25) * 1024 * 1024
+# Uploads up to this size stay in memory; larger ones are spooled to a temp file and memory-mapped
+UPLOAD_SPOOL_BYTES = int(os.getenv("UPLOAD_SPOOL_KB") or 1024) * 1024
+# Multipart framing around the file part, allowed on top of the limit in the Content-Length check
+MULTIPART_SLACK = 64 * 1024
+
+Buffer = Union[bytes, bytearray, memoryview, mmap.mmap]
+
+
+class UploadTooLarge(ValueError):
+    def __init__(self, limit: int):
+        super().__init__(f"File exceeds the {limit // (1024 * 1024)} MB upload limit.")
+        self.limit = limit
+
+
+class BufferStream(io.RawIOBase):
+    """
+    Seekable read-only stream over a bytes-like object (bytes, mmap, ...) without
+    copying it. Each instance has its own position, so several readers (e.g. page
+    shards on different threads) can share one memory-mapped upload.
+    """
+
+    def __init__(self, buf: Buffer):
+        self._view = memoryview(buf).cast("B")
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        n = max(0, min(len(b), len(self._view) - self._pos))
+        b[:n] = self._view[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += len(self._view)
+        self._pos = max(0, offset)
+        return self._pos
+
+    def tell(self) -> int:
+        return self._pos
+
+    def close(self) -> None:
+        if not self.closed:
+            self._view.release()  # lets the owner close the mmap afterwards
+        super().close()
+
+
+def as_stream(buf: Buffer) -> io.IOBase:
+    """File-like view for parsers (pypdf, python-docx); zero-copy for non-bytes buffers."""
+    if isinstance(buf, bytes):
+        return io.BytesIO(buf)  # CPython shares the bytes object until written to
+    return BufferStream(buf)
+
+
+class SpooledUpload:
+    """
+    An upload written in chunks: sha256 and size are computed while writing, the
+    size limit is enforced as soon as it is crossed, and anything above the spool
+    threshold lives in a temp file instead of process memory.
+    """
+
+    def __init__(self, spool_bytes: int = UPLOAD_SPOOL_BYTES, max_bytes: int = UPLOAD_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.spool_bytes = spool_bytes
+        self.filename: Optional[str] = None
+        self.content_type: Optional[str] = None
+        self._mem: Optional[io.BytesIO] = io.BytesIO()
+        self._disk: Optional[IO[bytes]] = None
+        self._hash = hashlib.sha256()
+        self._map: Optional[mmap.mmap] = None
+        self.size = 0
+
+    def write(self, chunk: bytes) -> None:
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            raise UploadTooLarge(self.max_bytes)
+        self._hash.update(chunk)
+        if self._disk is None and self.size > self.spool_bytes:
+            # Past the threshold: move what we have to a temp file and keep writing there
+            self._disk = tempfile.TemporaryFile()
+            self._disk.write(self._mem.getbuffer())
+            self._mem = None
+        (self._disk or self._mem).write(chunk)
+
+    @property
+    def digest(self) -> str:
+        return self._hash.hexdigest()
+
+    @property
+    def on_disk(self) -> bool:
+        return self._disk is not None
+
+    def buffer(self) -> Buffer:
+        """
+        The upload's content: a read-only mmap when spooled to disk (pages are
+        loaded on demand and shared with the page cache), else the in-memory bytes.
+        """
+        if self._disk is None:
+            return self._mem.getvalue() if self._mem is not None else b""
+        if self._map is None:
+            self._disk.flush()
+            self._map = mmap.mmap(self._disk.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map
+
+    def close(self) -> None:
+        if self._map is not None:
+            try:
+                self._map.close()
+            except BufferError:
+                pass  # a parser still holds a view; the mapping goes away with it
+            self._map = None
+        if self._disk is not None:
+            self._disk.close()
+            self._disk = None
+        self._mem = None
+
+    def __enter__(self) -> "SpooledUpload":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class BadUpload(ValueError):
+    """The request body is not a multipart form with a file in it."""
+
+
+async def receive_upload(
+    headers: Mapping[str, str],
+    stream: AsyncIterator[bytes],
+    field: str = "file",
+    max_bytes: int = UPLOAD_MAX_BYTES,
+    spool_bytes: int = UPLOAD_SPOOL_BYTES,
+) -> SpooledUpload:
+    """
+    Parse a multipart/form-data body as it arrives and spool the `field` file part.
+
+    The body is read exactly once: file bytes go straight into the SpooledUpload,
+    so the size limit applies while reading (chunked bodies included) and nothing
+    is buffered by the framework first. A declared Content-Length over the limit
+    is rejected before reading anything. Other form fields are ignored.
+    """
+    declared = headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > max_bytes + MULTIPART_SLACK:
+        raise UploadTooLarge(max_bytes)
+    ctype, params = parse_options_header(headers.get("content-type"))
+    boundary = params.get(b"boundary")
+    if ctype != b"multipart/form-data" or not boundary:
+        raise BadUpload("Expected a multipart/form-data upload.")
+
+    spool = SpooledUpload(spool_bytes=spool_bytes, max_bytes=max_bytes)
+    state: Dict[str, Any] = {"headers": {}, "name": b"", "value": b"", "current": False, "found": False}
+
+    def on_part_begin() -> None:
+        state["headers"] = {}
+
+    def on_header_field(data: bytes, start: int, end: int) -> None:
+        state["name"] += data[start:end]
+
+    def on_header_value(data: bytes, start: int, end: int) -> None:
+        state["value"] += data[start:end]
+
+    def on_header_end() -> None:
+        state["headers"][state["name"].lower()] = state["value"]
+        state["name"] = state["value"] = b""
+
+    def on_headers_finished() -> None:
+        _, disposition = parse_options_header(state["headers"].get(b"content-disposition"))
+        filename = disposition.get(b"filename")
+        state["current"] = (
+            not state["found"] and disposition.get(b"name") == field.encode() and filename is not None
+        )
+        if state["current"]:
+            state["found"] = True
+            spool.filename = filename.decode("utf-8", "replace")
+            part_type = state["headers"].get(b"content-type")
+            spool.content_type = part_type.decode("latin-1") if part_type else None
+
+    def on_part_data(data: bytes, start: int, end: int) -> None:
+        if state["current"]:
+            spool.write(data[start:end])
+
+    def on_part_end() -> None:
+        state["current"] = False
+
+    parser = MultipartParser(boundary, {
+        "on_part_begin": on_part_begin,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data,
+        "on_part_end": on_part_end,
+    })
+    try:
+        async for chunk in stream:
+            parser.write(chunk)
+        parser.finalize()
+        if not state["found"] or not spool.filename:
+            raise BadUpload("No file provided")
+    except MultipartParseError as e:
+        spool.close()
+        raise BadUpload(f"Malformed multipart body: {e}") from e
+    except BaseException:
+        spool.close()
+        raise
+    return spool
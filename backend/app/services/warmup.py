@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .extractor import config_errors, warm_client_pool
+from .genai_client import warm_client
+
+
+def _import_parsers() -> Optional[str]:
+    # Local PDF/DOCX parsing; imported here so the first upload doesn't pay for it
+    import pypdf  # noqa: F401
+    import docx  # noqa: F401
+    return None
+
+
+def _warm_documentai() -> Optional[str]:
+    errors = config_errors()
+    if errors:
+        # OCR stays unavailable, everything else still works
+        return "disabled: " + "; ".join(errors)
+    warm_client_pool()
+    return None
+
+
+def _warm_genai() -> Optional[str]:
+    warm_client()
+    return None
+
+
+WARMUP_STEPS: List[Tuple[str, Callable[[], Optional[str]]]] = [
+    ("parsers", _import_parsers),
+    ("documentai", _warm_documentai),
+    ("genai", _warm_genai),
+]
+
+
+class Warmup:
+    """
+    Runs the slow startup work (SDK imports, credentials, channels) after the app
+    is already accepting requests, and records per-step state for /ready.
+    States: pending -> ok | disabled: ... | error: ...
+    """
+
+    def __init__(self, steps: List[Tuple[str, Callable[[], Optional[str]]]] = WARMUP_STEPS):
+        self.steps = steps
+        self._lock = threading.Lock()
+        self._state: Dict[str, Dict[str, Any]] = {name: {"state": "pending"} for name, _ in steps}
+        self._tasks: List["asyncio.Future[Any]"] = []
+
+    def _run(self, name: str, fn: Callable[[], Optional[str]]) -> None:
+        t0 = time.perf_counter()
+        try:
+            note = fn()
+            state = note or "ok"
+        except Exception as e:
+            print(f"WARMUP {name.upper()} FAILED:", repr(e))
+            state = f"error: {e}"
+        with self._lock:
+            self._state[name] = {"state": state, "ms": round((time.perf_counter() - t0) * 1000, 1)}
+
+    def start(self) -> None:
+        loop = asyncio.get_running_loop()
+        self._tasks = [loop.run_in_executor(None, self._run, name, fn) for name, fn in self.steps]
+
+    def cancel(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+
+    def status(self) -> Tuple[bool, Dict[str, Any]]:
+        """(ready, body). Ready once no step is pending; failed steps make it 'degraded'."""
+        with self._lock:
+            steps = {name: dict(info) for name, info in self._state.items()}
+        pending = any(info["state"] == "pending" for info in steps.values())
+        degraded = any(info["state"] != "ok" for info in steps.values())
+        status = "starting" if pending else ("degraded" if degraded else "ready")
+        return not pending, {"status": status, "components": steps}
+
+
+_warmup: Optional[Warmup] = None
+
+
+def get_warmup() -> Warmup:
+    global _warmup
+    if _warmup is None:
+        _warmup = Warmup()
+    return _warmup
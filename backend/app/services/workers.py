@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple, TypeVar
+
+# ===== Config =====
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS") or 4)
+EXTRACTION_QUEUE_MAX = int(os.getenv("EXTRACTION_QUEUE_MAX") or 16)
+
+T = TypeVar("T")
+
+
+async def gather_limited(aws: Iterable[Awaitable[T]], limit: int) -> List[T]:
+    """
+    Await `aws` at most `limit` at a time; results come back in input order.
+    The first failure cancels the rest and is re-raised as is.
+    """
+    sem = asyncio.Semaphore(max(1, limit))
+
+    async def limited(aw: Awaitable[T]) -> T:
+        async with sem:
+            return await aw
+
+    tasks = [asyncio.ensure_future(limited(aw)) for aw in aws]
+    try:
+        return list(await asyncio.gather(*tasks))
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+class QueueFullError(RuntimeError):
+    """Raised when a BoundedExecutor already holds max_workers + max_queue jobs."""
+
+
+class BoundedExecutor:
+    """
+    Dedicated thread pool for blocking work called from async routes, with a hard
+    cap on queued jobs. Over the cap, `run` fails fast with QueueFullError instead
+    of letting requests pile up behind a slow job.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int, name: str = "worker"):
+        self.max_workers = max(1, int(max_workers))
+        self.max_queue = max(0, int(max_queue))
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._running = 0
+        self._queued = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self._wait_total_ms = 0.0
+        self.max_wait_ms = 0.0
+        self.last_wait_ms = 0.0
+
+    @property
+    def depth(self) -> int:
+        """Jobs waiting for a worker (not counting running ones)."""
+        return self._queued
+
+    def _reserve(self) -> None:
+        with self._lock:
+            if self._running + self._queued >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise QueueFullError(
+                    f"Extraction queue is full ({self._queued} waiting, {self._running} running)."
+                )
+            self._queued += 1
+            self.submitted += 1
+
+    def _unqueue(self) -> None:
+        with self._lock:
+            self._queued -= 1
+
+    def _start(self, enqueued_at: float) -> float:
+        wait_ms = (time.perf_counter() - enqueued_at) * 1000
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+            self._wait_total_ms += wait_ms
+            self.last_wait_ms = wait_ms
+            self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+        return wait_ms
+
+    def _finish(self, ok: bool) -> None:
+        with self._lock:
+            self._running -= 1
+            if ok:
+                self.completed += 1
+            else:
+                self.failed += 1
+
+    def submit(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> "asyncio.Future[Tuple[Any, float]]":
+        """
+        Schedule `fn(*args, **kwargs)` on the pool from async code.
+        Raises QueueFullError right away when saturated; the returned future
+        resolves to (result, queue_wait_ms).
+        """
+        self._reserve()
+        enqueued_at = time.perf_counter()
+
+        def _job():
+            wait_ms = self._start(enqueued_at)
+            ok = False
+            try:
+                out = fn(*args, **kwargs)
+                ok = True
+                return out, wait_ms
+            finally:
+                self._finish(ok)
+
+        try:
+            fut = self._pool.submit(_job)
+        except Exception:
+            self._unqueue()
+            raise
+        # A caller cancelled while the job was still queued (client went away):
+        # _job never runs, so hand the reservation back here
+        fut.add_done_callback(lambda f: self._unqueue() if f.cancelled() else None)
+        return asyncio.wrap_future(fut)
+
+    async def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Tuple[Any, float]:
+        """Run `fn` on the pool and await it. Returns (result, queue_wait_ms)."""
+        return await self.submit(fn, *args, **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            started = self.completed + self.failed + self._running
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "running": self._running,
+                "queued": self._queued,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "avg_wait_ms": round(self._wait_total_ms / started, 1) if started else 0.0,
+                "max_wait_ms": round(self.max_wait_ms, 1),
+                "last_wait_ms": round(self.last_wait_ms, 1),
+            }
+
+
+_extraction_executor: Optional[BoundedExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_extraction_executor() -> BoundedExecutor:
+    global _extraction_executor
+    if _extraction_executor is None:
+        with _executor_lock:
+            if _extraction_executor is None:
+                _extraction_executor = BoundedExecutor(EXTRACTION_WORKERS, EXTRACTION_QUEUE_MAX, name="extract")
+    return _extraction_executor
@@ -1,5 +1,252 @@
-from typing import Dict
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, List, Optional
 
-# WARNING: In-memory storage is for hackathon/dev purposes only.
-# It will be cleared when the server restarts and is not suitable for production.
-document_storage: Dict[str, str] = {}
\ No newline at end of file
+from starlette.concurrency import run_in_threadpool
+
+from .services.cache import LRUCache, json_size
+
+# ===== Config =====
+SESSION_BACKEND = (os.getenv("SESSION_STORE") or "memory").strip().lower()   # "memory" | "sqlite"
+SESSION_TTL_S = float(os.getenv("SESSION_TTL_S") or 6 * 3600)
+SESSION_MAX_MB = int(os.getenv("SESSION_MAX_MB") or 256)
+SESSION_MAX_ITEMS = int(os.getenv("SESSION_MAX_ITEMS") or 10000)
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH") or os.path.join(tempfile.gettempdir(), "genx-sessions.sqlite3")
+
+
+class SessionNotFound(KeyError):
+    def __str__(self) -> str:
+        return f"Unknown or expired session_id: {self.args[0]}"
+
+
+class BlocksNotFound(SessionNotFound):
+    def __str__(self) -> str:
+        return f"None of block_ids {sorted(self.args[1])} are in session {self.args[0]}"
+
+
+class SessionTooLarge(ValueError):
+    """The document alone is over the session store's byte budget."""
+
+    def __init__(self, size: int, max_bytes: int):
+        super().__init__(
+            f"Document is too large to keep as a session ({size / 1048576:.1f} MB, limit {max_bytes / 1048576:.0f} MB)."
+        )
+        self.size = size
+        self.max_bytes = max_bytes
+
+
+class SessionStore(ABC):
+    """
+    Where uploaded documents live between requests.
+    A session is {"filename": str, "full_text": str, "blocks": [{"id", "text", ...}]}.
+    """
+
+    @abstractmethod
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]: ...
+
+    @abstractmethod
+    def put(self, session_id: str, doc: Dict[str, Any]) -> None:
+        """Store doc, or raise SessionTooLarge when it does not fit at all."""
+
+    @abstractmethod
+    def delete(self, session_id: str) -> bool: ...
+
+    @abstractmethod
+    def stats(self) -> Dict[str, Any]: ...
+
+
+class MemorySessionStore(SessionStore):
+    """Per-process store: TTL per entry, LRU eviction past the item or byte budget."""
+
+    def __init__(self, ttl: float = SESSION_TTL_S, max_bytes: int = SESSION_MAX_MB * 1024 * 1024, max_items: int = SESSION_MAX_ITEMS):
+        self._cache = LRUCache(max_items=max_items, max_bytes=max_bytes, ttl=ttl)
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        return self._cache.get(session_id)
+
+    def put(self, session_id: str, doc: Dict[str, Any]) -> None:
+        if not self._cache.set(session_id, doc):
+            raise SessionTooLarge(json_size(doc), self._cache.max_bytes)
+
+    def delete(self, session_id: str) -> bool:
+        return self._cache.delete(session_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "memory", **self._cache.stats()}
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Host-wide store in one SQLite file (WAL, memory-mapped reads), shared by every
+    uvicorn worker process. Expired rows are never returned and are purged on
+    write; past the byte budget the least recently accessed sessions are dropped.
+    Hit/miss/eviction counters are per process.
+    """
+
+    def __init__(self, path: str = SESSION_DB_PATH, ttl: float = SESSION_TTL_S, max_bytes: int = SESSION_MAX_MB * 1024 * 1024):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                " id TEXT PRIMARY KEY, data TEXT NOT NULL, size INTEGER NOT NULL,"
+                " expires REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS sessions_accessed ON sessions(accessed)")
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite3 connections are not shareable across threads; keep one per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA mmap_size={max(self.max_bytes, 64 * 1024 * 1024)}")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, attr: str, n: int = 1) -> None:
+        with self._lock:
+            setattr(self, attr, getattr(self, attr) + n)
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        conn = self._conn()
+        row = conn.execute("SELECT data, expires FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        if row is None:
+            self._count("misses")
+            return None
+        if row[1] < now:
+            conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+            self._count("expirations")
+            self._count("misses")
+            return None
+        conn.execute("UPDATE sessions SET accessed = ? WHERE id = ?", (now, session_id))
+        self._count("hits")
+        return json.loads(row[0])
+
+    def put(self, session_id: str, doc: Dict[str, Any]) -> None:
+        data = json.dumps(doc, ensure_ascii=False)
+        size = len(data.encode("utf-8"))
+        if self.max_bytes and size > self.max_bytes:
+            raise SessionTooLarge(size, self.max_bytes)
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            cur = conn.execute("DELETE FROM sessions WHERE expires < ?", (now,))
+            if cur.rowcount > 0:
+                self._count("expirations", cur.rowcount)
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions (id, data, size, expires, accessed) VALUES (?, ?, ?, ?, ?)",
+                (session_id, data, size, now + self.ttl, now),
+            )
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM sessions").fetchone()[0]
+            if self.max_bytes and total > self.max_bytes:
+                # Oldest-accessed first, never the session just written
+                for sid, sz in conn.execute(
+                    "SELECT id, size FROM sessions WHERE id != ? ORDER BY accessed", (session_id,)
+                ).fetchall():
+                    conn.execute("DELETE FROM sessions WHERE id = ?", (sid,))
+                    self._count("evictions")
+                    total -= sz
+                    if total <= self.max_bytes:
+                        break
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def delete(self, session_id: str) -> bool:
+        cur = self._conn().execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+        return cur.rowcount > 0
+
+    def stats(self) -> Dict[str, Any]:
+        items, size = self._conn().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM sessions").fetchone()
+        with self._lock:
+            return {
+                "backend": "sqlite",
+                "path": self.path,
+                "items": items,
+                "bytes": size,
+                "max_bytes": self.max_bytes,
+                "ttl_s": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+_store: Optional[SessionStore] = None
+_store_lock = threading.Lock()
+
+
+def get_session_store() -> SessionStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = SQLiteSessionStore() if SESSION_BACKEND == "sqlite" else MemorySessionStore()
+    return _store
+
+
+def create_session(filename: str, full_text: str, blocks: List[Dict[str, Any]]) -> str:
+    """
+    Store an extracted document and return the session id clients use to refer to it.
+    Raises SessionTooLarge when the document is over the store's byte budget.
+    """
+    session_id = uuid.uuid4().hex
+    get_session_store().put(session_id, {"filename": filename, "full_text": full_text, "blocks": blocks})
+    return session_id
+
+
+def get_session(session_id: str) -> Dict[str, Any]:
+    doc = get_session_store().get(session_id)
+    if doc is None:
+        raise SessionNotFound(session_id)
+    return doc
+
+
+def session_text(session_id: str, block_ids: Optional[Iterable[int]] = None) -> str:
+    """
+    Full text of a session, or only the given blocks (document order) joined by blank lines.
+    Raises SessionNotFound, or BlocksNotFound when none of block_ids is in the session.
+    """
+    doc = get_session(session_id)
+    if not block_ids:
+        return doc["full_text"]
+    wanted = set(block_ids)
+    texts = [b["text"] for b in doc["blocks"] if b["id"] in wanted]
+    if not texts:
+        raise BlocksNotFound(session_id, wanted)
+    return "\n\n".join(texts)
+
+
+def resolve_text(text: Optional[str], session_id: Optional[str], block_ids: Optional[Iterable[int]] = None) -> str:
+    """Inline text wins; otherwise the text comes from the stored session."""
+    if text:
+        return text
+    if session_id:
+        return session_text(session_id, block_ids)
+    return ""
+
+
+async def resolve_text_async(text: Optional[str], session_id: Optional[str], block_ids: Optional[Iterable[int]] = None) -> str:
+    """resolve_text for async routes: SQLite lookups run on the threadpool, off the event loop."""
+    if text or not session_id or isinstance(get_session_store(), MemorySessionStore):
+        return resolve_text(text, session_id, block_ids)
+    return await run_in_threadpool(resolve_text, text, session_id, block_ids)
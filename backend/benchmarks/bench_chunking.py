@@ -0,0 +1,123 @@
+"""
+Chunking throughput on large inputs: the shared span-based chunker against the
+string-splitting version it replaced in the rewriter and timeline services.
+
+Run from backend/:
+
+    python -m benchmarks.bench_chunking [--mb 1] [--runs 5] [--path contract.txt]
+
+Without --path a synthetic contract-like text (numbered clauses, paragraphs,
+sentences) of the requested size is timed in three shapes: as is, flattened to
+one line, and flattened without punctuation (OCR'd tables and lists look like
+this). Both splitters use the same budget (~8k characters / 2000 estimated
+tokens, 200 characters / 50 tokens of overlap).
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import re
+import statistics
+import time
+from typing import Callable, List
+
+from app.services.chunking import chunk_text
+
+MAX_TOKENS = 2000
+OVERLAP_TOKENS = 50
+MAX_CHARS = 8000
+OVERLAP_CHARS = 200
+
+_WORDS = (
+    "the party shall pay within thirty days of written notice under this agreement "
+    "termination liability indemnify licensor licensee confidential information "
+    "including without limitation any obligation hereunder provided that"
+).split()
+
+
+def _legacy_split(text: str, max_len: int = MAX_CHARS, overlap: int = OVERLAP_CHARS) -> List[str]:
+    # The previous per-service splitter, kept here as the baseline
+    text = (text or "").strip()
+    if len(text) <= max_len:
+        return [text]
+    for pattern in [r"\n\n+", r"\n+", r"(?<=[\.!?])\s+", r"\s+"]:
+        parts = re.split(pattern, text)
+        if len(parts) == 1:
+            continue
+        chunks: List[str] = []
+        buf = ""
+        for part in parts:
+            candidate = (buf + (" " if buf else "") + part).strip()
+            if len(candidate) <= max_len:
+                buf = candidate
+            else:
+                if buf:
+                    chunks.append(buf)
+                if len(part) > max_len:
+                    chunks.extend(_legacy_split(part, max_len, overlap))
+                    buf = ""
+                else:
+                    buf = part
+        if buf:
+            chunks.append(buf)
+        if len(chunks) > 1 and overlap > 0:
+            return [c if i == 0 else (chunks[i - 1][-overlap:] + c)[:max_len] for i, c in enumerate(chunks)]
+        return chunks
+    return [text[i:i + max_len] for i in range(0, len(text), max_len - overlap)]
+
+
+def _synthetic(size: int, seed: int = 7) -> str:
+    rng = random.Random(seed)
+    out: List[str] = []
+    total = 0
+    clause = 1
+    while total < size:
+        sentences = " ".join(
+            " ".join(rng.choice(_WORDS) for _ in range(rng.randint(6, 28))).capitalize() + "."
+            for _ in range(rng.randint(1, 7))
+        )
+        para = f"{clause}. {sentences}" if rng.random() < 0.3 else sentences
+        clause += para[0].isdigit()
+        out.append(para)
+        total += len(para) + 2
+    return "\n\n".join(out)[:size]
+
+
+def _time(fn: Callable[[], list], runs: int) -> tuple:
+    timings = []
+    result: list = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        result = fn()
+        timings.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(timings), result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mb", type=float, default=1.0)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--path", help="chunk this text file instead of synthetic input")
+    args = parser.parse_args()
+
+    if args.path:
+        with open(args.path, encoding="utf-8") as f:
+            inputs = [(os.path.basename(args.path), f.read())]
+    else:
+        text = _synthetic(int(args.mb * 1024 * 1024))
+        one_line = text.replace("\n\n", " ")
+        inputs = [("paragraphs", text), ("one line", one_line), ("no punctuation", one_line.replace(".", ""))]
+
+    print(f"median of {args.runs} runs")
+    for name, text in inputs:
+        mb = len(text) / 1024 / 1024
+        new_ms, spans = _time(lambda: chunk_text(text, MAX_TOKENS, OVERLAP_TOKENS), args.runs)
+        old_ms, pieces = _time(lambda: _legacy_split(text), args.runs)
+        print(f"\n{name} ({mb:.2f} MB)")
+        print(f"  chunk_text      {new_ms:9.1f} ms   {len(spans):5d} chunks   {mb / (new_ms / 1000):7.1f} MB/s")
+        print(f"  legacy splitter {old_ms:9.1f} ms   {len(pieces):5d} chunks   {mb / (old_ms / 1000):7.1f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
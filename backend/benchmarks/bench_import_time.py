@@ -0,0 +1,95 @@
+"""
+Cold-start cost of `import app.main`, measured in fresh interpreters.
+
+Run from backend/:
+
+    python -m benchmarks.bench_import_time [--runs 5] [--max-ms 800] [--top 15]
+
+Each run is a new process, so nothing is already imported or cached in memory.
+It also checks that the heavy SDKs (Gen AI, Document AI, numpy, faiss, pypdf,
+python-docx) are *not* imported by the app module itself. They belong to the
+background warmup. With --max-ms, or when a heavy module shows up, the exit
+status is 1, so the script can gate CI.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+HEAVY_MODULES = (
+    "google.genai",
+    "google.cloud.documentai_v1",
+    "numpy",
+    "faiss",
+    "pypdf",
+    "docx",
+)
+
+_PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+import app.main
+ms = (time.perf_counter() - t0) * 1000
+print(json.dumps({"ms": ms, "heavy": [m for m in %r if m in sys.modules]}))
+""" % (HEAVY_MODULES,)
+
+_BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _run_once() -> dict:
+    out = subprocess.run(
+        [sys.executable, "-c", _PROBE],
+        cwd=_BACKEND_DIR, capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def _top_imports(n: int) -> list:
+    """Largest cumulative entries from `python -X importtime`."""
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=_BACKEND_DIR, capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _self_us, cum_us, name = line[len("import time:"):].split("|", 2)
+        rows.append((int(cum_us), name.strip()))
+    rows.sort(reverse=True)
+    return rows[:n]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-ms", type=float, default=0, help="fail if the median exceeds this")
+    parser.add_argument("--top", type=int, default=15, help="show the N slowest imports (0 to skip)")
+    args = parser.parse_args()
+
+    results = [_run_once() for _ in range(args.runs)]
+    timings = [r["ms"] for r in results]
+    heavy = sorted({m for r in results for m in r["heavy"]})
+    median = statistics.median(timings)
+
+    print(f"import app.main over {args.runs} fresh interpreters")
+    print(f"  median {median:.0f} ms   min {min(timings):.0f} ms   max {max(timings):.0f} ms")
+    print(f"  heavy modules imported eagerly: {', '.join(heavy) if heavy else 'none'}")
+
+    if args.top:
+        print("\nslowest imports (cumulative):")
+        for cum_us, name in _top_imports(args.top):
+            print(f"  {cum_us / 1000:8.1f} ms  {name}")
+
+    failed = bool(heavy) or (args.max_ms and median > args.max_ms)
+    if failed:
+        print("\nFAIL: import-time budget exceeded" if not heavy else "\nFAIL: heavy SDK imported at app import")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
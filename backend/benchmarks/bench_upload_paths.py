@@ -0,0 +1,54 @@
+"""
+End-to-end /api/upload latency: local text-layer fast path vs. Document AI for every page.
+
+Run from backend/ with the usual .env (the OCR path needs real Document AI credentials):
+
+    python -m benchmarks.bench_upload_paths path/to/contract.pdf [--runs 5]
+
+The extraction cache is disabled so every run does the full work.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import time
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services import extractor
+
+
+def _time_uploads(client: TestClient, path: str, runs: int) -> list:
+    with open(path, "rb") as f:
+        data = f.read()
+    name = os.path.basename(path)
+    timings = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        res = client.post("/api/upload", files={"file": (name, data, "application/pdf")})
+        res.raise_for_status()
+        timings.append((time.perf_counter() - t0) * 1000)
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdf")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    extractor.CACHE_ENABLED = False
+    client = TestClient(app)
+    for label, text_layer in (("text-layer", True), ("ocr-only", False)):
+        extractor.TEXT_LAYER_ENABLED = text_layer
+        ms = _time_uploads(client, args.pdf, args.runs)
+        print(
+            f"{label:<11} runs={len(ms)} median={statistics.median(ms):8.1f} ms "
+            f"min={min(ms):8.1f} ms max={max(ms):8.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+import os
+
+from app.services.cache import DiskCache
+from app.services.extraction_cache import ExtractionCache
+
+
+def _on_disk(directory):
+    return sum(os.path.getsize(os.path.join(directory, n)) for n in os.listdir(directory) if n.endswith(".json"))
+
+
+def test_disk_cache_keeps_a_running_total(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=1000)
+    for i in range(5):
+        cache.set(f"k{i}", {"text": "x" * 180})
+    stats = cache.stats()
+    assert stats["items"] == 5 and stats["bytes"] == _on_disk(tmp_path) <= 1000
+
+    assert cache.get("k0") is not None  # k1 is now the least recently used
+    cache.set("k5", {"text": "x" * 180})
+    assert cache.get("k1") is None
+    assert cache.get("k0") is not None
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["bytes"] == _on_disk(tmp_path)
+
+    # overwriting replaces the old size instead of adding to it
+    cache.set("k0", {"text": "y"})
+    assert cache.stats()["bytes"] == _on_disk(tmp_path)
+    assert cache.delete("k0")
+    assert cache.stats()["bytes"] == _on_disk(tmp_path)
+
+    reopened = DiskCache(str(tmp_path), max_bytes=1000)
+    assert reopened.stats()["items"] == cache.stats()["items"]
+    assert reopened.stats()["bytes"] == _on_disk(tmp_path)
+
+
+def test_extraction_memory_tier_has_a_byte_budget(tmp_path):
+    cache = ExtractionCache(memory_items=64, memory_max_mb=1, disk_dir=str(tmp_path))
+    small = {"full_text": "a" * 1000, "blocks": []}
+    big = {"full_text": "b" * (2 * 1024 * 1024), "blocks": []}
+    cache.set("small", small)
+    cache.set("big", big)
+    memory = cache.memory.stats()
+    assert memory["items"] == 1 and memory["bytes"] <= 1024 * 1024 and memory["rejections"] == 1
+    # over the memory budget, still served from disk
+    assert cache.get("big") == big
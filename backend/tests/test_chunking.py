@@ -0,0 +1,112 @@
+import random
+
+import pytest
+
+from app.services.chunking import CHARS_PER_TOKEN, chunk_text, count_tokens
+
+_WORDS = ["word", "a", "ion", "Deliverable", "x" * 50, "1.5", "e.g.", "end.", "Q?", "“quoted.”", "été"]
+_SEPARATORS = [" ", "  ", "\t", "\n", "\n\n", " \n \n", " ", "\r\n"]
+
+
+def _random_text(rng: random.Random) -> str:
+    parts = []
+    for _ in range(rng.randint(0, 400)):
+        parts.append(rng.choice(_WORDS) if rng.random() < 0.99 else "b" * rng.randint(100, 9000))
+        parts.append(rng.choice(_SEPARATORS))
+    return "".join(parts)
+
+
+def _cases(count: int = 400):
+    rng = random.Random(20)
+    for _ in range(count):
+        yield (
+            _random_text(rng),
+            rng.choice([1, 2, 3, 5, 10, 50, 200, 2000]),
+            rng.choice([0, 5, 50]),
+            rng.random() < 0.5,
+        )
+
+
+def _check(text: str, max_tokens: int, overlap: int, content_defined: bool) -> None:
+    chunks = chunk_text(text, max_tokens, overlap, content_defined=content_defined)
+    pos = 0
+    for c in chunks:
+        # Every non-space character is covered once, in order
+        assert pos <= c.start < c.end
+        assert not text[pos:c.start].strip()
+        assert not text[c.start].isspace() and not text[c.end - 1].isspace()
+        # Within budget, by the same estimate count_tokens reports
+        assert c.tokens == count_tokens(c.text(text)) <= max_tokens
+        assert c.context_start <= c.start
+        # Cuts fall between words; only a single word longer than the budget is split
+        if c.end < len(text) and not text[c.end].isspace():
+            assert not any(ch.isspace() for ch in c.text(text))
+            assert c.end - c.start == max_tokens * CHARS_PER_TOKEN
+        pos = c.end
+    assert not text[pos:].strip()
+
+
+@pytest.mark.parametrize("text,max_tokens,overlap,content_defined", list(_cases()))
+def test_invariants_on_random_text(text, max_tokens, overlap, content_defined):
+    _check(text, max_tokens, overlap, content_defined)
+
+
+def test_tab_separated_words_are_boundaries():
+    text = "\t".join(["Deliverable", "Milestone", "Amount"] * 800)
+    chunks = chunk_text(text, 2000, 50)
+    assert len(chunks) > 1
+    for c in chunks[:-1]:
+        assert text[c.end] == "\t"
+    assert [c.text("word\tword") for c in chunk_text("word\tword", 2)] == ["word", "word"]
+
+
+def test_terminates_on_budget_of_one():
+    text = "ion\ta  a "
+    assert [c.text(text) for c in chunk_text(text, 1)] == ["ion", "a", "a"]
+
+
+def test_word_longer_than_budget_is_cut_at_budget():
+    text = "x" * 100 + " tail"
+    chunks = chunk_text(text, 10)
+    assert [c.end - c.start for c in chunks[:-1]] == [40, 40]
+    assert chunks[-1].text(text) == "x" * 20 + " tail"
+
+
+def test_prefers_paragraph_break_over_later_sentence_end():
+    first = "One sentence here. " * 30
+    text = first.strip() + "\n\n" + "Another one follows. " * 30
+    chunks = chunk_text(text, count_tokens(first) + 40)
+    assert chunks[0].text(text) == first.strip()
+
+
+def test_empty_and_blank_text():
+    assert chunk_text("", 10) == []
+    assert chunk_text(" \n\t ", 10) == []
+
+
+def test_overlap_reaches_into_previous_chunk():
+    text = " ".join(f"Sentence number {i} ends here." for i in range(400))
+    chunks = chunk_text(text, 200, 20)
+    assert chunks[0].context_start == chunks[0].start
+    for prev, cur in zip(chunks, chunks[1:]):
+        assert prev.start < cur.context_start < cur.start
+        assert count_tokens(cur.context(text)) <= 20 + 5
+
+
+def test_content_defined_chunks_resync_after_edit():
+    rng = random.Random(5)
+    sentences = [
+        " ".join(rng.choice(["party", "shall", "pay", "notice", "term", "fee", "within"]) for _ in range(rng.randint(6, 20)))
+        + "."
+        for _ in range(3000)
+    ]
+    text = " ".join(sentences)
+    before = [c.text(text) for c in chunk_text(text, 500, content_defined=True)]
+    for _ in range(10):
+        at = text.index(" ", rng.randrange(len(text) - 10))
+        edited = text[:at] + " an inserted clause" + text[at:]
+        after = [c.text(edited) for c in chunk_text(edited, 500, content_defined=True)]
+        changed = [c for c in after if c not in set(before)]
+        # Only the chunks around the edit change; the rest line up again
+        assert len(changed) <= 2
+        assert len(after) - len(changed) >= len(before) - 3
@@ -0,0 +1,51 @@
+import pytest
+
+from app.services.outline import parse_outline
+
+
+def _tree(labels):
+    text = "\n".join(f"{label} Item {n} text that goes on for a while." for n, label in enumerate(labels))
+    roots = parse_outline(text)
+
+    def shape(node):
+        return (node.title.split(" ", 1)[0], node.style, [shape(c) for c in node.children])
+
+    return [shape(r) for r in roots]
+
+
+def _styles(labels):
+    found = {}
+
+    def walk(items):
+        for label, style, children in items:
+            found.setdefault(label, []).append(style)
+            walk(children)
+
+    walk(_tree(labels))
+    return found
+
+
+@pytest.mark.parametrize("before, label", [("(h)", "(i)"), ("(u)", "(v)"), ("(w)", "(x)")])
+def test_next_letter_after_alpha_sibling_is_alpha(before, label):
+    tree = _tree(["1.", before, label, "2."])
+    assert tree[0][2] == [(before, "alpha", []), (label, "alpha", [])]
+
+
+def test_roman_list_starts_at_i_and_continues():
+    labels = ["1.", "(a)"] + [f"({r})" for r in ("i", "ii", "iii", "iv", "v", "vi", "vii", "viii", "ix", "x")] + ["(b)"]
+    tree = _tree(labels)
+    a, b = tree[0][2]
+    assert a[0] == "(a)" and b[0] == "(b)"
+    assert [(c[0], c[1]) for c in a[2]] == [(f"({r})", "roman") for r in ("i", "ii", "iii", "iv", "v", "vi", "vii", "viii", "ix", "x")]
+
+
+def test_innermost_list_wins():
+    # "(v)" after "(iv)" inside "(u)" continues the numerals
+    tree = _tree(["1.", "(u)", "(i)", "(ii)", "(iii)", "(iv)", "(v)", "2."])
+    u = tree[0][2][0]
+    assert u[0] == "(u)" and [c[0] for c in u[2]] == ["(i)", "(ii)", "(iii)", "(iv)", "(v)"]
+
+
+def test_ambiguous_label_without_context():
+    assert _styles(["1.", "(i)", "2."])["(i)"] == ["roman"]
+    assert _styles(["1.", "(v)", "2."])["(v)"] == ["alpha"]
@@ -0,0 +1,45 @@
+import asyncio
+
+import pytest
+
+from app.services.rate_limit import ModelGate, ModelUnavailable, TokenBucket
+
+
+def test_reserve_over_max_wait_takes_nothing():
+    bucket = TokenBucket(60)  # one unit per second
+    assert bucket.reserve(60) == 0.0
+    assert bucket.reserve(10, max_wait=1.0) is None
+    assert bucket.available() < 1
+    assert bucket.reserve(1, max_wait=2.0) == pytest.approx(1.0, abs=0.05)
+
+
+def test_refund_is_capped_at_capacity():
+    bucket = TokenBucket(60)
+    bucket.refund(30)
+    assert bucket.available() == pytest.approx(60)
+
+
+def test_rejected_call_leaves_budget_untouched():
+    gate = ModelGate(rpm=600, tpm=100, deadline_s=0.5)
+    gate.tokens.reserve(100)
+    before = gate.requests.available()
+    with pytest.raises(ModelUnavailable):
+        asyncio.run(gate.call_async(lambda: asyncio.sleep(0), est_tokens=50))
+    assert gate.requests.available() == pytest.approx(before, abs=0.1)
+    assert gate.tokens.available() < 5
+
+
+def test_cancelled_call_refunds_its_reservation():
+    gate = ModelGate(rpm=600, tpm=600, deadline_s=30)
+    gate.tokens.reserve(600)
+
+    async def run():
+        task = asyncio.create_task(gate.call_async(lambda: asyncio.sleep(0), est_tokens=60))
+        await asyncio.sleep(0.05)  # queued on the TPM bucket for ~6 s
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+    assert gate.tokens.available() == pytest.approx(0, abs=2)
+    assert gate.requests.available() == pytest.approx(600, abs=1)
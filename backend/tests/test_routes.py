@@ -0,0 +1,68 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.models import REWRITE_MAX_CHARS, RiskFlags
+from app.routes import rewrite, risk_radar
+from app.services.risk_radar import detector
+from app.storage import create_session
+
+app = FastAPI()
+app.include_router(rewrite.router, prefix="/api")
+app.include_router(risk_radar.router, prefix="/api")
+client = TestClient(app)
+
+# ~35k characters in clauses of ~350
+CLAUSES = [f"{i}. The tenant shall pay rent on the first day of each month, and late payments accrue interest. " * 3 for i in range(1, 121)]
+LONG_TEXT = "\n\n".join(CLAUSES)
+
+
+def _session() -> str:
+    return create_session("lease.txt", LONG_TEXT, [{"id": i, "text": t} for i, t in enumerate(CLAUSES, 1)])
+
+
+def test_rewrite_caps_session_text_like_inline_text(monkeypatch):
+    async def fake_rewrite(text, mode="layman"):
+        return text.upper(), {"chunks": 1}
+
+    monkeypatch.setattr(rewrite, "rewrite_text_async", fake_rewrite)
+    assert len(LONG_TEXT) > REWRITE_MAX_CHARS
+    assert client.post("/api/rewrite", json={"text": LONG_TEXT}).status_code == 422
+    sid = _session()
+    r = client.post("/api/rewrite", json={"session_id": sid})
+    assert r.status_code == 413
+    assert client.post("/api/rewrite/stream", json={"session_id": sid}).status_code == 413
+    # A selection of clauses under the limit goes through
+    r = client.post("/api/rewrite", json={"session_id": sid, "block_ids": [1, 2]})
+    assert r.status_code == 200
+    assert r.json()["rewritten_text"] == "\n\n".join(CLAUSES[:2]).upper()
+
+
+def test_risk_scan_takes_a_whole_contract_in_pieces(monkeypatch):
+    prompts = []
+
+    async def fake_json(prompt, schema):
+        prompts.append(prompt)
+        return RiskFlags(flags=[{"term": "late payments", "explanation": "interest"}])
+
+    monkeypatch.setattr(detector, "generate_json_async", fake_json)
+    for body in ({"text": LONG_TEXT}, {"session_id": _session()}):
+        prompts.clear()
+        r = client.post("/api/risk/scan", json=body)
+        assert r.status_code == 200
+        flagged = r.json()["flagged_clauses"]
+        assert len(flagged) == len(prompts) > 1
+        assert all(len(fc["clause"]) <= REWRITE_MAX_CHARS for fc in flagged)
+        # pieces come back in document order and cover the text
+        assert flagged[0]["clause"].startswith("1. ")
+        assert flagged[-1]["clause"].endswith(CLAUSES[-1].strip())
+        assert r.json()["risk_summary"].endswith(f"{len(flagged)} contextual.")
+
+
+def test_risk_scan_short_clause_is_one_entry(monkeypatch):
+    async def fake_json(prompt, schema):
+        return RiskFlags(flags=[])
+
+    monkeypatch.setattr(detector, "generate_json_async", fake_json)
+    r = client.post("/api/risk/scan", json={"text": " Tenant shall indemnify landlord. "})
+    assert r.status_code == 200
+    assert [fc["clause"] for fc in r.json()["flagged_clauses"]] == [" Tenant shall indemnify landlord. "]
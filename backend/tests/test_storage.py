@@ -0,0 +1,35 @@
+import pytest
+
+from app.services.cache import LRUCache
+from app.storage import MemorySessionStore, SessionTooLarge, SQLiteSessionStore
+
+
+def test_lru_set_reports_oversized_value():
+    cache = LRUCache(max_bytes=10)
+    assert cache.set("a", "short") is True
+    assert cache.set("b", "x" * 50) is False
+    assert "a" in cache and "b" not in cache
+    assert cache.stats()["rejections"] == 1
+
+
+@pytest.mark.parametrize("make", [
+    lambda tmp_path: MemorySessionStore(max_bytes=1000),
+    lambda tmp_path: SQLiteSessionStore(path=str(tmp_path / "s.sqlite3"), max_bytes=1000),
+])
+def test_oversized_session_raises_and_keeps_the_others(make, tmp_path):
+    store = make(tmp_path)
+    store.put("small", {"filename": "a", "full_text": "hi", "blocks": []})
+    with pytest.raises(SessionTooLarge):
+        store.put("big", {"filename": "b", "full_text": "x" * 5000, "blocks": []})
+    assert store.get("big") is None
+    assert store.get("small")["full_text"] == "hi"
+
+
+def test_unknown_block_ids_raise(monkeypatch):
+    from app import storage
+
+    monkeypatch.setattr(storage, "_store", MemorySessionStore())
+    sid = storage.create_session("a.txt", "one\ntwo", [{"id": 1, "text": "one"}, {"id": 2, "text": "two"}])
+    assert storage.session_text(sid, [2, 7]) == "two"
+    with pytest.raises(storage.BlocksNotFound):
+        storage.session_text(sid, [7])
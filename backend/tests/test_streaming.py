@@ -0,0 +1,60 @@
+import asyncio
+import time
+
+from app.routes.common import until_disconnected
+
+
+class _Client:
+    def __init__(self, leaves_after: float):
+        self.leaves_at = time.monotonic() + leaves_after
+
+    async def is_disconnected(self) -> bool:
+        return time.monotonic() >= self.leaves_at
+
+
+def test_disconnect_cancels_a_stalled_stream():
+    closed = []
+
+    async def tokens():
+        try:
+            yield "first"
+            await asyncio.sleep(30)  # the model stalls before the next token
+            yield "never"
+        finally:
+            closed.append(True)
+
+    async def run():
+        return [t async for t in until_disconnected(_Client(0.1), tokens(), poll_s=0.02)]
+
+    t0 = time.monotonic()
+    assert asyncio.run(run()) == ["first"]
+    assert time.monotonic() - t0 < 1
+    assert closed == [True]
+
+
+def test_passes_everything_through_while_connected():
+    async def tokens():
+        for i in range(3):
+            yield i
+
+    async def run():
+        return [t async for t in until_disconnected(_Client(60), tokens(), poll_s=0.02)]
+
+    assert asyncio.run(run()) == [0, 1, 2]
+
+
+def test_stream_errors_propagate():
+    async def tokens():
+        yield 1
+        raise RuntimeError("model failed")
+
+    async def run():
+        out = []
+        try:
+            async for t in until_disconnected(_Client(60), tokens()):
+                out.append(t)
+        except RuntimeError as e:
+            out.append(str(e))
+        return out
+
+    assert asyncio.run(run()) == [1, "model failed"]
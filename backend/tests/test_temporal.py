@@ -0,0 +1,40 @@
+import pytest
+
+from app.services.temporal import find_temporal
+
+
+def _values(text):
+    return [(e.kind, e.value) for e in find_temporal(text)]
+
+
+@pytest.mark.parametrize(
+    "text, value",
+    [
+        ("within 3 months of the first day of the Term", "P3M"),
+        ("within two weeks of Monday", "P2W"),
+        ("no later than thirty (30) days after the Effective Date", "P30D"),
+        ("within 2 quarters of the first day of each year", "P6M"),
+        ("for a period of 5 years from the date of delivery", "P5Y"),
+    ],
+)
+def test_duration_unit_is_the_counted_one(text, value):
+    assert _values(text)[0] == ("relative", value)
+
+
+@pytest.mark.parametrize(
+    "text",
+    ["The Supplier may 5 units per order.", "Section 2 may 2024 be amended.", "Either party may 30 days"],
+)
+def test_modal_may_is_not_a_month(text):
+    assert all(e.kind != "absolute" for e in find_temporal(text))
+
+
+@pytest.mark.parametrize(
+    "text, value",
+    [("Signed May 5, 2024.", "2024-05-05"), ("due may 5, 2024", "2024-05-05"), ("on 2 May 2024", "2024-05-02"), ("MAY 2024", None)],
+)
+def test_month_may_is_still_a_date(text, value):
+    found = find_temporal(text)
+    assert found and found[0].kind == "absolute"
+    if value:
+        assert found[0].value == value
@@ -0,0 +1,68 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.services.workers import BoundedExecutor, gather_limited
+
+
+def test_cancelled_queued_job_releases_its_slot():
+    executor = BoundedExecutor(max_workers=1, max_queue=1)
+    release = threading.Event()
+
+    async def run():
+        busy = executor.submit(release.wait, 5)
+        try:
+            queued = executor.submit(lambda: "never")
+            await asyncio.sleep(0.05)
+            assert executor.stats()["queued"] == 1
+            queued.cancel()
+            await asyncio.sleep(0)
+            assert executor.stats()["queued"] == 0
+        finally:
+            release.set()
+            await busy
+        # the freed slot takes new work again
+        assert (await executor.run(lambda: "ok"))[0] == "ok"
+
+    asyncio.run(run())
+    stats = executor.stats()
+    assert stats["queued"] == 0 and stats["running"] == 0
+
+
+def test_gather_limited_keeps_order_and_limit():
+    running = 0
+    peak = 0
+
+    async def job(i):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01 * (5 - i))
+        running -= 1
+        return i
+
+    assert asyncio.run(gather_limited([job(i) for i in range(5)], 2)) == [0, 1, 2, 3, 4]
+    assert peak == 2
+
+
+def test_gather_limited_failure_cancels_siblings():
+    cancelled = []
+
+    async def slow(i):
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(i)
+            raise
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("bad")
+
+    async def run():
+        with pytest.raises(ValueError):
+            await gather_limited([slow(0), fail(), slow(2)], 3)
+
+    asyncio.run(run())
+    assert sorted(cancelled) == [0, 2]
@@ -6,6 +6,7 @@ const endpoints = {
   map: "/map",
   risk: "/risk/scan",
   ask: "/ask",
+  askStream: "/ask/stream",
   contextualize: "/contextualize/scan"
 };
 
@@ -36,6 +37,38 @@ async function apiPost(endpoint, data, isForm=false){
   return res.json();
 }
 
+// POST JSON and read a text/event-stream answer; onEvent(name, data) per event
+async function apiStream(endpoint, data, onEvent){
+  const res = await fetch(baseURL + endpoint, {
+    method:"POST",
+    headers:{ "Content-Type":"application/json" },
+    body: JSON.stringify(data)
+  });
+  if(!res.ok){
+    const msg = await res.text();
+    throw new Error(msg || res.statusText);
+  }
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buf = "";
+  for(;;){
+    const { value, done } = await reader.read();
+    if(done) break;
+    buf += decoder.decode(value, { stream:true });
+    let sep;
+    while((sep = buf.indexOf("\n\n")) >= 0){
+      const raw = buf.slice(0, sep);
+      buf = buf.slice(sep + 2);
+      let name = "message", payload = "";
+      raw.split("\n").forEach(line=>{
+        if(line.startsWith("event:")) name = line.slice(6).trim();
+        else if(line.startsWith("data:")) payload += line.slice(5).trim();
+      });
+      if(payload) onEvent(name, JSON.parse(payload));
+    }
+  }
+}
+
 // Navigation
 const navToggle = $("#navToggle");
 const navLinks = $("#navLinks");
@@ -66,8 +99,41 @@ $$(".tab-btn").forEach(btn=>{
 
 // Global State
 let LAST_TEXT = "";
+let SESSION_ID = null;
+
+// Server keeps the uploaded text; send the session id instead of the full contract
+function docRef(textField){
+  return SESSION_ID ? { session_id: SESSION_ID } : { [textField]: LAST_TEXT };
+}
 let LAST_RESULTS = { simple:"", advanced:"", timeline:[], risks:[] };
 
+// /rewrite takes at most this many characters, from a session too
+const REWRITE_MAX_CHARS = 20000;
+
+// Rewrite request bodies for the uploaded document: the whole session when it fits,
+// else runs of clauses (block_ids) under the limit; a single longer clause goes inline in slices
+function rewriteBatches(clauses){
+  if(!SESSION_ID || LAST_TEXT.length <= REWRITE_MAX_CHARS) return [docRef("text")];
+  const batches = [];
+  let ids = [], size = 0;
+  const flush = ()=>{ if(ids.length) batches.push({ session_id: SESSION_ID, block_ids: ids }); ids = []; size = 0; };
+  (clauses || []).forEach(c=>{
+    const text = c.text || "";
+    if(text.length > REWRITE_MAX_CHARS){
+      flush();
+      for(let i = 0; i < text.length; i += REWRITE_MAX_CHARS){
+        batches.push({ text: text.slice(i, i + REWRITE_MAX_CHARS) });
+      }
+      return;
+    }
+    if(ids.length && size + 2 + text.length > REWRITE_MAX_CHARS) flush();
+    size += (ids.length ? 2 : 0) + text.length;
+    ids.push(c.id);
+  });
+  flush();
+  return batches;
+}
+
 // Upload + Analyze Flow
 const uploadBtn = $("#uploadBtn");
 const fileInput = $("#fileInput");
@@ -90,15 +156,18 @@ uploadBtn?.addEventListener("click", async ()=>{
     const uploadRes = await apiPost(endpoints.upload, fd, true);
 
     LAST_TEXT = uploadRes.full_text;
+    SESSION_ID = uploadRes.session_id || null;
     fileBadge.hidden = false;
     setText(fileBadge, uploadRes.filename);
     setText(uploadStatus, "File uploaded. Running analysis…");
 
     // Step 2: Rewrite simplified
-    const simple = await apiPost(endpoints.rewrite, { text: LAST_TEXT, mode:"layman" });
+    const parts = await Promise.all(
+      rewriteBatches(uploadRes.clauses).map(body => apiPost(endpoints.rewrite, { ...body, mode:"layman" }))
+    );
 
     // Show simplified + original
-    LAST_RESULTS.simple = simple.rewritten_text;
+    LAST_RESULTS.simple = parts.map(p => p.rewritten_text).join("\n\n");
     LAST_RESULTS.advanced = LAST_TEXT;
 
     $("#resultsEmpty").style.display="none";
@@ -106,7 +175,7 @@ uploadBtn?.addEventListener("click", async ()=>{
     setHTMLSafe($("#advanced"), LAST_RESULTS.advanced);
 
     // Step 3: Timeline
-    const mapRes = await apiPost(endpoints.map, { contract_text: LAST_TEXT });
+    const mapRes = await apiPost(endpoints.map, docRef("contract_text"));
     LAST_RESULTS.timeline = mapRes.timeline || [];
     if(LAST_RESULTS.timeline.length){
       $("#timelineEmpty").style.display="none";
@@ -120,7 +189,7 @@ uploadBtn?.addEventListener("click", async ()=>{
     }
 
     // Step 4: Risk scan
-    const riskRes = await apiPost(endpoints.risk, { text: LAST_TEXT });
+    const riskRes = await apiPost(endpoints.risk, docRef("text"));
 
     // Extract risks from backend response
     LAST_RESULTS.risks = [];
@@ -193,7 +262,7 @@ askBtn?.addEventListener("click", async ()=>{
 
   askBtn.disabled = true;
   try{
-    const res = await apiPost(endpoints.ask, { contract_text: LAST_TEXT, question: q });
+    const res = await apiPost(endpoints.ask, { ...docRef("contract_text"), question: q });
     alert("Answer: " + res.answer);
   }catch(err){
     alert("Error: " + err.message);
@@ -233,10 +302,21 @@ chatForm?.addEventListener("submit", async (e)=>{
   thinking.textContent="Thinking…";
   chatMessages.appendChild(thinking);
 
+  // Stream the answer into one bubble as tokens arrive
+  let bubble = null;
   try{
-    const res = await apiPost(endpoints.ask, { contract_text: LAST_TEXT, question:q });
-    thinking.remove();
-    addMsg(res.answer, "bot");
+    await apiStream(endpoints.askStream, { ...docRef("contract_text"), question:q }, (name, data)=>{
+      if(name === "error") throw new Error(data.detail);
+      if(!bubble){
+        thinking.remove();
+        bubble = document.createElement("div");
+        bubble.className = "msg bot";
+        chatMessages.appendChild(bubble);
+      }
+      if(name === "token") bubble.textContent += data.text;
+      else if(name === "done") bubble.textContent = data.answer;
+      chatMessages.scrollTop = chatMessages.scrollHeight;
+    });
   }catch(err){
     thinking.remove();
     addMsg("Error: " + err.message, "bot");